@@ -0,0 +1,105 @@
+"""
+Prompt tokens and answer latency with word-window vs. token-budgeted context.
+
+"before" is the previous pipeline: 1000-word chunks with 100 words of
+overlap and the top k chunks pasted into the prompt. "after" is the
+sentence chunker with the context packed into CONTEXT_TOKEN_BUDGET tokens.
+Both retrieve with exact search over the same sources, for the same fixed
+set of dataset questions. Run from the repository root:
+
+    python -m benchmarks.context_packing --queries 20
+    python -m benchmarks.context_packing --queries 20 --llm   # also time llama3.2
+"""
+import argparse
+import time
+
+import faiss
+import numpy as np
+
+from tasks.chatbot import MODEL, build_messages, get_embedder
+from tasks.context_packer import CONTEXT_TOKEN_BUDGET, count_tokens, pack_context
+from tasks.faq_index import read_qa_pairs
+from tasks.knowledge_base import (
+    extract_chunks, extract_qa_chunks, extract_text_from_pdf, extract_text_from_txt,
+    iter_chunks, list_sources, qa_dataset_path
+)
+
+
+def word_window_chunks(path):
+    lower = path.lower()
+    if lower.endswith(('.csv', '.parquet')):
+        return extract_qa_chunks(path)
+    text = extract_text_from_pdf(path) if lower.endswith('.pdf') else extract_text_from_txt(path)
+    return list(iter_chunks([text]))
+
+
+def build(chunks):
+    vectors = np.asarray(get_embedder().encode(chunks, batch_size=64, convert_to_tensor=False), dtype='float32')
+    faiss.normalize_L2(vectors)
+    index = faiss.IndexFlatIP(vectors.shape[1])
+    index.add(vectors)
+    return index
+
+
+def load_queries(limit):
+    questions = read_qa_pairs(qa_dataset_path())[0]
+    rng = np.random.default_rng(0)
+    if len(questions) > limit:
+        questions = [questions[i] for i in rng.choice(len(questions), limit, replace=False)]
+    return questions
+
+
+def run(name, chunks, index, queries, k, pack, use_llm):
+    token_counts = [count_tokens(chunk) for chunk in chunks]
+    query_vectors = np.asarray(get_embedder().encode(queries, convert_to_tensor=False), dtype='float32')
+    faiss.normalize_L2(query_vectors)
+    _, ids = index.search(query_vectors, k)
+
+    prompt_tokens, latencies = [], []
+    for query, row in zip(queries, ids):
+        row = [int(i) for i in row if i >= 0]
+        context = [chunks[i] for i in row]
+        if pack:
+            context = pack_context(context, [token_counts[i] for i in row])
+        messages = build_messages(query, context)
+        tokens = sum(count_tokens(m["content"]) for m in messages)
+        if use_llm:
+            import ollama
+            start = time.perf_counter()
+            response = ollama.chat(model=MODEL, messages=messages)
+            latencies.append(time.perf_counter() - start)
+            tokens = response.get("prompt_eval_count") or tokens
+        prompt_tokens.append(tokens)
+
+    line = (f"{name:<8}{len(chunks):>8}{np.mean(token_counts):>12.0f}"
+            f"{np.mean(prompt_tokens):>14.0f}{np.percentile(prompt_tokens, 95):>10.0f}")
+    if latencies:
+        line += f"{np.mean(latencies):>10.2f}{np.percentile(latencies, 95):>10.2f}"
+    print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Prompt size and latency before/after context packing.")
+    parser.add_argument("--queries", type=int, default=20)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--llm", action="store_true", help="also measure end-to-end answer latency")
+    args = parser.parse_args()
+
+    sources = list_sources()
+    queries = load_queries(args.queries)
+    before = [chunk for path in sources for chunk in word_window_chunks(path)]
+    after = [chunk for path in sources for chunk in extract_chunks(path)]
+    if not before:
+        raise SystemExit("No knowledge-base chunks found.")
+
+    print(f"{len(queries)} queries, k={args.k}, budget={CONTEXT_TOKEN_BUDGET} tokens")
+    header = f"{'':<8}{'chunks':>8}{'chunk tok':>12}{'prompt tok':>14}{'p95':>10}"
+    if args.llm:
+        header += f"{'mean s':>10}{'p95 s':>10}"
+    print(header)
+    run("before", before, build(before), queries, args.k, False, args.llm)
+    run("after", after, build(after), queries, args.k, True, args.llm)
+
+
+if __name__ == "__main__":
+    main()
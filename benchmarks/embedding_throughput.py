@@ -0,0 +1,56 @@
+"""
+Chunks/second of the knowledge-base embedding stage at different worker counts.
+
+Uses the real corpus chunks (repeated up to --min-chunks so short corpora
+still give stable numbers) and no checkpointing. Run from the repository root:
+
+    python -m benchmarks.embedding_throughput --workers 1 2 4
+"""
+import argparse
+import os
+import time
+
+from tasks.embedding_builder import AUTOTUNE_CANDIDATES, EmbeddingBuilder, autotune_batch_size
+from tasks.knowledge_base import EMBEDDING_MODEL, extract_chunks, list_sources
+
+
+def main():
+    cpus = os.cpu_count() or 1
+    parser = argparse.ArgumentParser(description="Embedding throughput by worker count.")
+    parser.add_argument("--workers", type=int, nargs="+",
+                        default=sorted({1, 2, 4, cpus} & set(range(1, cpus + 1))))
+    parser.add_argument("--batch-size", type=int, default=0, help="0 autotunes on this host")
+    parser.add_argument("--min-chunks", type=int, default=2000)
+    args = parser.parse_args()
+
+    from sentence_transformers import SentenceTransformer
+    embedder = SentenceTransformer(EMBEDDING_MODEL, device="cpu")
+
+    corpus = []
+    for path in list_sources():
+        corpus.extend(extract_chunks(path))
+    if not corpus:
+        raise SystemExit("No knowledge-base chunks found.")
+    texts = (corpus * (args.min_chunks // len(corpus) + 1))[:max(args.min_chunks, len(corpus))]
+    # Suffix makes repeated chunks distinct so nothing is served from a cache.
+    texts = [f"{text} [{i}]" for i, text in enumerate(texts)]
+
+    batch_size = args.batch_size or autotune_batch_size(embedder, texts, EMBEDDING_MODEL)
+    print(f"{len(texts)} chunks, batch size {batch_size} (candidates {AUTOTUNE_CANDIDATES})")
+    print(f"{'workers':>8}{'seconds':>10}{'chunks/s':>12}{'speedup':>10}")
+
+    baseline = None
+    for workers in args.workers:
+        with EmbeddingBuilder(embedder, EMBEDDING_MODEL, workers=workers, batch_size=batch_size,
+                              checkpoint_dir=None) as builder:
+            builder.encode([f"warm-up {i}" for i in range(batch_size * workers)])
+            start = time.perf_counter()
+            builder.encode(texts)
+            seconds = time.perf_counter() - start
+        rate = len(texts) / seconds
+        baseline = baseline or rate
+        print(f"{workers:>8}{seconds:>10.2f}{rate:>12.1f}{rate / baseline:>9.2f}x")
+
+
+if __name__ == "__main__":
+    main()
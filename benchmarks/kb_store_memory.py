@@ -0,0 +1,69 @@
+"""
+Load time and per-process memory of the stored knowledge base, mapped vs. copied.
+
+Opens the saved index and chunk store in --processes separate processes at
+once, touches every chunk and runs a few searches, then reports each
+process's load time, RSS and PSS. PSS divides shared pages between the
+processes mapping them, so it shows what one more worker really costs.
+Needs an existing store (python -m tasks.knowledge_base) and Linux /proc.
+Run from the repository root:
+
+    python -m benchmarks.kb_store_memory --processes 4
+"""
+import argparse
+import json
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+
+def memory_mb():
+    values = {}
+    with open("/proc/self/smaps_rollup") as f:
+        for line in f:
+            key, _, rest = line.partition(":")
+            if key in ("Rss", "Pss"):
+                values[key] = int(rest.split()[0]) / 1024
+    return values
+
+
+def worker(mmap, hold):
+    from tasks.knowledge_base import load_manifest, load_stored_index
+
+    start = time.perf_counter()
+    stored = load_stored_index(mmap=mmap)
+    seconds = time.perf_counter() - start
+    if stored is None:
+        raise SystemExit("No usable stored knowledge base.")
+    index, chunks, _ = stored
+    for chunk_id in range(load_manifest()["next_id"]):
+        chunks.get(chunk_id)
+    index.search(np.random.rand(8, index.d).astype('float32'), 5)
+    time.sleep(hold)  # keep every process alive so shared pages are split between them
+    print(json.dumps({"seconds": seconds, **memory_mb()}))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Knowledge-base store memory per worker.")
+    parser.add_argument("--processes", type=int, default=4)
+    parser.add_argument("--worker", choices=["mmap", "copy"], help=argparse.SUPPRESS)
+    parser.add_argument("--hold", type=float, default=2.0, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.worker:
+        worker(args.worker == "mmap", args.hold)
+        return
+
+    print(f"{'mode':<8}{'load s':>10}{'RSS MB':>10}{'PSS MB':>10}   ({args.processes} processes)")
+    for mode in ("copy", "mmap"):
+        procs = [subprocess.Popen([sys.executable, "-m", "benchmarks.kb_store_memory", "--worker", mode,
+                                   "--hold", str(args.hold)], stdout=subprocess.PIPE, text=True)
+                 for _ in range(args.processes)]
+        rows = [json.loads(proc.communicate()[0].strip().splitlines()[-1]) for proc in procs]
+        print(f"{mode:<8}{np.mean([r['seconds'] for r in rows]):>10.3f}"
+              f"{np.mean([r['Rss'] for r in rows]):>10.1f}{np.mean([r['Pss'] for r in rows]):>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Burst load against the LLM gateway, backed by the Ollama stub by default.
+
+Fires --requests concurrent chats, a share of them streamed and a share of
+those abandoned after the first piece, and reports admissions, 429-style
+rejections with their retry hints, latency and the peak concurrency the
+server actually saw. Run from the repository root:
+
+    python -m benchmarks.llm_gateway_load --requests 40 --concurrency 2 --max-queue 8
+    python -m benchmarks.llm_gateway_load --host http://127.0.0.1:11434   # real Ollama
+"""
+import argparse
+import threading
+import time
+
+import numpy as np
+
+from benchmarks.ollama_stub import serve
+from tasks.llm_gateway import GatewayBusy, LLMGateway
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Burst load against the LLM gateway.")
+    parser.add_argument("--host", default="", help="Ollama URL; starts the stub when empty")
+    parser.add_argument("--port", type=int, default=11435)
+    parser.add_argument("--requests", type=int, default=40)
+    parser.add_argument("--concurrency", type=int, default=2)
+    parser.add_argument("--max-queue", type=int, default=8)
+    parser.add_argument("--timeout", type=float, default=30)
+    parser.add_argument("--abandon", type=float, default=0.2, help="share of streams closed after one piece")
+    args = parser.parse_args()
+
+    state = None
+    host = args.host
+    if not host:
+        _, state = serve(args.port)
+        host = f"http://127.0.0.1:{args.port}"
+    gateway = LLMGateway(host=host, concurrency=args.concurrency, max_queue=args.max_queue,
+                         timeout=args.timeout)
+    messages = [{"role": "user", "content": "How do I apply for asylum?"}]
+
+    results = []
+    lock = threading.Lock()
+
+    def client(i):
+        start = time.perf_counter()
+        outcome, detail = "ok", ""
+        try:
+            if i % 2:
+                gateway.chat(messages)
+            else:
+                stream = gateway.stream(messages)
+                try:
+                    for n, _ in enumerate(stream):
+                        if i % int(1 / args.abandon) == 0 and n == 0:
+                            outcome = "abandoned"
+                            break
+                finally:
+                    stream.close()
+        except GatewayBusy as e:
+            outcome, detail = "rejected", e.retry_after
+        except Exception as e:
+            outcome, detail = type(e).__name__, str(e)
+        with lock:
+            results.append((outcome, time.perf_counter() - start, detail))
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(args.requests)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - start
+    time.sleep(0.5)
+
+    print(f"{args.requests} requests in {wall:.2f}s, concurrency={args.concurrency}, max_queue={args.max_queue}")
+    for outcome in sorted({r[0] for r in results}):
+        rows = [r for r in results if r[0] == outcome]
+        latencies = [r[1] for r in rows]
+        line = f"{outcome:<12}{len(rows):>5}  p50 {np.percentile(latencies, 50):.2f}s  p95 {np.percentile(latencies, 95):.2f}s"
+        if outcome == "rejected":
+            line += f"  retry after {sorted({r[2] for r in rows})}s"
+        print(line)
+    print(f"gateway: {gateway.stats()}")
+    if state is not None:
+        print(f"server: peak concurrency {state.peak}, served {state.served}, disconnects {state.disconnects}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""
+Stand-in for the Ollama server, speaking enough of /api/chat for the LLM gateway.
+
+Answers every chat request with a fixed text after an optional prompt
+delay, streamed as NDJSON when the request asks for it. Used to exercise
+the gateway's queueing, timeouts and cancellation without a model:
+
+    python -m benchmarks.ollama_stub --port 11435 --delay 0.5 --tokens-per-second 40
+    OLLAMA_HOST=http://127.0.0.1:11435 python -m benchmarks.llm_gateway_load
+"""
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ANSWER = ("You can ask the local reception centre for help with your application. "
+          "Bring your identity documents and any papers you received at the border.")
+
+
+class StubState:
+    def __init__(self, delay, tokens_per_second):
+        self.delay = delay
+        self.tokens_per_second = tokens_per_second
+        self.lock = threading.Lock()
+        self.active = 0
+        self.peak = 0
+        self.served = 0
+        self.disconnects = 0
+
+
+def make_handler(state):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def _message(self, model, content, done):
+            message = {"model": model, "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ"),
+                       "message": {"role": "assistant", "content": content}, "done": done}
+            if done:
+                message.update(done_reason="stop", prompt_eval_count=0, eval_count=len(ANSWER.split()))
+            return message
+
+        def do_POST(self):
+            if self.path != "/api/chat":
+                self.send_error(404)
+                return
+            request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+            model = request.get("model", "stub")
+            with state.lock:
+                state.active += 1
+                state.peak = max(state.peak, state.active)
+            try:
+                time.sleep(state.delay)
+                words = [word + " " for word in ANSWER.split()]
+                pause = 1 / state.tokens_per_second if state.tokens_per_second else 0
+                if request.get("stream", True):
+                    self.send_response(200)
+                    self.send_header("Content-Type", "application/x-ndjson")
+                    self.send_header("Transfer-Encoding", "chunked")
+                    self.end_headers()
+                    for word in words:
+                        time.sleep(pause)
+                        self._write_chunk(json.dumps(self._message(model, word, False)) + "\n")
+                    self._write_chunk(json.dumps(self._message(model, "", True)) + "\n")
+                    self.wfile.write(b"0\r\n\r\n")
+                else:
+                    time.sleep(pause * len(words))
+                    body = json.dumps(self._message(model, "".join(words).strip(), True)).encode()
+                    self.send_response(200)
+                    self.send_header("Content-Type", "application/json")
+                    self.send_header("Content-Length", str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+                with state.lock:
+                    state.served += 1
+            except (BrokenPipeError, ConnectionResetError):
+                with state.lock:
+                    state.disconnects += 1
+            finally:
+                with state.lock:
+                    state.active -= 1
+
+        def _write_chunk(self, text):
+            data = text.encode()
+            self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+            self.wfile.flush()
+
+    return Handler
+
+
+def serve(port, delay=0.5, tokens_per_second=40):
+    """Start the stub in a background thread; returns (server, state)."""
+    state = StubState(delay, tokens_per_second)
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(state))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, state
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Minimal Ollama /api/chat stub.")
+    parser.add_argument("--port", type=int, default=11435)
+    parser.add_argument("--delay", type=float, default=0.5, help="seconds before the first token")
+    parser.add_argument("--tokens-per-second", type=float, default=40)
+    args = parser.parse_args()
+    server, state = serve(args.port, args.delay, args.tokens_per_second)
+    print(f"Ollama stub on http://127.0.0.1:{args.port}")
+    try:
+        while True:
+            time.sleep(5)
+            print(f"active={state.active} peak={state.peak} served={state.served} disconnects={state.disconnects}")
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
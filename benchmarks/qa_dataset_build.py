@@ -0,0 +1,60 @@
+"""
+QA ingestion time and chunk count: concatenated CSV + iterrows vs. deduplicated Parquet.
+
+"before" is the previous pipeline: the QA CSVs concatenated into one CSV
+with pandas and walked row by row with iterrows to make chunks. "after"
+builds the deduplicated Parquet dataset with tasks.data_preparation and
+loads it with the vectorized extract_qa_chunks. Every chunk becomes one
+embedding, so the chunk counts are the embeddings each pipeline requests.
+Run from the repository root:
+
+    python -m benchmarks.qa_dataset_build
+    python -m benchmarks.qa_dataset_build data/a.csv data/b.csv --repeat 5
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import pandas as pd
+
+from tasks.data_preparation import QA_SOURCES, prepare_data
+from tasks.knowledge_base import extract_qa_chunks
+
+
+def before(sources, workdir):
+    combined = pd.concat([pd.read_csv(path, sep=',') for path in sources], ignore_index=True)
+    csv_path = os.path.join(workdir, "combined_dataset.csv")
+    combined[['Question', 'Answer']].to_csv(csv_path, index=False)
+    df = pd.read_csv(csv_path, encoding="utf-8")
+    return [f"Question: {row.iloc[0]} Answer: {row.iloc[1]}" for _, row in df.iterrows()]
+
+
+def after(sources, workdir):
+    path = os.path.join(workdir, "qa_dataset.parquet")
+    prepare_data(sources, path)
+    return extract_qa_chunks(path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="QA dataset ingestion before/after the Parquet build.")
+    parser.add_argument("sources", nargs="*", default=QA_SOURCES)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    sources = [path for path in args.sources if os.path.exists(path)]
+    if not sources:
+        raise SystemExit("No QA sources found.")
+
+    print(f"{'':<8}{'chunks':>10}{'unique':>10}{'best s':>10}")
+    with tempfile.TemporaryDirectory() as workdir:
+        for name, run in (("before", before), ("after", after)):
+            timings = []
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                chunks = run(sources, workdir)
+                timings.append(time.perf_counter() - start)
+            print(f"{name:<8}{len(chunks):>10}{len(set(chunks)):>10}{min(timings):>10.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Recall@k vs. latency report for the knowledge-base index types.
+
+Every configured index type is built over the same chunk embeddings and
+compared against exact (flat) search with the same metric. Queries are the
+questions of the QA dataset, so the report reflects real chatbot traffic.
+Run from the repository root:
+
+    python -m benchmarks.retrieval_index_report --k 5 --queries 300
+"""
+import argparse
+import time
+
+import faiss
+import numpy as np
+
+from tasks.faq_index import read_qa_pairs
+from tasks.knowledge_base import EMBEDDING_MODEL, extract_chunks, list_sources, qa_dataset_path
+from tasks.vector_index import INDEX_TYPES, build_index, configure_search, index_config, prepare_queries
+
+
+def load_corpus():
+    chunks = []
+    for path in list_sources():
+        chunks.extend(extract_chunks(path))
+    return chunks
+
+
+def load_queries(chunks, limit):
+    try:
+        questions = read_qa_pairs(qa_dataset_path())[0]
+    except Exception:
+        questions = [chunk[:200] for chunk in chunks]
+    rng = np.random.default_rng(0)
+    if len(questions) > limit:
+        questions = [questions[i] for i in rng.choice(len(questions), limit, replace=False)]
+    return questions
+
+
+def evaluate(index, queries, truth, k):
+    latencies, hits = [], 0
+    for i in range(len(queries)):
+        t0 = time.perf_counter()
+        _, ids = index.search(queries[i:i + 1], k)
+        latencies.append(time.perf_counter() - t0)
+        hits += len(set(ids[0]) & set(truth[i]))
+    return hits / (len(queries) * k), float(np.mean(latencies)) * 1000, float(np.percentile(latencies, 95)) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Recall@k vs latency for each index type.")
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--queries", type=int, default=300)
+    parser.add_argument("--metric", choices=["l2", "ip"], default="ip")
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[1, 4, 8, 16, 32])
+    parser.add_argument("--ef-search", type=int, nargs="+", default=[16, 32, 64, 128])
+    args = parser.parse_args()
+
+    from sentence_transformers import SentenceTransformer
+    embedder = SentenceTransformer(EMBEDDING_MODEL)
+
+    chunks = load_corpus()
+    print(f"Embedding {len(chunks)} chunks...")
+    vectors = np.asarray(embedder.encode(chunks, batch_size=64), dtype='float32')
+    ids = np.arange(len(chunks), dtype='int64')
+    query_vectors = np.asarray(embedder.encode(load_queries(chunks, args.queries)), dtype='float32')
+    dimension = vectors.shape[1]
+
+    exact = build_index(dimension, vectors, ids, index_config("flat", args.metric))
+    queries = prepare_queries(exact, query_vectors)
+    _, truth = exact.search(queries, args.k)
+
+    print(f"\n{len(chunks)} vectors, {len(queries)} queries, metric={args.metric}, k={args.k}")
+    print(f"{'index':<12}{'param':<14}{'recall@k':>10}{'mean ms':>10}{'p95 ms':>10}{'size MB':>10}{'build s':>10}")
+    for index_type in INDEX_TYPES:
+        t0 = time.perf_counter()
+        index = build_index(dimension, vectors, ids, index_config(index_type, args.metric))
+        build_seconds = time.perf_counter() - t0
+        size_mb = len(faiss.serialize_index(index)) / 1024 / 1024
+
+        if index_type in ("ivf", "ivfpq"):
+            sweep = [("nprobe", value, dict(nprobe=value)) for value in args.nprobe]
+        elif index_type == "hnsw":
+            sweep = [("efSearch", value, dict(ef_search=value)) for value in args.ef_search]
+        else:
+            sweep = [("-", "", {})]
+
+        for name, value, params in sweep:
+            configure_search(index, **params)
+            recall, mean_ms, p95_ms = evaluate(index, queries, truth, args.k)
+            param = f"{name}={value}" if value != "" else name
+            print(f"{index_type:<12}{param:<14}{recall:>10.3f}{mean_ms:>10.3f}{p95_ms:>10.3f}"
+                  f"{size_mb:>10.2f}{build_seconds:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
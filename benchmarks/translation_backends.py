@@ -0,0 +1,116 @@
+"""
+Compare translation inference backends on a fixed offline corpus.
+
+Each backend runs in its own subprocess so resident memory is measured
+from a clean interpreter. Run from the repository root:
+
+    python -m benchmarks.translation_backends --pair fr-en --backends pytorch onnx onnx-int8
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import time
+
+CORPUS = [
+    "Où se trouve l'hôpital le plus proche ?",
+    "J'ai besoin d'un médecin pour mon enfant.",
+    "Je voudrais demander l'asile.",
+    "Quels documents dois-je apporter à la préfecture ?",
+    "Mon titre de séjour expire le mois prochain.",
+    "Pouvez-vous m'aider à remplir ce formulaire ?",
+    "Je cherche un logement d'urgence pour ma famille.",
+    "Où puis-je apprendre le français gratuitement ?",
+    "Je n'ai pas d'argent pour acheter des médicaments.",
+    "Comment inscrire mes enfants à l'école ?",
+    "Le rendez-vous est fixé à neuf heures demain matin.",
+    "J'ai perdu mon passeport pendant le voyage.",
+    "Est-ce que je peux travailler pendant l'examen de ma demande ?",
+    "Il faut présenter une pièce d'identité et un justificatif de domicile.",
+    "Je souffre de douleurs à la poitrine depuis hier soir.",
+    "Où se trouve le centre d'accueil pour les réfugiés ?",
+]
+
+
+def rss_bytes():
+    import psutil
+    return psutil.Process().memory_info().rss
+
+
+def run_backend(backend, source_lang, target_lang, repeats, batch_size):
+    from tasks.translation_pool import backend_loader
+
+    base_rss = rss_bytes()
+    start = time.perf_counter()
+    tokenizer, model = backend_loader(backend)(source_lang, target_lang)
+    load_seconds = time.perf_counter() - start
+
+    def generate(texts):
+        inputs = tokenizer(texts, return_tensors="pt", padding=True)
+        return tokenizer.batch_decode(model.generate(**inputs), skip_special_tokens=True)
+
+    generate(CORPUS[:1])
+
+    latencies = []
+    for _ in range(repeats):
+        for sentence in CORPUS:
+            t0 = time.perf_counter()
+            generate([sentence])
+            latencies.append(time.perf_counter() - t0)
+
+    t0 = time.perf_counter()
+    for _ in range(repeats):
+        for i in range(0, len(CORPUS), batch_size):
+            generate(CORPUS[i:i + batch_size])
+    batch_seconds = time.perf_counter() - t0
+
+    latencies.sort()
+    return {
+        "backend": backend,
+        "load_s": round(load_seconds, 2),
+        "p50_ms": round(statistics.median(latencies) * 1000, 1),
+        "p95_ms": round(latencies[int(len(latencies) * 0.95) - 1] * 1000, 1),
+        "sentences_per_s": round(repeats * len(CORPUS) / batch_seconds, 1),
+        "rss_mb": round((rss_bytes() - base_rss) / 1024 / 1024, 1),
+        "sample": generate(CORPUS[:1])[0],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--pair", default="fr-en")
+    parser.add_argument("--backends", nargs="+", default=["pytorch", "onnx", "onnx-int8"])
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--batch-size", type=int, default=8)
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    source_lang, target_lang = args.pair.split("-")
+
+    if args.worker:
+        print(json.dumps(run_backend(args.worker, source_lang, target_lang,
+                                     args.repeats, args.batch_size)))
+        return
+
+    rows = []
+    for backend in args.backends:
+        cmd = [sys.executable, "-m", "benchmarks.translation_backends", "--pair", args.pair,
+               "--repeats", str(args.repeats), "--batch-size", str(args.batch_size),
+               "--worker", backend]
+        out = subprocess.run(cmd, capture_output=True, text=True)
+        if out.returncode != 0:
+            lines = out.stderr.strip().splitlines()
+            print(f"{backend}: failed ({lines[-1] if lines else f'exit code {out.returncode}'})")
+            continue
+        rows.append(json.loads(out.stdout.strip().splitlines()[-1]))
+
+    header = ["backend", "load_s", "p50_ms", "p95_ms", "sentences_per_s", "rss_mb"]
+    print(" | ".join(f"{h:>15}" for h in header))
+    for row in rows:
+        print(" | ".join(f"{row[h]!s:>15}" for h in header))
+    for row in rows:
+        print(f"{row['backend']}: {row['sample']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,28 +1,26 @@
-from flask import Flask, render_template, request, jsonify, send_from_directory
-import os
-import cv2
-from ultralytics import YOLO
-import ollama
-from tasks.task1 import translate_text, process_voice_input
-from tasks.task2 import load_all_documents, create_faiss_index, retrieve_relevant_chunks, build_rag_prompt
+from flask import Flask, render_template, request, jsonify, send_from_directory, Response, stream_with_context
+import json
+from tasks.translation import translate_text, translate_long_text_stream
+from tasks.translation_cache import translation_cache
+from tasks.chatbot import retrieve_context, generate_response, generate_response_stream, answer_faq, answer_cache, faq_index
+from tasks.card_detection import MAX_BATCH_FILES, batcher as detection_batcher, process_upload, process_uploads
+from tasks.detection_cache import detection_cache
+from tasks.llm_gateway import GatewayBusy, llm_gateway
+from tasks.medical_document_processor import stage_timings as medical_timings
+from tasks.model_registry import registry
+from tasks.retrieval_cache import retrieval_cache
+from tasks.audio_cache import audio_cache
+from tasks.speech_processing import process_speech_to_text, text_to_speech
+from tasks.streaming_stt import stt_sessions
+from tasks.voice_pipeline import stage_timings as voice_timings, translate_speech_stream
 
 app = Flask(__name__)
 
-app.config["UPLOAD_FOLDER"] = "uploads"  
-app.config["RESULTS_FOLDER"] = "results"  
+app.config["RESULTS_FOLDER"] = detection_cache.path
 app.config["MAX_CONTENT_LENGTH"] = 16 * 1024 * 1024  
 
-os.makedirs(app.config["UPLOAD_FOLDER"], exist_ok=True)
-os.makedirs(app.config["RESULTS_FOLDER"], exist_ok=True)
-
-model = YOLO("model/card_detector.pt") 
-
-print("Chargement de la base de connaissances pour le chatbot...")
-all_chunks = load_all_documents()
-if not all_chunks:
-    raise ValueError("Aucune donnée disponible dans la base de connaissances.")
-index, chunks = create_faiss_index(all_chunks)
-print(f"Base de connaissances chargée avec succès ! {len(all_chunks)} segments disponibles.")
+# Models load on first use; the warm-up thread loads them ahead of traffic.
+registry.warm_up()
 
 @app.route("/")
 def home():
@@ -50,6 +48,187 @@ def home():
     }
     return render_template("index.html", countries=countries)
 
+@app.route("/translation")
+def translation():
+    return render_template("translation.html")
+
+@app.route("/translate", methods=["POST"])
+def translate():
+    data = request.get_json(silent=True) or {}
+    text = data.get("text", "").strip()
+    if not text:
+        return jsonify({"error": "No text provided."}), 400
+    try:
+        translated_text = translate_text(text, data.get("source_lang", "ar"), data.get("target_lang", "fr"))
+        return jsonify({"translated_text": translated_text})
+    except Exception as e:
+        return jsonify({"error": "Translation failed", "details": str(e)}), 500
+
+@app.route("/translate/stream", methods=["POST"])
+def translate_stream():
+    data = request.get_json(silent=True) or {}
+    text = data.get("text", "").strip()
+    if not text:
+        return jsonify({"error": "No text provided."}), 400
+    source_lang = data.get("source_lang", "ar")
+    target_lang = data.get("target_lang", "fr")
+
+    def events():
+        try:
+            for i, segment in enumerate(translate_long_text_stream(text, source_lang, target_lang)):
+                yield f"data: {json.dumps({'index': i, 'text': segment})}\n\n"
+            yield "event: done\ndata: {}\n\n"
+        except Exception as e:
+            yield f"event: error\ndata: {json.dumps({'error': 'Translation failed', 'details': str(e)})}\n\n"
+
+    return Response(stream_with_context(events()), mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@app.route("/text_to_speech", methods=["POST"])
+def synthesize_speech():
+    data = request.get_json(silent=True) or {}
+    text = data.get("text", "").strip()
+    if not text:
+        return jsonify({"error": "No text provided."}), 400
+    audio_url = text_to_speech(text, data.get("language", "en-GB"))
+    if audio_url is None:
+        return jsonify({"error": "Speech synthesis failed"}), 500
+    return jsonify({"audio_url": audio_url})
+
+@app.route("/speech_to_text", methods=["POST"])
+def speech_to_text():
+    if "audio" not in request.files:
+        return jsonify({"error": "No audio provided."}), 400
+    result = process_speech_to_text(request.files["audio"].read(), request.form.get("language", "en-GB"))
+    if not result["success"]:
+        return jsonify({"error": result["error"]}), 400
+    return jsonify({"text": result["text"], "detected_language": result["detected_language"]})
+
+@app.route("/speech_to_text/stream", methods=["POST"])
+def speech_to_text_stream_open():
+    """Open a streaming transcription; the client then posts raw 16-bit mono PCM chunks."""
+    data = request.get_json(silent=True) or {}
+    try:
+        session_id = stt_sessions.open(language=data.get("language", "auto"),
+                                       sample_rate=data.get("sample_rate", 16000),
+                                       engine=data.get("engine"))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify({"session": session_id})
+
+@app.route("/speech_to_text/stream/<session_id>", methods=["POST"])
+def speech_to_text_stream_chunk(session_id):
+    try:
+        return jsonify(stt_sessions.feed(session_id, request.get_data()))
+    except KeyError:
+        return jsonify({"error": "Unknown or expired session."}), 404
+    except Exception as e:
+        return jsonify({"error": "Speech recognition failed", "details": str(e)}), 500
+
+@app.route("/speech_to_text/stream/<session_id>/end", methods=["POST"])
+def speech_to_text_stream_end(session_id):
+    try:
+        return jsonify(stt_sessions.close(session_id))
+    except KeyError:
+        return jsonify({"error": "Unknown or expired session."}), 404
+    except Exception as e:
+        return jsonify({"error": "Speech recognition failed", "details": str(e)}), 500
+
+@app.route("/voice_translate/stream", methods=["POST"])
+def voice_translate_stream():
+    if "audio" not in request.files:
+        return jsonify({"error": "No audio provided."}), 400
+    try:
+        events = translate_speech_stream(request.files["audio"].read(),
+                                         request.form.get("source_lang", "auto"),
+                                         request.form.get("target_lang", "fr-FR"))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    def stream():
+        try:
+            for event in events:
+                name = event.pop("event")
+                if name == "sentence":
+                    yield f"data: {json.dumps(event)}\n\n"
+                else:
+                    yield f"event: {name}\ndata: {json.dumps(event)}\n\n"
+        finally:
+            events.close()
+
+    return Response(stream_with_context(stream()), mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@app.route("/metrics/speech")
+def speech_metrics():
+    return jsonify({
+        "tts_cache": audio_cache.stats(),
+        "stt_sessions": stt_sessions.stats(),
+        "voice_pipeline": voice_timings.stats(),
+    })
+
+@app.route("/audio/<filename>")
+def get_audio(filename):
+    return send_from_directory(audio_cache.path, filename)
+
+@app.route("/assistant")
+def assistant():
+    return render_template("assistant.html")
+
+def busy_response(error):
+    response = jsonify({"error": "The assistant is busy, please try again shortly.",
+                        "retry_after": error.retry_after})
+    response.status_code = 429
+    response.headers["Retry-After"] = str(error.retry_after)
+    return response
+
+@app.route("/generate", methods=["POST"])
+def generate():
+    data = request.get_json(silent=True) or {}
+    query = data.get("query", "").strip()
+    if not query:
+        return jsonify({"error": "No query provided."}), 400
+    index, chunks = registry.get("knowledge_base")
+    faq_answer = answer_faq(query)
+    if faq_answer is not None:
+        return jsonify({"answer": faq_answer})
+    context = retrieve_context(query, index, chunks)
+    try:
+        return jsonify({"answer": generate_response(query, context)})
+    except GatewayBusy as e:
+        return busy_response(e)
+
+@app.route("/generate/stream", methods=["POST"])
+def generate_stream():
+    data = request.get_json(silent=True) or {}
+    query = data.get("query", "").strip()
+    if not query:
+        return jsonify({"error": "No query provided."}), 400
+    index, chunks = registry.get("knowledge_base")
+    faq_answer = answer_faq(query)
+    if faq_answer is not None:
+        tokens = iter([faq_answer])
+    else:
+        try:
+            tokens = generate_response_stream(query, retrieve_context(query, index, chunks))
+        except GatewayBusy as e:
+            return busy_response(e)
+
+    def events():
+        answer = []
+        for token in tokens:
+            answer.append(token)
+            yield f"data: {json.dumps({'token': token})}\n\n"
+        yield f"event: done\ndata: {json.dumps({'answer': ''.join(answer)})}\n\n"
+
+    response = Response(stream_with_context(events()), mimetype="text/event-stream",
+                        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+    if hasattr(tokens, "close"):
+        # The server closes the response after it is sent, when the client
+        # disconnects, and also when streaming never started.
+        response.call_on_close(tokens.close)
+    return response
+
 @app.route("/document_processing", methods=["GET", "POST"])
 def document_processing():
     try:
@@ -61,39 +240,75 @@ def document_processing():
             if file.filename == "":
                 return jsonify({"error": "Nom de fichier vide."}), 400
 
-            file_path = os.path.join(app.config["UPLOAD_FOLDER"], file.filename)
-            file.save(file_path)
-
-            img = cv2.imread(file_path)
-            if img is None:
+            processed = process_upload(file.read())
+            if processed is None:
                 return jsonify({"error": "Impossible de lire l'image."}), 400
-
-            results = model(img)
-
-            annotated_img = results[0].plot()
-
-            result_path = os.path.join(app.config["RESULTS_FOLDER"], file.filename)
-            cv2.imwrite(result_path, annotated_img)
-
-            detections = []
-            for box in results[0].boxes.data.tolist():
-                x1, y1, x2, y2, confidence, class_id = box
-                class_name = results[0].names[int(class_id)]
-                detections.append({
-                    "class": class_name,
-                    "confidence": round(confidence, 2),
-                    "box": [int(x1), int(y1), int(x2), int(y2)]
-                })
+            key, detections = processed
 
             return jsonify({
                 "detections": detections,
-                "annotated_image": f"/results/{file.filename}"
+                "annotated_image": f"/results/{detection_cache.image_name(key)}"
             })
 
         return render_template("document_processing.html")
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@app.route("/document_processing/batch", methods=["POST"])
+def document_processing_batch():
+    files = [f for f in request.files.getlist("documents") if f.filename]
+    if not files:
+        return jsonify({"error": "Aucune image téléchargée."}), 400
+    if len(files) > MAX_BATCH_FILES:
+        return jsonify({"error": f"{MAX_BATCH_FILES} images maximum par envoi."}), 400
+
+    try:
+        response = []
+        for file, processed in zip(files, process_uploads([file.read() for file in files])):
+            if processed is None:
+                response.append({"filename": file.filename, "error": "Impossible de lire l'image."})
+                continue
+            key, detections = processed
+            response.append({
+                "filename": file.filename,
+                "detections": detections,
+                "annotated_image": f"/results/{detection_cache.image_name(key)}"
+            })
+        return jsonify({"results": response})
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route("/metrics/detection")
+def detection_metrics():
+    return jsonify({"batching": detection_batcher.stats(), "cache": detection_cache.stats()})
+
+@app.route("/metrics/medical")
+def medical_metrics():
+    return jsonify({"stages": medical_timings.stats()})
+
+@app.route("/metrics/cache")
+def cache_metrics():
+    return jsonify({
+        "translation": translation_cache.stats(),
+        "retrieval": retrieval_cache.stats(),
+        "answers": answer_cache.stats(),
+        "faq": faq_index.stats(),
+        "audio": audio_cache.stats(),
+    })
+
+@app.route("/healthz")
+def healthz():
+    return jsonify({"status": "ok", "models": registry.status()})
+
+@app.route("/readyz")
+def readyz():
+    ready = registry.ready()
+    return jsonify({"ready": ready, "models": registry.status()}), 200 if ready else 503
+
+@app.route("/metrics/llm")
+def llm_metrics():
+    return jsonify(llm_gateway.stats())
+
 @app.route("/results/<filename>")
 def get_result(filename):
     return send_from_directory(app.config["RESULTS_FOLDER"], filename)
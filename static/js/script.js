@@ -47,28 +47,44 @@ document.addEventListener("DOMContentLoaded", () => {
         // Clear the input field
         userQueryInput.value = "";
 
-        // Send the query to the Flask backend
-        const response = await fetch("/generate", {
+        // Display the bot response, filled in as tokens stream from the backend
+        const botMessageDiv = document.createElement("div");
+        botMessageDiv.className = "bot-message";
+        chatWindow.appendChild(botMessageDiv);
+
+        const response = await fetch("/generate/stream", {
             method: "POST",
             headers: { "Content-Type": "application/json" },
             body: JSON.stringify({ query: userQuery }),
         });
 
-        const data = await response.json();
-
-        // Display the bot response
-        const botMessageDiv = document.createElement("div");
-        botMessageDiv.className = "bot-message";
-
-        if (data.answer) {
-            botMessageDiv.innerText = data.answer;
-        } else {
+        if (!response.ok) {
+            const data = await response.json();
             botMessageDiv.innerText = "Error: " + (data.error || "Unable to process your query.");
+            return;
         }
 
-        chatWindow.appendChild(botMessageDiv);
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = "";
+        let answer = "";
 
-        // Scroll to the latest message
-        chatWindow.scrollTop = chatWindow.scrollHeight;
+        while (true) {
+            const { value, done } = await reader.read();
+            if (done) break;
+            buffer += decoder.decode(value, { stream: true });
+
+            const events = buffer.split("\n\n");
+            buffer = events.pop();
+            for (const raw of events) {
+                const dataLine = raw.split("\n").find((line) => line.startsWith("data:"));
+                if (!dataLine || raw.startsWith("event: done")) continue;
+                answer += JSON.parse(dataLine.slice(5)).token;
+                botMessageDiv.innerText = answer;
+
+                // Scroll to the latest message
+                chatWindow.scrollTop = chatWindow.scrollHeight;
+            }
+        }
     });
 });
\ No newline at end of file
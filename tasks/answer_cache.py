@@ -0,0 +1,194 @@
+import faiss
+import numpy as np
+import threading
+import hashlib
+import logging
+import json
+import time
+import os
+
+logger = logging.getLogger(__name__)
+
+ANSWER_CACHE_DIR = os.environ.get("ANSWER_CACHE_DIR", "cache/answers")
+ANSWER_CACHE_THRESHOLD = float(os.environ.get("ANSWER_CACHE_THRESHOLD", "0.92"))
+ANSWER_CACHE_SIZE = int(os.environ.get("ANSWER_CACHE_SIZE", "2000"))
+ANSWER_CACHE_SAVE_EVERY = int(os.environ.get("ANSWER_CACHE_SAVE_EVERY", "20"))  # stores between writes to disk
+SEARCH_CANDIDATES = 4
+
+
+def context_fingerprint(context):
+    """Stable hash of the retrieved chunks an answer was generated from."""
+    digest = hashlib.sha1()
+    for chunk in context:
+        digest.update(chunk.encode('utf-8'))
+        digest.update(b'\x00')
+    return digest.hexdigest()
+
+
+class SemanticAnswerCache:
+    """
+    Cache of generated answers looked up by query similarity.
+
+    Query embeddings are L2-normalized and kept in their own inner-product
+    FAISS index, so the search score is the cosine similarity. A cached
+    answer is returned when a stored query scores at least `threshold`,
+    was answered from the same retrieved context and against the current
+    knowledge-base version; entries from older versions are dropped when
+    the version changes. The least recently used entry is evicted beyond
+    `capacity`. Index and entries are persisted under `path` every
+    `save_every` stores and by `flush`, which should run at shutdown.
+
+    Without a `dimension` the cache stays empty until `load` is called,
+    so it can be created before the embedding model is available.
+    """
+
+    def __init__(self, dimension=None, path=ANSWER_CACHE_DIR, threshold=ANSWER_CACHE_THRESHOLD,
+                 capacity=ANSWER_CACHE_SIZE, save_every=ANSWER_CACHE_SAVE_EVERY):
+        self.path = path
+        self.threshold = threshold
+        self.capacity = capacity
+        self.save_every = save_every
+        self.unsaved = 0
+        self.version = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.index = None
+        self.entries = {}
+        self.next_id = 0
+        if dimension is not None:
+            self.load(dimension)
+
+    def _files(self):
+        return os.path.join(self.path, "index.faiss"), os.path.join(self.path, "entries.json")
+
+    def load(self, dimension):
+        """Open the persisted cache for embeddings of `dimension` values."""
+        with self._lock:
+            self._load(dimension)
+
+    def _load(self, dimension):
+        index_path, entries_path = self._files()
+        self.index = faiss.IndexIDMap2(faiss.IndexFlatIP(dimension))
+        self.entries = {}
+        self.next_id = 0
+        if not (os.path.exists(index_path) and os.path.exists(entries_path)):
+            return
+        try:
+            index = faiss.read_index(index_path)
+            with open(entries_path, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+            if index.d != dimension:
+                raise ValueError(f"dimension {index.d} != {dimension}")
+            self.index = index
+            self.entries = {int(k): v for k, v in state["entries"].items()}
+            self.next_id = state["next_id"]
+            logger.info(f"Loaded {len(self.entries)} cached answers")
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable answer cache: {e}")
+
+    def _save(self):
+        os.makedirs(self.path, exist_ok=True)
+        index_path, entries_path = self._files()
+        faiss.write_index(self.index, f"{index_path}.tmp")
+        with open(f"{entries_path}.tmp", 'w', encoding='utf-8') as f:
+            json.dump({"next_id": self.next_id, "entries": self.entries}, f)
+        os.replace(f"{index_path}.tmp", index_path)
+        os.replace(f"{entries_path}.tmp", entries_path)
+        self.unsaved = 0
+
+    def flush(self):
+        """Persist stores not written to disk yet."""
+        with self._lock:
+            if self.unsaved:
+                try:
+                    self._save()
+                except OSError as e:
+                    logger.error(f"Could not persist answer cache: {e}")
+
+    def _remove(self, ids):
+        if ids:
+            self.index.remove_ids(np.array(ids, dtype='int64'))
+            for entry_id in ids:
+                self.entries.pop(entry_id, None)
+
+    @staticmethod
+    def _normalize(embedding):
+        vector = np.array(embedding, dtype='float32').reshape(1, -1)
+        faiss.normalize_L2(vector)
+        return vector
+
+    def set_version(self, version):
+        """Drop answers generated against another knowledge-base version."""
+        with self._lock:
+            self.version = version
+            stale = [i for i, entry in self.entries.items() if entry["kb_version"] != version]
+            if stale:
+                self._remove(stale)
+                self._save()
+                logger.info(f"Dropped {len(stale)} cached answers from older knowledge-base versions")
+
+    def lookup(self, embedding, context):
+        """
+        Return the cached answer for a near-duplicate query, or None.
+
+        Args:
+            embedding (np.ndarray): Query embedding
+            context (list): Chunks retrieved for the query
+        Returns:
+            str or None
+        """
+        fingerprint = context_fingerprint(context)
+        with self._lock:
+            if self.index is not None and self.index.ntotal:
+                scores, ids = self.index.search(self._normalize(embedding), SEARCH_CANDIDATES)
+                for score, entry_id in zip(scores[0], ids[0]):
+                    if score < self.threshold:
+                        break
+                    entry = self.entries.get(int(entry_id))
+                    if (entry is not None and entry["context"] == fingerprint
+                            and entry["kb_version"] == self.version):
+                        entry["last_used"] = time.time()
+                        self.hits += 1
+                        return entry["answer"]
+            self.misses += 1
+            return None
+
+    def store(self, query, embedding, context, answer):
+        with self._lock:
+            if self.index is None:
+                return
+            entry_id = self.next_id
+            self.next_id += 1
+            self.index.add_with_ids(self._normalize(embedding), np.array([entry_id], dtype='int64'))
+            now = time.time()
+            self.entries[entry_id] = {
+                "query": query,
+                "answer": answer,
+                "context": context_fingerprint(context),
+                "kb_version": self.version,
+                "created": now,
+                "last_used": now,
+            }
+            if len(self.entries) > self.capacity:
+                by_age = sorted(self.entries, key=lambda i: self.entries[i]["last_used"])
+                self._remove(by_age[:len(self.entries) - self.capacity])
+            self.unsaved += 1
+            if self.unsaved >= self.save_every:
+                try:
+                    self._save()
+                except OSError as e:
+                    logger.error(f"Could not persist answer cache: {e}")
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self.entries),
+                "capacity": self.capacity,
+                "threshold": self.threshold,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "unsaved": self.unsaved,
+            }
@@ -0,0 +1,142 @@
+from collections import OrderedDict
+import threading
+import hashlib
+import logging
+import time
+import re
+import os
+
+from tasks.translation_cache import normalize_text
+
+logger = logging.getLogger(__name__)
+
+AUDIO_CACHE_DIR = os.environ.get("TTS_CACHE_DIR", "static/audio")
+AUDIO_CACHE_MAX_BYTES = int(os.environ.get("TTS_CACHE_MAX_MB", "256")) * 1024 * 1024
+ENTRY_NAME = re.compile(r'^[0-9a-f]{64}\.\w+$')
+
+
+class AudioCache:
+    """
+    Content-addressed store of synthesized speech.
+
+    A clip is keyed by the SHA-256 of the normalized text, the language and
+    the backend name and voice, and lives in `path` as `<key><extension>`,
+    so a repeated phrase is served from disk without synthesis. The least
+    recently used clips are deleted once the directory holds more than
+    `max_bytes` of them; recency survives restarts through file mtimes.
+    Files in `path` that are not cache entries are left alone.
+
+    Concurrent requests for the same missing clip synthesize it once.
+    """
+
+    def __init__(self, path=AUDIO_CACHE_DIR, max_bytes=AUDIO_CACHE_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # filename -> size in bytes, least recent first
+        self._lock = threading.Lock()
+        self._pending = {}  # filename -> lock held while the clip is synthesized
+        self.used_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.synthesis_seconds = 0.0
+        os.makedirs(path, exist_ok=True)
+        self._scan()
+
+    def _scan(self):
+        found = []
+        for name in os.listdir(self.path):
+            if not ENTRY_NAME.match(name):
+                continue
+            try:
+                stat = os.stat(os.path.join(self.path, name))
+            except OSError:
+                continue
+            found.append((stat.st_mtime, name, stat.st_size))
+        for _, name, size in sorted(found):
+            self._entries[name] = size
+            self.used_bytes += size
+
+    @staticmethod
+    def filename(text, language, engine):
+        """Cache filename of a phrase spoken by a TTS backend."""
+        payload = f"{engine.name}\x00{engine.voice}\x00{language}\x00{normalize_text(text)}"
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest() + engine.extension
+
+    def _touch(self, name):
+        """Mark an entry as used; returns False if its file has gone."""
+        try:
+            os.utime(os.path.join(self.path, name))
+        except OSError:
+            self.used_bytes -= self._entries.pop(name, 0)
+            return False
+        self._entries.move_to_end(name)
+        return True
+
+    def synthesize(self, text, language, engine):
+        """
+        Return the filename of the clip for `text`, synthesizing it on a miss.
+
+        Args:
+            text (str): Text to speak
+            language (str): Language code (e.g. 'en-GB')
+            engine (TTSEngine): Backend used on a miss
+        Returns:
+            str: Filename relative to `path`
+        """
+        name = self.filename(text, language, engine)
+        with self._lock:
+            if name in self._entries and self._touch(name):
+                self.hits += 1
+                return name
+            pending = self._pending.setdefault(name, threading.Lock())
+
+        with pending:
+            with self._lock:
+                if name in self._entries and self._touch(name):
+                    self.hits += 1
+                    return name
+                self.misses += 1
+            try:
+                start = time.perf_counter()
+                data = engine.synthesize(normalize_text(text), language)
+                self._store(name, data, time.perf_counter() - start)
+            finally:
+                with self._lock:
+                    self._pending.pop(name, None)
+        return name
+
+    def _store(self, name, data, seconds):
+        path = os.path.join(self.path, name)
+        with open(f"{path}.tmp", 'wb') as f:
+            f.write(data)
+        os.replace(f"{path}.tmp", path)
+        with self._lock:
+            self.synthesis_seconds += seconds
+            self.used_bytes += len(data) - self._entries.pop(name, 0)
+            self._entries[name] = len(data)
+            while self.used_bytes > self.max_bytes and len(self._entries) > 1:
+                oldest = next(iter(self._entries))
+                self.used_bytes -= self._entries.pop(oldest)
+                try:
+                    os.remove(os.path.join(self.path, oldest))
+                except FileNotFoundError:
+                    pass
+                self.evictions += 1
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "used_bytes": self.used_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "synthesis_seconds": round(self.synthesis_seconds, 3),
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+audio_cache = AudioCache()
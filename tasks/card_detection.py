@@ -0,0 +1,137 @@
+import numpy as np
+import functools
+import hashlib
+import logging
+import cv2
+import os
+
+from tasks.detection_cache import detection_cache
+from tasks.micro_batcher import MicroBatcher
+from tasks.model_registry import registry
+
+logger = logging.getLogger(__name__)
+
+DETECTOR_PATH = "model/card_detector.pt"
+DETECTION_BATCH_SIZE = int(os.environ.get("DETECTION_BATCH_SIZE", "8"))
+DETECTION_BATCH_WAIT_MS = float(os.environ.get("DETECTION_BATCH_WAIT_MS", "0"))  # 0 disables micro-batching
+MAX_BATCH_FILES = int(os.environ.get("DETECTION_MAX_FILES", "64"))
+
+
+def load_card_detector():
+    from ultralytics import YOLO
+    return YOLO(DETECTOR_PATH)
+
+registry.register("yolo", load_card_detector)
+
+@functools.lru_cache(maxsize=1)
+def model_version():
+    """Short digest of the detector weights, part of every result cache key."""
+    digest = hashlib.sha256()
+    with open(DETECTOR_PATH, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()[:16]
+
+def decode_image(data):
+    """Decode uploaded image bytes to a BGR array, or None if they are not an image."""
+    if not data:
+        return None
+    return cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+
+def encode_image(img, quality=90):
+    ok, buffer = cv2.imencode(".jpg", img, [cv2.IMWRITE_JPEG_QUALITY, quality])
+    if not ok:
+        raise ValueError("Could not encode annotated image")
+    return buffer.tobytes()
+
+def detect_batch(images, batch_size=DETECTION_BATCH_SIZE):
+    """
+    Run the card detector over a list of images in batched inference calls.
+
+    Args:
+        images (list): BGR images as numpy arrays
+        batch_size (int): Images per YOLO call
+    Returns:
+        list: One ultralytics Results object per image, in input order
+    """
+    if not images:
+        return []
+    model = registry.get("yolo")
+    results = []
+    for start in range(0, len(images), batch_size):
+        results.extend(model(images[start:start + batch_size], verbose=False))
+    return results
+
+def detections_json(result):
+    """Convert one YOLO result into the detection dicts returned by the API."""
+    detections = []
+    for box in result.boxes.data.tolist():
+        x1, y1, x2, y2, confidence, class_id = box
+        class_name = result.names[int(class_id)]
+        detections.append({
+            "class": class_name,
+            "confidence": round(confidence, 2),
+            "box": [int(x1), int(y1), int(x2), int(y2)]
+        })
+    return detections
+
+
+batcher = MicroBatcher(detect_batch, DETECTION_BATCH_SIZE, DETECTION_BATCH_WAIT_MS)
+
+def detect_image(img):
+    """
+    Detect cards in one image.
+
+    With DETECTION_BATCH_WAIT_MS > 0, concurrent requests arriving within
+    that window share a single batched YOLO call.
+    """
+    if DETECTION_BATCH_WAIT_MS > 0:
+        return batcher.submit(img)
+    return detect_batch([img])[0]
+
+def _store(key, result):
+    detections = detections_json(result)
+    detection_cache.put(key, detections, encode_image(result.plot()))
+    return detections
+
+def process_upload(data):
+    """
+    Detect cards in one uploaded image, reusing the cached result of identical bytes.
+
+    Args:
+        data (bytes): Uploaded file content
+    Returns:
+        tuple: (cache key, detections), or None if the bytes are not an image
+    """
+    key = detection_cache.key(data, model_version())
+    detections = detection_cache.get(key)
+    if detections is not None:
+        return key, detections
+    img = decode_image(data)
+    if img is None:
+        return None
+    return key, _store(key, detect_image(img))
+
+def process_uploads(uploads):
+    """
+    Batched process_upload: cache misses share batched YOLO calls.
+
+    Args:
+        uploads (list): Uploaded file contents
+    Returns:
+        list: (cache key, detections) or None per upload, in input order
+    """
+    version = model_version()
+    outputs, misses = [], []
+    for position, data in enumerate(uploads):
+        key = detection_cache.key(data, version)
+        detections = detection_cache.get(key)
+        if detections is None:
+            img = decode_image(data)
+            if img is not None:
+                misses.append((position, key, img))
+        outputs.append((key, detections) if detections is not None else None)
+    results = detect_batch([img for _, _, img in misses])
+    for (position, key, _), result in zip(misses, results):
+        outputs[position] = (key, _store(key, result))
+    return outputs
@@ -1,171 +1,206 @@
-import pandas as pd
-from sentence_transformers import SentenceTransformer
-import faiss
 import numpy as np
-import ollama
-import os
+import atexit
 import logging
-from PyPDF2 import PdfReader
-from pathlib import Path
-import pickle
-import torch
-device = 'cuda' if torch.cuda.is_available() else 'cpu'
-print(device)
+from tasks.knowledge_base import EMBEDDING_MODEL, qa_dataset_path, sync_knowledge_base
+from tasks.context_packer import CONTEXT_TOKEN_BUDGET, pack_context
+from tasks.answer_cache import SemanticAnswerCache
+from tasks.faq_index import FAQIndex
+from tasks.llm_gateway import LLM_MODEL, GatewayBusy, llm_gateway
+from tasks.model_registry import registry
+from tasks.retrieval_cache import normalize_query, retrieval_cache
+from tasks.vector_index import prepare_queries
 logger = logging.getLogger(__name__)
 
-CSV_PATH = "data/combined_dataset.csv"
-DOCS_DIR = "static/documents"
-MODEL = "llama3.2:latest"  
-embedder = SentenceTransformer('multi-qa-MiniLM-L6-cos-v1', device=device)
+MODEL = LLM_MODEL
+answer_cache = SemanticAnswerCache()
+atexit.register(answer_cache.flush)
+faq_index = FAQIndex()
 
 
-def extract_text_from_pdf(pdf_path):
-    """Extract text from a PDF file."""
-    try:
-        text = ""
-        with open(pdf_path, 'rb') as file:
-            reader = PdfReader(file)
-            for page in reader.pages:
-                text += page.extract_text() + "\n"
-        return text
-    except Exception as e:
-        logger.error(f"Error extracting text from PDF {pdf_path}: {e}")
-        return ""
+def load_embedder():
+    """Load the sentence embedding model, on the GPU when one is available."""
+    import torch
+    from sentence_transformers import SentenceTransformer
+    device = 'cuda' if torch.cuda.is_available() else 'cpu'
+    logger.info(f"Loading {EMBEDDING_MODEL} on {device}")
+    return SentenceTransformer(EMBEDDING_MODEL, device=device)
 
-def extract_text_from_txt(txt_path):
-    """Extract text from a plain text file."""
-    try:
-        with open(txt_path, 'r', encoding='utf-8') as file:
-            return file.read()
-    except UnicodeDecodeError:
-        try:
-            with open(txt_path, 'r', encoding='latin-1') as file:
-                return file.read()
-        except Exception as e:
-            logger.error(f"Error reading text file {txt_path}: {e}")
-            return ""
-    except Exception as e:
-        logger.error(f"Error reading text file {txt_path}: {e}")
-        return ""
+registry.register("embedder", load_embedder)
 
-def chunk_text(text, chunk_size=1000, overlap=100):
-    """Split text into overlapping chunks for better context retrieval."""
-    words = text.split()
-    chunks = []
-    
-    if not words:
-        return chunks
-        
-    for i in range(0, len(words), chunk_size - overlap):
-        chunk = " ".join(words[i:i + chunk_size])
-        if chunk:
-            chunks.append(chunk)
-    return chunks
-
-def load_knowledge_base():
-    """Load and prepare the knowledge base from CSV and document files."""
-    if os.path.exists("faiss_index.index") and os.path.exists("chunks.pkl"):
-        index = faiss.read_index("faiss_index.index")
-        with open("chunks.pkl", "rb") as f:
-            all_chunks = pickle.load(f)
-        logger.info("Loaded FAISS index and chunks from cache.")
-        return index, all_chunks
-    all_chunks = []
-    
+def get_embedder():
+    return registry.get("embedder")
+
+def load_knowledge_base(rebuild=False):
+    """
+    Load the knowledge base, re-embedding only sources that changed.
+
+    Returns:
+        tuple: (index, chunks) where chunks is a ChunkStore mapping FAISS IDs
+            to chunk text
+    """
+    embedder = get_embedder()
+    answer_cache.load(embedder.get_sentence_embedding_dimension())
+    index, chunks, manifest = sync_knowledge_base(embedder, rebuild=rebuild)
+    retrieval_cache.set_version(manifest["version"])
+    answer_cache.set_version(manifest["version"])
+    faq_index.load(qa_dataset_path(), embedder)
+    return index, chunks
+
+registry.register("knowledge_base", load_knowledge_base)
+
+def embed_query(query):
+    """Embed a query, reusing the embedding of previously seen questions."""
+    key = normalize_query(query)
+    embedding = retrieval_cache.embeddings.get(key)
+    if embedding is None:
+        embedding = np.asarray(get_embedder().encode([key], convert_to_tensor=False)[0], dtype='float32')
+        retrieval_cache.embeddings.put(key, embedding)
+    return embedding
+
+def answer_faq(query):
+    """Return the curated dataset answer when the query is a known question, else None."""
     try:
-        if os.path.exists(CSV_PATH):
-            df = pd.read_csv(CSV_PATH, encoding="utf-8")
-            if len(df.columns) >= 2: 
-                for _, row in df.iterrows():
-                    question = row.iloc[0]  
-                    answer = row.iloc[1]
-                    all_chunks.append(f"Question: {question} Answer: {answer}")
-            logger.info(f"Loaded {len(df)} QA pairs from CSV")
-        else:
-            logger.warning(f"CSV file not found: {CSV_PATH}")
+        return faq_index.match(query, embed_query(query))
     except Exception as e:
-        logger.error(f"Error loading CSV: {e}")
-    
-    if os.path.exists(DOCS_DIR):
-        for filename in os.listdir(DOCS_DIR):
-            filepath = os.path.join(DOCS_DIR, filename)
-            try:
-                if filename.lower().endswith('.pdf'):
-                    text = extract_text_from_pdf(filepath)
-                    text_chunks = chunk_text(text)
-                    all_chunks.extend(text_chunks)
-                    logger.info(f"Loaded PDF: {filename}, {len(text_chunks)} chunks extracted")
-                
-                elif filename.lower().endswith('.txt'):
-                    text = extract_text_from_txt(filepath)
-                    text_chunks = chunk_text(text)
-                    all_chunks.extend(text_chunks)
-                    logger.info(f"Loaded TXT: {filename}, {len(text_chunks)} chunks extracted")
-            except Exception as e:
-                logger.error(f"Error processing file {filename}: {e}")
-    else:
-        logger.warning(f"Documents directory not found: {DOCS_DIR}")
-        Path(DOCS_DIR).mkdir(exist_ok=True, parents=True)
-    
-    if all_chunks:
-        embeddings = embedder.encode(all_chunks, convert_to_tensor=False)
-        dimension = embeddings.shape[1]
-        index = faiss.IndexFlatL2(dimension)
-        index.add(np.array(embeddings, dtype='float32'))
-        logger.info(f"Created FAISS index with {len(all_chunks)} chunks")
-        faiss.write_index(index, "faiss_index.index")
-        with open("chunks.pkl", "wb") as f:
-            pickle.dump(all_chunks, f)
-        logger.info("FAISS index and chunks saved to disk.")
-        return index, all_chunks
-    else:
-        sample_embedding = embedder.encode(["Placeholder text"], convert_to_tensor=False)
-        dimension = sample_embedding.shape[1]
-        index = faiss.IndexFlatL2(dimension)
-        logger.warning("Created empty FAISS index - no knowledge base content found")
-        return index, ["No information available. Please add documents to the knowledge base."]
-
-def retrieve_context(query, index, chunks, k=5):
-    """Retrieve the most relevant chunks for a given query."""
+        logger.error(f"Error matching FAQ: {e}")
+        return None
+
+def retrieve_context(query, index, chunks, k=5, budget=CONTEXT_TOKEN_BUDGET):
+    """
+    Retrieve the most relevant chunks for a given query.
+
+    The chunks are packed into `budget` prompt tokens in relevance order,
+    with text repeated across chunks kept only once.
+    """
     try:
-        query_embedding = embedder.encode([query], convert_to_tensor=False)
-        distances, indices = index.search(np.array(query_embedding, dtype='float32'), k=k)
+        result_key = (normalize_query(query), k, retrieval_cache.version)
+        chunk_ids = retrieval_cache.results.get(result_key)
+        if chunk_ids is None:
+            query_embedding = embed_query(query)[None, :]
+            distances, indices = index.search(prepare_queries(index, query_embedding), k=k)
+            chunk_ids = [int(idx) for idx in indices[0] if idx >= 0]
+            retrieval_cache.results.put(result_key, chunk_ids)
         
-        relevant_chunks = []
-        for idx in indices[0]:
-            if idx < len(chunks):
-                relevant_chunks.append(chunks[idx])
+        chunk_ids = [idx for idx in chunk_ids if idx in chunks]
+        relevant_chunks = [chunks[idx] for idx in chunk_ids]
+        token_counts = [chunks.tokens(idx) for idx in chunk_ids]
+        if None in token_counts:
+            token_counts = None
         
-        return relevant_chunks
+        return pack_context(relevant_chunks, token_counts, budget)
     except Exception as e:
         logger.error(f"Error retrieving context: {e}")
         return ["Unable to retrieve relevant information."]
     
 
+def build_messages(query, context):
+    """Build the chat messages sent to the language model."""
+    context_text = "\n\n".join(context)
+    
+    return [
+        {"role": "system", "content": """You are a knowledgeable assistant specializing in refugee support. 
+        Respond clearly and concisely, focusing on the user's query. 
+        Avoid acknowledging repetitions or stating that the question has been asked before.
+        If the context does not contain enough information, acknowledge the limitations and provide general guidance.
+        Be empathetic, supportive, and focus on practical solutions. Use simple language that's easy to understand.
+        Always maintain a respectful and helpful tone.
+         Respond in a concise (2 or 4 sentences) but conversational way"""},
+        {"role": "user", "content": f"Context: {context_text}\n\nQuestion: {query}"}
+    ]
+
 def generate_response(query, context):
-    """Generate a response using a language model with the retrieved context."""
+    """
+    Generate a response using a language model with the retrieved context.
+
+    Raises:
+        GatewayBusy: Too many generations are already queued
+    """
     try:
-        context_text = "\n\n".join(context)
+        query_embedding = embed_query(query)
+        cached = answer_cache.lookup(query_embedding, context)
+        if cached is not None:
+            return cached
         
-        messages = [
-            {"role": "system", "content": """You are a knowledgeable assistant specializing in refugee support. 
-            Respond clearly and concisely, focusing on the user's query. 
-            Avoid acknowledging repetitions or stating that the question has been asked before.
-            If the context does not contain enough information, acknowledge the limitations and provide general guidance.
-            Be empathetic, supportive, and focus on practical solutions. Use simple language that's easy to understand.
-            Always maintain a respectful and helpful tone.
-             Respond in a concise (2 or 4 sentences) but conversational way"""},
-            {"role": "user", "content": f"Context: {context_text}\n\nQuestion: {query}"}
-        ]
+        messages = build_messages(query, context)
         
         try:
-            response = ollama.chat(model=MODEL, messages=messages)
-            answer = response['message']['content']
+            answer = llm_gateway.chat(messages)
+            answer_cache.store(query, query_embedding, context, answer)
             return answer
+        except GatewayBusy:
+            raise
         except Exception as e:
             logger.error(f"Error with language model: {e}")
             return "I'm sorry, I'm having trouble generating a response right now. Please try again later."
     
+    except GatewayBusy:
+        raise
+    except Exception as e:
+        logger.error(f"Error generating response: {e}")
+        return "I apologize, but I encountered an error while processing your question."
+
+def generate_response_stream(query, context):
+    """
+    Stream a response from the language model token by token.
+
+    A near-duplicate of an already answered question is served from the
+    semantic answer cache as a single piece. The generation is admitted
+    here, before anything is streamed; closing the returned iterator
+    cancels it, whether or not iteration has started.
+
+    Returns:
+        iterator: Pieces of the answer as Ollama produces them
+    Raises:
+        GatewayBusy: Too many generations are already queued
+    """
+    try:
+        query_embedding = embed_query(query)
+        cached = answer_cache.lookup(query_embedding, context)
+        if cached is not None:
+            return iter([cached])
+        pieces = llm_gateway.stream(build_messages(query, context))
+    except GatewayBusy:
+        raise
     except Exception as e:
         logger.error(f"Error generating response: {e}")
-        return "I apologize, but I encountered an error while processing your question."
\ No newline at end of file
+        return iter(["I apologize, but I encountered an error while processing your question."])
+    return AnswerStream(_stream_answer(query, query_embedding, context, pieces), pieces)
+
+
+class AnswerStream:
+    """
+    Iterator over a streamed answer whose `close` cancels the generation.
+
+    Closing a generator that has not started skips its `finally`, so the
+    gateway stream is closed here directly rather than left to the generator.
+    """
+
+    def __init__(self, tokens, pieces):
+        self._tokens = tokens
+        self._pieces = pieces
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return next(self._tokens)
+
+    def close(self):
+        self._tokens.close()
+        self._pieces.close()
+
+
+def _stream_answer(query, query_embedding, context, pieces):
+    answer = []
+    try:
+        for token in pieces:
+            answer.append(token)
+            yield token
+        if answer:
+            answer_cache.store(query, query_embedding, context, "".join(answer))
+    except Exception as e:
+        logger.error(f"Error with language model: {e}")
+        if not answer:
+            yield "I'm sorry, I'm having trouble generating a response right now. Please try again later."
+    finally:
+        pieces.close()
@@ -0,0 +1,141 @@
+import numpy as np
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+OFFSET_DTYPE = np.dtype([("id", "<i8"), ("offset", "<i8"), ("length", "<i8"), ("tokens", "<i8")])
+
+
+def _map(path, dtype):
+    if not os.path.exists(path) or os.path.getsize(path) == 0:
+        return np.zeros(0, dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode='r')
+
+
+class ChunkStore:
+    """
+    Chunk texts by ID, read on demand from memory-mapped files.
+
+    `text_path` holds the UTF-8 texts back to back, and `offsets_path` holds
+    one (id, offset, length, tokens) record per chunk, sorted by ID. Both
+    files are mapped read-only, so every worker process shares the same
+    page-cache pages and a lookup is a binary search plus one slice.
+
+    Added texts are appended to a spill file next to `text_path` as they
+    arrive, so only their offsets and the removed IDs are kept in memory
+    until `save` writes a new pair of files, copying texts from the old
+    mapping and the spill file without decoding them. With `load=False` the
+    store starts empty and `save` replaces whatever the files held.
+    """
+
+    def __init__(self, text_path, offsets_path, load=True):
+        self.text_path = text_path
+        self.offsets_path = offsets_path
+        self._text = _map(text_path, np.uint8) if load else np.zeros(0, dtype=np.uint8)
+        self._offsets = _map(offsets_path, OFFSET_DTYPE) if load else np.zeros(0, dtype=OFFSET_DTYPE)
+        self._ids = self._offsets["id"]
+        self.spill_path = f"{text_path}.added"
+        self._spill = None
+        self._spill_size = 0
+        self._added = {}
+        self._removed = set()
+
+    def _find(self, chunk_id):
+        if chunk_id in self._removed:
+            return None
+        pos = int(np.searchsorted(self._ids, chunk_id))
+        if pos < len(self._ids) and self._ids[pos] == chunk_id:
+            return self._offsets[pos]
+        return None
+
+    def _read_added(self, chunk_id):
+        offset, length, _ = self._added[chunk_id]
+        self._spill.seek(offset)
+        return self._spill.read(length)
+
+    def get(self, chunk_id, default=None):
+        if chunk_id in self._added:
+            return self._read_added(chunk_id).decode('utf-8')
+        record = self._find(chunk_id)
+        if record is None:
+            return default
+        start = int(record["offset"])
+        return self._text[start:start + int(record["length"])].tobytes().decode('utf-8')
+
+    def tokens(self, chunk_id):
+        """Token count stored with the chunk, or None if unknown."""
+        if chunk_id in self._added:
+            return self._added[chunk_id][2]
+        record = self._find(chunk_id)
+        return None if record is None else int(record["tokens"])
+
+    def __getitem__(self, chunk_id):
+        text = self.get(chunk_id)
+        if text is None:
+            raise KeyError(chunk_id)
+        return text
+
+    def __contains__(self, chunk_id):
+        return chunk_id in self._added or self._find(chunk_id) is not None
+
+    def __len__(self):
+        return len(self._ids) - len(self._removed) + len(self._added)
+
+    def add(self, chunk_id, text, tokens):
+        if self._spill is None:
+            # Leftovers of an interrupted build are overwritten.
+            self._spill = open(self.spill_path, 'w+b')
+        data = text.encode('utf-8')
+        self._spill.seek(self._spill_size)
+        self._spill.write(data)
+        self._added[chunk_id] = (self._spill_size, len(data), tokens)
+        self._spill_size += len(data)
+
+    def discard(self, chunk_id):
+        if self._added.pop(chunk_id, None) is None and self._find(chunk_id) is not None:
+            self._removed.add(chunk_id)
+
+    def save(self):
+        """
+        Write the current chunks to fresh files and return a store mapping them.
+
+        The files are replaced atomically, so processes still mapping the
+        previous version keep reading it until they reopen.
+        """
+        keep = np.ones(len(self._offsets), dtype=bool)
+        if self._removed:
+            keep &= ~np.isin(self._ids, np.fromiter(self._removed, dtype='int64'))
+        records = np.zeros(int(keep.sum()) + len(self._added), dtype=OFFSET_DTYPE)
+
+        text_tmp, offsets_tmp = f"{self.text_path}.tmp", f"{self.offsets_path}.tmp"
+        position, row = 0, 0
+        pending = iter(sorted(self._added.items()))
+        added = next(pending, None)
+        with open(text_tmp, 'wb') as f:
+            def write(chunk_id, data, tokens):
+                nonlocal position, row
+                f.write(data)
+                records[row] = (chunk_id, position, len(data), tokens)
+                position += len(data)
+                row += 1
+
+            for record in self._offsets[keep]:
+                while added is not None and added[0] < record["id"]:
+                    write(added[0], self._read_added(added[0]), added[1][2])
+                    added = next(pending, None)
+                start = int(record["offset"])
+                write(int(record["id"]), self._text[start:start + int(record["length"])].tobytes(),
+                      int(record["tokens"]))
+            while added is not None:
+                write(added[0], self._read_added(added[0]), added[1][2])
+                added = next(pending, None)
+        records.tofile(offsets_tmp)
+
+        os.replace(text_tmp, self.text_path)
+        os.replace(offsets_tmp, self.offsets_path)
+        if self._spill is not None:
+            self._spill.close()
+            os.remove(self.spill_path)
+        logger.info(f"Chunk store saved: {len(records)} chunks, {position / 1024 / 1024:.1f} MB of text")
+        return ChunkStore(self.text_path, self.offsets_path)
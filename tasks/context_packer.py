@@ -0,0 +1,137 @@
+import hashlib
+import re
+import os
+
+CHUNK_TOKENS = int(os.environ.get("KB_CHUNK_TOKENS", "200"))
+CHUNK_OVERLAP_TOKENS = int(os.environ.get("KB_CHUNK_OVERLAP_TOKENS", "40"))
+CONTEXT_TOKEN_BUDGET = int(os.environ.get("CONTEXT_TOKEN_BUDGET", "1000"))
+
+TOKEN_PATTERN = re.compile(r'\w+|[^\w\s]')
+PARAGRAPH_BOUNDARY = re.compile(r'\n\s*\n')
+SENTENCE_BOUNDARY = re.compile(r'(?<=[.!?؟。])\s+')
+
+
+def count_tokens(text):
+    """
+    Approximate the prompt tokens of a text.
+
+    Counts words and punctuation marks, which tracks the llama3 tokenizer
+    closely enough for budgeting without loading it.
+    """
+    return len(TOKEN_PATTERN.findall(text))
+
+def chunking_config():
+    """Chunking settings recorded in the knowledge-base manifest."""
+    return {"unit": "sentence", "max_tokens": CHUNK_TOKENS, "overlap_tokens": CHUNK_OVERLAP_TOKENS}
+
+def split_paragraphs(text):
+    """Split text on blank lines, joining hard-wrapped lines inside a paragraph."""
+    paragraphs = (re.sub(r'\s+', ' ', p).strip() for p in PARAGRAPH_BOUNDARY.split(text))
+    return [p for p in paragraphs if p]
+
+def split_sentences(paragraph):
+    return [s for s in SENTENCE_BOUNDARY.split(paragraph) if s]
+
+def _split_long(sentence, max_tokens):
+    """Cut a sentence longer than the chunk size into word windows."""
+    window, tokens = [], 0
+    for word in sentence.split():
+        n = count_tokens(word)
+        if window and tokens + n > max_tokens:
+            yield " ".join(window)
+            window, tokens = [], 0
+        window.append(word)
+        tokens += n
+    if window:
+        yield " ".join(window)
+
+def iter_sentence_chunks(pieces, max_tokens=CHUNK_TOKENS, overlap_tokens=CHUNK_OVERLAP_TOKENS):
+    """
+    Yield (chunk, token_count) pairs built from whole sentences.
+
+    Sentences are added to the current chunk until the next one would
+    exceed `max_tokens`. A chunk that is at least half full is also closed
+    at the end of a paragraph, so chunks rarely straddle two topics. Inside
+    a paragraph, the trailing sentences worth up to `overlap_tokens` are
+    repeated at the start of the next chunk.
+
+    Args:
+        pieces (iterable): Text pieces in reading order (e.g. PDF pages)
+        max_tokens (int): Token limit per chunk
+        overlap_tokens (int): Tokens carried over between chunks of a paragraph
+    """
+    current = []  # (sentence, tokens)
+    current_tokens = 0
+
+    def emit():
+        return " ".join(s for s, _ in current), current_tokens
+
+    for piece in pieces:
+        for paragraph in split_paragraphs(piece):
+            for sentence in split_sentences(paragraph):
+                n = count_tokens(sentence)
+                parts = [(sentence, n)] if n <= max_tokens else [
+                    (part, count_tokens(part)) for part in _split_long(sentence, max_tokens)]
+                for part, n in parts:
+                    if current and current_tokens + n > max_tokens:
+                        yield emit()
+                        carried, carried_tokens = [], 0
+                        for s, t in reversed(current):
+                            if carried_tokens + t > overlap_tokens or carried_tokens + t + n > max_tokens:
+                                break
+                            carried.insert(0, (s, t))
+                            carried_tokens += t
+                        current, current_tokens = carried, carried_tokens
+                    current.append((part, n))
+                    current_tokens += n
+            if current and current_tokens >= max_tokens // 2:
+                yield emit()
+                current, current_tokens = [], 0
+    if current:
+        yield emit()
+
+def _sentence_key(sentence):
+    return hashlib.sha1(re.sub(r'\W+', ' ', sentence).strip().lower().encode('utf-8')).hexdigest()
+
+def pack_context(chunks, token_counts=None, budget=CONTEXT_TOKEN_BUDGET):
+    """
+    Fill a prompt token budget with retrieved chunks in relevance order.
+
+    Sentences already included by a more relevant chunk (chunk overlap or
+    the same passage in two sources) are dropped. A chunk that does not fit
+    whole is cut at a sentence boundary, and packing stops once the budget
+    is used.
+
+    Args:
+        chunks (list): Chunk texts, most relevant first
+        token_counts (list): Stored token count of each chunk, or None to count
+        budget (int): Maximum context tokens
+    Returns:
+        list: Context passages to put in the prompt
+    """
+    packed, seen, used = [], set(), 0
+    for position, chunk in enumerate(chunks):
+        sentences = split_sentences(chunk)
+        keys = [_sentence_key(s) for s in sentences]
+        fresh = [s for s, key in zip(sentences, keys) if key not in seen]
+        if not fresh:
+            continue
+        if len(fresh) == len(sentences) and token_counts is not None:
+            tokens = token_counts[position]
+        else:
+            tokens = count_tokens(" ".join(fresh))
+        if used + tokens > budget:
+            kept = []
+            for sentence in fresh:
+                n = count_tokens(sentence)
+                if used + n > budget:
+                    break
+                kept.append(sentence)
+                used += n
+            if kept:
+                packed.append(" ".join(kept))
+            break
+        packed.append(" ".join(fresh))
+        seen.update(keys)
+        used += tokens
+    return packed
@@ -1,18 +1,147 @@
-import pandas as pd
+import numpy as np
+import argparse
+import logging
+import time
+import os
 
-def prepare_data(csv1_path, csv2_path, output_path):
-    dataset1 = pd.read_csv(csv1_path,sep=',')
-    dataset2 = pd.read_csv(csv2_path,sep=',')
+logger = logging.getLogger(__name__)
 
-    combined_data = pd.concat([dataset1, dataset2], ignore_index=True)
+QA_SOURCES = ["data/refugee_questions_answers.csv", "data/refugee_questions_answers2.csv"]
+QA_DATASET_PATH = os.environ.get("QA_DATASET_PATH", "data/qa_dataset.parquet")
+READ_CHUNK_ROWS = int(os.environ.get("QA_READ_CHUNK_ROWS", "50000"))
+COLUMNS = ["id", "question", "answer", "source"]
 
-    combined_data = combined_data[['Question', 'Answer']]
 
-    combined_data.to_csv(output_path, index=False)
-    print(f"Combined dataset saved to {output_path}")
+def normalize_column(values):
+    """
+    Normalize a text column for near-duplicate detection.
 
-csv1_path = "data/refugee_questions_answers.csv"
-csv2_path = "data/refugee_questions_answers2.csv"
-output_path = "data/combined_dataset.csv"
+    NFKC, case folding, punctuation removal and whitespace collapsing, so
+    'What is asylum?' and 'what is  asylum' share a key.
+    """
+    return (values.str.normalize('NFKC').str.casefold()
+            .str.replace(r'[^\w\s]', ' ', regex=True)
+            .str.replace(r'\s+', ' ', regex=True).str.strip())
 
-prepare_data(csv1_path, csv2_path, output_path)
\ No newline at end of file
+def pair_keys(questions, answers):
+    """
+    64-bit keys of (question, answer) pairs.
+
+    Computed with pandas' fixed-key SipHash, so the same pair gets the same
+    key on every run and machine; the keys double as stable row IDs.
+    """
+    import pandas as pd
+    frame = pd.DataFrame({"question": questions.to_numpy(), "answer": answers.to_numpy()})
+    return pd.util.hash_pandas_object(frame, index=False).to_numpy().view(np.int64)
+
+def iter_qa_frames(path, chunk_rows=READ_CHUNK_ROWS):
+    """
+    Stream (question, answer) frames out of one QA source.
+
+    CSV files are read `chunk_rows` rows at a time and Parquet files one row
+    group at a time. The `Question`/`Answer` (or `question`/`answer`)
+    columns are used when present, otherwise the first two columns.
+    """
+    import pandas as pd
+    if path.lower().endswith('.parquet'):
+        import pyarrow.parquet as pq
+        parquet = pq.ParquetFile(path)
+        frames = (parquet.read_row_group(i).to_pandas() for i in range(parquet.num_row_groups))
+    else:
+        frames = pd.read_csv(path, encoding="utf-8", dtype=str, keep_default_na=False, chunksize=chunk_rows)
+    for frame in frames:
+        for names in (["Question", "Answer"], ["question", "answer"]):
+            if set(names) <= set(frame.columns):
+                frame = frame[names]
+                break
+        else:
+            if len(frame.columns) < 2:
+                logger.warning(f"Skipping {path}: fewer than two columns")
+                return
+            frame = frame.iloc[:, :2]
+        frame.columns = ["question", "answer"]
+        yield frame.fillna("").astype(str)
+
+def prepare_data(sources=QA_SOURCES, output_path=QA_DATASET_PATH, chunk_rows=READ_CHUNK_ROWS):
+    """
+    Merge QA sources into one deduplicated Parquet dataset.
+
+    Sources are streamed in chunks and rows are written as they are
+    accepted, so memory holds one chunk plus the set of seen keys. Pairs
+    with an empty side are dropped, and a pair whose normalized question
+    and answer were already seen is dropped whether it repeats exactly or
+    differs only in case, punctuation or spacing. The first occurrence is
+    kept. Each row's `id` is the key of its normalized pair, so it stays
+    the same across rebuilds. The file is written atomically.
+
+    Args:
+        sources (list): CSV or Parquet files, merged in order
+        output_path (str): Parquet file to write
+        chunk_rows (int): CSV rows read per chunk
+    Returns:
+        dict: Row counts per outcome and the build time
+    """
+    import pandas as pd
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    start = time.perf_counter()
+    schema = pa.schema([("id", pa.int64()), ("question", pa.string()),
+                        ("answer", pa.string()), ("source", pa.string())])
+    report = {"rows_read": 0, "empty": 0, "exact_duplicates": 0, "near_duplicates": 0, "rows_written": 0}
+    seen_exact = seen = np.zeros(0, dtype=np.int64)
+
+    if os.path.dirname(output_path):
+        os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    tmp_path = f"{output_path}.tmp"
+    with pq.ParquetWriter(tmp_path, schema) as writer:
+        for source in sources:
+            if not os.path.exists(source):
+                logger.warning(f"QA source not found: {source}")
+                continue
+            for frame in iter_qa_frames(source, chunk_rows):
+                report["rows_read"] += len(frame)
+                questions, answers = frame["question"].str.strip(), frame["answer"].str.strip()
+                filled = (questions != "") & (answers != "")
+                report["empty"] += int((~filled).sum())
+                questions, answers = questions[filled], answers[filled]
+
+                exact = pair_keys(questions, answers)
+                keys = pair_keys(normalize_column(questions), normalize_column(answers))
+                repeated = pd.Series(keys).duplicated().to_numpy() | np.isin(keys, seen)
+                exact_repeat = pd.Series(exact).duplicated().to_numpy() | np.isin(exact, seen_exact)
+                report["exact_duplicates"] += int((repeated & exact_repeat).sum())
+                report["near_duplicates"] += int((repeated & ~exact_repeat).sum())
+                keep = ~repeated
+                seen_exact = np.concatenate([seen_exact, exact])
+                seen = np.concatenate([seen, keys[keep]])
+
+                if keep.any():
+                    writer.write_table(pa.Table.from_pandas(pd.DataFrame({
+                        "id": keys[keep],
+                        "question": questions.to_numpy()[keep],
+                        "answer": answers.to_numpy()[keep],
+                        "source": os.path.basename(source),
+                    }), schema=schema, preserve_index=False))
+                    report["rows_written"] += int(keep.sum())
+    os.replace(tmp_path, output_path)
+
+    report["seconds"] = round(time.perf_counter() - start, 3)
+    logger.info(f"QA dataset saved to {output_path}: {report['rows_written']} of {report['rows_read']} rows "
+                f"({report['exact_duplicates']} exact and {report['near_duplicates']} near duplicates, "
+                f"{report['empty']} empty) in {report['seconds']:.2f}s")
+    return report
+
+def read_qa_dataset(path=QA_DATASET_PATH):
+    """Read the built dataset as a DataFrame with COLUMNS."""
+    import pandas as pd
+    return pd.read_parquet(path, columns=COLUMNS)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the deduplicated QA dataset used by the chatbot.")
+    parser.add_argument("sources", nargs="*", default=QA_SOURCES, help="CSV or Parquet QA files, in priority order")
+    parser.add_argument("--output", default=QA_DATASET_PATH, help="Parquet file to write")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    print(prepare_data(args.sources, args.output))
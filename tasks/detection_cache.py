@@ -0,0 +1,135 @@
+from collections import OrderedDict
+import threading
+import hashlib
+import logging
+import json
+import os
+
+logger = logging.getLogger(__name__)
+
+DETECTION_CACHE_DIR = os.environ.get("DETECTION_CACHE_DIR", "cache/detections")
+DETECTION_CACHE_MAX_BYTES = int(os.environ.get("DETECTION_CACHE_MAX_MB", "512")) * 1024 * 1024
+ANNOTATED_SUFFIX = ".jpg"
+
+
+class DetectionCache:
+    """
+    Content-addressed store of detection results and annotated images.
+
+    An entry is keyed by the SHA-256 of the uploaded bytes and the detector
+    version, so re-uploading the same scan returns the stored detections
+    without inference, and a new model never serves stale results. Each
+    entry is two files under `path`: `<key>.json` with the detections and
+    `<key>.jpg` with the annotated image, which is served directly.
+    The least recently used entries are deleted once the files exceed
+    `max_bytes`; recency survives restarts through file mtimes. The
+    directory is created by the first `put`.
+    """
+
+    def __init__(self, path=DETECTION_CACHE_DIR, max_bytes=DETECTION_CACHE_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # key -> size in bytes, least recent first
+        self._lock = threading.Lock()
+        self.used_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._scan()
+
+    def _files(self, key):
+        return os.path.join(self.path, f"{key}.json"), os.path.join(self.path, f"{key}{ANNOTATED_SUFFIX}")
+
+    def _scan(self):
+        if not os.path.isdir(self.path):
+            return
+        found = []
+        for name in os.listdir(self.path):
+            if not name.endswith(".json"):
+                continue
+            key = name[:-len(".json")]
+            json_path, image_path = self._files(key)
+            try:
+                stat = os.stat(json_path)
+                size = stat.st_size + os.path.getsize(image_path)
+            except OSError:
+                continue
+            found.append((stat.st_mtime, key, size))
+        for _, key, size in sorted(found):
+            self._entries[key] = size
+            self.used_bytes += size
+
+    @staticmethod
+    def key(data, model_version):
+        """Cache key of an uploaded image for a detector version."""
+        return f"{hashlib.sha256(data).hexdigest()}-{model_version}"
+
+    def image_name(self, key):
+        return f"{key}{ANNOTATED_SUFFIX}"
+
+    def get(self, key):
+        """Return the stored detections, or None."""
+        with self._lock:
+            if key not in self._entries:
+                self.misses += 1
+                return None
+            json_path, _ = self._files(key)
+            try:
+                with open(json_path, 'r', encoding='utf-8') as f:
+                    detections = json.load(f)
+                os.utime(json_path)
+            except (OSError, ValueError) as e:
+                logger.warning(f"Dropping unreadable detection cache entry {key}: {e}")
+                self._delete(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return detections
+
+    def put(self, key, detections, annotated):
+        """
+        Store detections and the encoded annotated image.
+
+        Args:
+            key (str): From DetectionCache.key
+            detections (list): Detection dicts
+            annotated (bytes): Encoded annotated image
+        """
+        data = json.dumps(detections).encode('utf-8')
+        json_path, image_path = self._files(key)
+        with self._lock:
+            os.makedirs(self.path, exist_ok=True)
+            for path, content in ((image_path, annotated), (json_path, data)):
+                with open(f"{path}.tmp", 'wb') as f:
+                    f.write(content)
+                os.replace(f"{path}.tmp", path)
+            self.used_bytes += len(data) + len(annotated) - self._entries.pop(key, 0)
+            self._entries[key] = len(data) + len(annotated)
+            while self.used_bytes > self.max_bytes and len(self._entries) > 1:
+                self._delete(next(iter(self._entries)))
+                self.evictions += 1
+
+    def _delete(self, key):
+        self.used_bytes -= self._entries.pop(key, 0)
+        for path in self._files(key):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "used_bytes": self.used_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+detection_cache = DetectionCache()
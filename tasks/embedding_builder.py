@@ -0,0 +1,224 @@
+import numpy as np
+import platform
+import random
+import hashlib
+import logging
+import shutil
+import json
+import time
+import os
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+EMBED_WORKERS = int(os.environ.get("KB_EMBED_WORKERS", "1"))
+ENCODE_BATCH_SIZE = int(os.environ.get("KB_ENCODE_BATCH_SIZE", "0"))  # 0 autotunes
+# Knowledge-base builds pass the paths under KB_STATE_DIR instead.
+CHECKPOINT_DIR = "kb_checkpoints"
+AUTOTUNE_PATH = "embedding_autotune.json"
+AUTOTUNE_CANDIDATES = (8, 16, 32, 64, 128, 256)
+AUTOTUNE_SAMPLE = 256
+DEFAULT_BATCH_SIZE = 32  # used until this host has been autotuned
+
+
+def text_key(text, model_name=""):
+    """Checkpoint key of a text's embedding; vectors of another model never match."""
+    return hashlib.sha1(f"{model_name}\x00{text}".encode('utf-8')).hexdigest()
+
+def _host_key(model_name, workers):
+    return f"{model_name}|{platform.machine()}|{os.cpu_count()}|{workers}"
+
+def _load_tuned(path):
+    if not os.path.exists(path):
+        return {}
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def tuned_batch_size(model_name="", workers=1, path=AUTOTUNE_PATH):
+    """The batch size stored by a previous autotune on this host, or None."""
+    entry = _load_tuned(path).get(_host_key(model_name, workers))
+    return entry["batch_size"] if entry else None
+
+def autotune_batch_size(embedder, sample, model_name="", workers=1, path=AUTOTUNE_PATH):
+    """
+    Pick the encode batch size with the best throughput on this host.
+
+    Candidates are timed on up to AUTOTUNE_SAMPLE texts spread evenly over
+    `sample`; the winner is stored per (model, machine, cpu count, workers)
+    so it is only measured once.
+
+    Args:
+        embedder: SentenceTransformer
+        sample (list): Representative texts
+        model_name (str): Used in the stored key
+        workers (int): Worker processes the size will be used with
+        path (str): JSON file holding tuned sizes
+    Returns:
+        int: Batch size
+    """
+    key = _host_key(model_name, workers)
+    tuned = _load_tuned(path)
+    if key in tuned:
+        return tuned[key]["batch_size"]
+
+    sample = list(sample)[::max(1, len(sample) // AUTOTUNE_SAMPLE)][:AUTOTUNE_SAMPLE]
+    embedder.encode(sample[:8], batch_size=8)
+    timings = {}
+    for batch_size in AUTOTUNE_CANDIDATES:
+        if batch_size > len(sample) and timings:
+            break
+        start = time.perf_counter()
+        embedder.encode(sample, batch_size=batch_size)
+        timings[batch_size] = len(sample) / (time.perf_counter() - start)
+    best = max(timings, key=timings.get)
+    logger.info("Embedding batch size autotune: " +
+                ", ".join(f"{b}={rate:.0f}/s" for b, rate in timings.items()) + f" -> {best}")
+
+    tuned[key] = {"batch_size": best, "chunks_per_second": {str(b): round(r, 1) for b, r in timings.items()}}
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(tuned, f, indent=1)
+    return best
+
+
+class EmbeddingBuilder:
+    """
+    Embedding stage of a knowledge-base build.
+
+    Texts are sorted by length before encoding so batches carry little
+    padding, sharded across a SentenceTransformer multi-process pool when
+    `workers` > 1, and every encoded batch is checkpointed to disk keyed by
+    a hash of the model name and text. A build that is interrupted and
+    restarted only encodes the texts that were not checkpointed yet,
+    whatever order they arrive in, and never reuses another model's vectors.
+
+    With `batch_size` 0 the size autotuned earlier on this host is used.
+    A host that has not been tuned yet embeds with DEFAULT_BATCH_SIZE while
+    keeping a uniform sample of every text it encodes, and is autotuned on
+    that sample once the build completes, so the measurement reflects the
+    whole corpus rather than its first batch.
+
+    Use as a context manager so the worker pool, started on the first
+    encode, is always stopped.
+    """
+
+    def __init__(self, embedder, model_name="", workers=EMBED_WORKERS, batch_size=ENCODE_BATCH_SIZE,
+                 checkpoint_dir=CHECKPOINT_DIR, autotune_path=AUTOTUNE_PATH):
+        self.embedder = embedder
+        self.model_name = model_name
+        self.workers = workers
+        self.batch_size = batch_size or tuned_batch_size(model_name, workers, autotune_path)
+        self._sample = None if self.batch_size else []
+        self._sampled = 0
+        self._rng = random.Random(0)
+        self.batch_size = self.batch_size or DEFAULT_BATCH_SIZE
+        self.checkpoint_dir = Path(checkpoint_dir) if checkpoint_dir else None
+        self.autotune_path = autotune_path
+        self._pool = None
+        self._cached = {}
+        self.encoded = 0
+        self.resumed = 0
+        self.seconds = 0.0
+
+    def __enter__(self):
+        self._load_checkpoints()
+        return self
+
+    def _start_pool(self):
+        if self.workers > 1 and self._pool is None:
+            threads = str(max(1, (os.cpu_count() or 1) // self.workers))
+            previous = os.environ.get("OMP_NUM_THREADS")
+            os.environ["OMP_NUM_THREADS"] = threads
+            try:
+                self._pool = self.embedder.start_multi_process_pool(target_devices=["cpu"] * self.workers)
+            finally:
+                if previous is None:
+                    os.environ.pop("OMP_NUM_THREADS", None)
+                else:
+                    os.environ["OMP_NUM_THREADS"] = previous
+            logger.info(f"Started {self.workers} embedding workers ({threads} threads each)")
+
+    def __exit__(self, exc_type, exc, tb):
+        if self._pool is not None:
+            self.embedder.stop_multi_process_pool(self._pool)
+            self._pool = None
+        if exc_type is None and self._sample:
+            self.batch_size = autotune_batch_size(self.embedder, self._sample, self.model_name,
+                                                  self.workers, self.autotune_path)
+            self._sample = None
+        return False
+
+    def _observe(self, texts):
+        # Reservoir sampling: every encoded text is equally likely to be kept.
+        for text in texts:
+            self._sampled += 1
+            if len(self._sample) < AUTOTUNE_SAMPLE:
+                self._sample.append(text)
+            else:
+                slot = self._rng.randrange(self._sampled)
+                if slot < AUTOTUNE_SAMPLE:
+                    self._sample[slot] = text
+
+    def _load_checkpoints(self):
+        if self.checkpoint_dir is None or not self.checkpoint_dir.exists():
+            return
+        for path in sorted(self.checkpoint_dir.glob("*.npz")):
+            try:
+                with np.load(path) as shard:
+                    for key, vector in zip(shard["keys"], shard["vectors"]):
+                        self._cached[str(key)] = vector
+            except Exception as e:
+                logger.warning(f"Ignoring unreadable embedding checkpoint {path}: {e}")
+        if self._cached:
+            logger.info(f"Resuming embedding build: {len(self._cached)} checkpointed vectors")
+
+    def _checkpoint(self, keys, vectors):
+        if self.checkpoint_dir is None:
+            return
+        self.checkpoint_dir.mkdir(parents=True, exist_ok=True)
+        path = self.checkpoint_dir / f"{keys[0]}.npz"
+        tmp_path = path.with_suffix(".tmp")
+        with open(tmp_path, 'wb') as f:
+            np.savez(f, keys=np.array(keys), vectors=vectors)
+        os.replace(tmp_path, path)
+
+    def _encode(self, texts):
+        if self._sample is not None:
+            self._observe(texts)
+        self._start_pool()
+        if self._pool is not None:
+            # One batch per job, so each worker encodes at the tuned batch size
+            # instead of the small default chunks encode_multi_process would cut.
+            return self.embedder.encode_multi_process(texts, self._pool, batch_size=self.batch_size,
+                                                      chunk_size=self.batch_size)
+        return self.embedder.encode(texts, batch_size=self.batch_size, convert_to_tensor=False)
+
+    def encode(self, texts):
+        """
+        Embed texts, reusing checkpointed vectors.
+
+        Returns:
+            np.ndarray: float32 (len(texts), dimension), aligned with texts
+        """
+        if not texts:
+            return np.zeros((0, self.embedder.get_sentence_embedding_dimension()), dtype='float32')
+        start = time.perf_counter()
+        keys = [text_key(text, self.model_name) for text in texts]
+        missing = sorted({k: i for i, k in enumerate(keys) if k not in self._cached}.values(),
+                         key=lambda i: len(texts[i]))
+        self.resumed += len(texts) - len(missing)
+
+        if missing:
+            vectors = np.asarray(self._encode([texts[i] for i in missing]), dtype='float32')
+            missing_keys = [keys[i] for i in missing]
+            self._checkpoint(missing_keys, vectors)
+            self._cached.update(zip(missing_keys, vectors))
+            self.encoded += len(missing)
+
+        self.seconds += time.perf_counter() - start
+        return np.stack([self._cached[k] for k in keys]).astype('float32')
+
+    def clear_checkpoints(self):
+        """Drop checkpoints once the index they fed has been saved."""
+        self._cached.clear()
+        if self.checkpoint_dir is not None and self.checkpoint_dir.exists():
+            shutil.rmtree(self.checkpoint_dir)
@@ -0,0 +1,164 @@
+import faiss
+import numpy as np
+import threading
+import hashlib
+import logging
+import json
+import os
+
+from tasks.data_preparation import iter_qa_frames, read_qa_dataset
+from tasks.retrieval_cache import normalize_query
+
+logger = logging.getLogger(__name__)
+
+FAQ_INDEX_DIR = os.environ.get("FAQ_INDEX_DIR", "cache/faq")
+FAQ_MATCH_THRESHOLD = float(os.environ.get("FAQ_MATCH_THRESHOLD", "0.9"))
+
+
+def question_key(question):
+    return hashlib.sha1(normalize_query(question).encode('utf-8')).hexdigest()
+
+def read_qa_pairs(path):
+    """
+    Read (question, answer) pairs from the QA dataset.
+
+    Reads the built Parquet dataset, or a CSV with `Question` and `Answer`
+    columns (otherwise its first two columns). Rows missing either side are
+    skipped and repeated questions keep their first answer.
+    """
+    import pandas as pd
+    if path.lower().endswith('.parquet'):
+        df = read_qa_dataset(path)[["question", "answer"]]
+    else:
+        frames = list(iter_qa_frames(path))
+        if not frames:
+            return [], []
+        df = pd.concat(frames, ignore_index=True)
+    df = df[(df["question"].str.strip() != "") & (df["answer"].str.strip() != "")]
+    df = df[~df["question"].map(normalize_query).duplicated()]
+    return df["question"].tolist(), df["answer"].tolist()
+
+
+class FAQIndex:
+    """
+    Direct answers for questions that are already in the QA dataset.
+
+    A query is first looked up by the hash of its normalized text, then by
+    cosine similarity against the embedded dataset questions. A match at or
+    above `threshold` returns the curated answer so the chatbot can skip
+    retrieval and generation. Question embeddings are persisted under
+    `path` keyed by the dataset digest, so they are only computed when the
+    CSV changes.
+    """
+
+    def __init__(self, path=FAQ_INDEX_DIR, threshold=FAQ_MATCH_THRESHOLD):
+        self.path = path
+        self.threshold = threshold
+        self.questions = []
+        self.answers = []
+        self.exact = {}
+        self.index = None
+        self._lock = threading.Lock()
+        self.exact_hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+
+    def _files(self):
+        return os.path.join(self.path, "questions.faiss"), os.path.join(self.path, "questions.json")
+
+    def _load_vectors(self, digest, dimension):
+        index_path, meta_path = self._files()
+        if not (os.path.exists(index_path) and os.path.exists(meta_path)):
+            return None
+        try:
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+            if meta.get("digest") != digest:
+                return None
+            index = faiss.read_index(index_path)
+            if index.d != dimension or index.ntotal != len(self.questions):
+                return None
+            return index
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable FAQ index: {e}")
+            return None
+
+    def _save_vectors(self, index, digest):
+        os.makedirs(self.path, exist_ok=True)
+        index_path, meta_path = self._files()
+        faiss.write_index(index, f"{index_path}.tmp")
+        with open(f"{meta_path}.tmp", 'w', encoding='utf-8') as f:
+            json.dump({"digest": digest, "questions": len(self.questions)}, f)
+        os.replace(f"{index_path}.tmp", index_path)
+        os.replace(f"{meta_path}.tmp", meta_path)
+
+    def load(self, path, embedder):
+        """
+        Build the exact-match table and question index from the QA dataset.
+
+        Args:
+            path (str): QA dataset, Parquet or CSV
+            embedder: SentenceTransformer used for queries as well
+        """
+        if not os.path.exists(path):
+            logger.warning(f"FAQ dataset not found: {path}")
+            return
+        with open(path, 'rb') as f:
+            digest = hashlib.sha256(f.read()).hexdigest()
+        questions, answers = read_qa_pairs(path)
+        dimension = embedder.get_sentence_embedding_dimension()
+
+        with self._lock:
+            self.questions, self.answers = questions, answers
+            self.exact = {question_key(q): i for i, q in enumerate(questions)}
+            index = self._load_vectors(digest, dimension)
+            if index is None:
+                index = faiss.IndexFlatIP(dimension)
+                if questions:
+                    vectors = np.asarray(embedder.encode([normalize_query(q) for q in questions],
+                                                         batch_size=64, convert_to_tensor=False),
+                                         dtype='float32')
+                    faiss.normalize_L2(vectors)
+                    index.add(vectors)
+                self._save_vectors(index, digest)
+            self.index = index
+        logger.info(f"FAQ index ready: {len(questions)} questions")
+
+    def match(self, query, embedding=None):
+        """
+        Return the curated answer for a known question, or None.
+
+        Args:
+            query (str): User question
+            embedding (np.ndarray): Query embedding; semantic matching is
+                skipped when omitted
+        Returns:
+            str or None
+        """
+        with self._lock:
+            row = self.exact.get(question_key(query))
+            if row is not None:
+                self.exact_hits += 1
+                return self.answers[row]
+            if embedding is not None and self.index is not None and self.index.ntotal:
+                vector = np.array(embedding, dtype='float32').reshape(1, -1)
+                faiss.normalize_L2(vector)
+                scores, rows = self.index.search(vector, 1)
+                if rows[0][0] >= 0 and scores[0][0] >= self.threshold:
+                    self.semantic_hits += 1
+                    return self.answers[int(rows[0][0])]
+            self.misses += 1
+            return None
+
+    def stats(self):
+        with self._lock:
+            lookups = self.exact_hits + self.semantic_hits + self.misses
+            hits = self.exact_hits + self.semantic_hits
+            return {
+                "questions": len(self.questions),
+                "threshold": self.threshold,
+                "exact_hits": self.exact_hits,
+                "semantic_hits": self.semantic_hits,
+                "misses": self.misses,
+                "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+            }
@@ -0,0 +1,444 @@
+import numpy as np
+import contextlib
+import itertools
+import hashlib
+import argparse
+import logging
+import fcntl
+import json
+import time
+import os
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from PyPDF2 import PdfReader
+from pathlib import Path
+from tasks.chunk_store import ChunkStore
+from tasks.context_packer import chunking_config, count_tokens, iter_sentence_chunks
+from tasks.data_preparation import QA_DATASET_PATH, iter_qa_frames, read_qa_dataset
+from tasks.embedding_builder import EMBED_WORKERS, EmbeddingBuilder
+from tasks.vector_index import (
+    add_vectors, build_index, index_config, read_index, remove_vectors, write_index
+)
+
+logger = logging.getLogger(__name__)
+
+CSV_PATH = "data/combined_dataset.csv"  # used when the Parquet QA dataset has not been built
+DOCS_DIR = "static/documents"
+KB_STATE_DIR = os.environ.get("KB_STATE_DIR", "")  # index, chunk store, manifest and embedding state
+INDEX_PATH = os.path.join(KB_STATE_DIR, "faiss_index.index")
+CHUNK_TEXT_PATH = os.path.join(KB_STATE_DIR, "chunks.dat")
+CHUNK_OFFSETS_PATH = os.path.join(KB_STATE_DIR, "chunks.idx")
+LEGACY_CHUNKS_PATH = os.path.join(KB_STATE_DIR, "chunks.pkl")
+MANIFEST_PATH = os.path.join(KB_STATE_DIR, "kb_manifest.json")
+LOCK_PATH = os.path.join(KB_STATE_DIR, "kb.lock")
+EMBED_CHECKPOINT_DIR = os.path.join(KB_STATE_DIR, "kb_checkpoints")
+EMBED_AUTOTUNE_PATH = os.path.join(KB_STATE_DIR, "embedding_autotune.json")
+EMBEDDING_MODEL = "multi-qa-MiniLM-L6-cos-v1"
+INGEST_WORKERS = int(os.environ.get("KB_INGEST_WORKERS", str(os.cpu_count() or 1)))
+EMBED_BATCH_SIZE = int(os.environ.get("KB_EMBED_BATCH", "1024"))  # texts per encode call and embedding worker
+
+
+def iter_pdf_pages(pdf_path):
+    """Yield the text of each PDF page without holding the whole document text."""
+    with open(pdf_path, 'rb') as file:
+        reader = PdfReader(file)
+        for page in reader.pages:
+            yield page.extract_text() or ""
+
+def extract_text_from_pdf(pdf_path):
+    """Extract text from a PDF file."""
+    try:
+        return "".join(f"{page}\n" for page in iter_pdf_pages(pdf_path))
+    except Exception as e:
+        logger.error(f"Error extracting text from PDF {pdf_path}: {e}")
+        return ""
+
+def extract_text_from_txt(txt_path):
+    """Extract text from a plain text file."""
+    try:
+        with open(txt_path, 'r', encoding='utf-8') as file:
+            return file.read()
+    except UnicodeDecodeError:
+        try:
+            with open(txt_path, 'r', encoding='latin-1') as file:
+                return file.read()
+        except Exception as e:
+            logger.error(f"Error reading text file {txt_path}: {e}")
+            return ""
+    except Exception as e:
+        logger.error(f"Error reading text file {txt_path}: {e}")
+        return ""
+
+def iter_chunks(pieces, chunk_size=1000, overlap=100):
+    """
+    Yield overlapping word windows from an iterable of text pieces (e.g. pages).
+
+    Only the current window is kept in memory; the chunks are identical to
+    the ones chunk_text produces for the concatenated text.
+    """
+    step = chunk_size - overlap
+    window = []
+    for piece in pieces:
+        window.extend(piece.split())
+        while len(window) >= chunk_size:
+            yield " ".join(window[:chunk_size])
+            del window[:step]
+    while window:
+        yield " ".join(window[:chunk_size])
+        del window[:step]
+
+def chunk_text(text, chunk_size=1000, overlap=100):
+    """Split text into overlapping chunks for better context retrieval."""
+    return list(iter_chunks([text], chunk_size, overlap))
+
+def qa_dataset_path():
+    """The built Parquet QA dataset, or the legacy CSV if it has not been built."""
+    return QA_DATASET_PATH if os.path.exists(QA_DATASET_PATH) else CSV_PATH
+
+def extract_qa_chunks(path):
+    """Turn each QA row of the dataset (Parquet, or a legacy CSV) into one retrievable chunk."""
+    if path.lower().endswith('.parquet'):
+        df = read_qa_dataset(path)
+    else:
+        import pandas as pd
+        frames = list(iter_qa_frames(path))
+        if not frames:
+            return []
+        df = pd.concat(frames, ignore_index=True)
+    chunks = ("Question: " + df["question"] + " Answer: " + df["answer"]).tolist()
+    logger.info(f"Loaded {len(df)} QA pairs from {os.path.basename(path)}")
+    return chunks
+
+def iter_source_chunks(path):
+    """Yield the chunks produced by one knowledge-base source."""
+    lower = path.lower()
+    if lower.endswith(('.csv', '.parquet')):
+        yield from extract_qa_chunks(path)
+    elif lower.endswith('.pdf'):
+        yield from (chunk for chunk, _ in iter_sentence_chunks(iter_pdf_pages(path)))
+    elif lower.endswith('.txt'):
+        yield from (chunk for chunk, _ in iter_sentence_chunks([extract_text_from_txt(path)]))
+
+def extract_chunks(path):
+    """Extract the chunks produced by one knowledge-base source."""
+    return list(iter_source_chunks(path))
+
+def list_sources():
+    """List every file that contributes to the knowledge base."""
+    sources = []
+    qa_path = qa_dataset_path()
+    if os.path.exists(qa_path):
+        sources.append(qa_path)
+    else:
+        logger.warning(f"QA dataset not found: {QA_DATASET_PATH} (build it with python -m tasks.data_preparation)")
+
+    if os.path.exists(DOCS_DIR):
+        for filename in sorted(os.listdir(DOCS_DIR)):
+            if filename.lower().endswith(('.pdf', '.txt')):
+                sources.append(os.path.join(DOCS_DIR, filename))
+    else:
+        logger.warning(f"Documents directory not found: {DOCS_DIR}")
+        Path(DOCS_DIR).mkdir(exist_ok=True, parents=True)
+    return sources
+
+def file_digest(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as file:
+        for block in iter(lambda: file.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def text_digest(text):
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+
+def empty_manifest():
+    return {"version": 0, "next_id": 0, "index": index_config(), "chunking": chunking_config(), "sources": {}}
+
+def load_manifest(path=MANIFEST_PATH):
+    if not os.path.exists(path):
+        return empty_manifest()
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def save_manifest(manifest, path=MANIFEST_PATH):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=1)
+    os.replace(tmp_path, path)
+
+def load_stored_index(dimension=None, mmap=True):
+    """
+    Open the saved index and chunk store, or None if missing or outdated.
+
+    The index and chunk texts are memory-mapped read-only by default, so
+    opening is near-instant and worker processes share the pages. Stores
+    written before the chunk store existed (chunks.pkl) are rebuilt, as is
+    a store built with a different index type, metric or chunking.
+    """
+    paths = (INDEX_PATH, CHUNK_TEXT_PATH, CHUNK_OFFSETS_PATH, MANIFEST_PATH)
+    if not all(os.path.exists(path) for path in paths):
+        return None
+    manifest = load_manifest()
+    manifest.setdefault("index", {"type": "flat", "metric": "l2"})
+    if manifest["index"] != index_config():
+        logger.info(f"Index configuration changed to {index_config()}, rebuilding.")
+        return None
+    if manifest.get("chunking") != chunking_config():
+        logger.info(f"Chunking configuration changed to {chunking_config()}, rebuilding.")
+        return None
+    index = read_index(INDEX_PATH, manifest["index"], mmap=mmap)
+    chunks = ChunkStore(CHUNK_TEXT_PATH, CHUNK_OFFSETS_PATH)
+    if index.ntotal == 0 or dimension not in (None, index.d) or len(chunks) != index.ntotal:
+        logger.info("Stored knowledge base is outdated or empty, rebuilding.")
+        return None
+    return index, chunks, manifest
+
+def save_index(index, chunks, manifest):
+    """Write index, chunk store and manifest; returns the saved chunk store."""
+    write_index(index, INDEX_PATH)
+    chunks = chunks.save()
+    save_manifest(manifest)
+    if os.path.exists(LEGACY_CHUNKS_PATH):
+        os.remove(LEGACY_CHUNKS_PATH)
+    logger.info("FAISS index, chunks and manifest saved to disk.")
+    return chunks
+
+@contextlib.contextmanager
+def store_lock(path=LOCK_PATH):
+    """Serialize knowledge-base updates across the processes sharing the store."""
+    with open(path, 'a') as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def _ingest_source(path, known_digest):
+    """
+    Hash one source and extract its chunks if the content changed.
+
+    Runs in a worker process; everything it returns is plain data.
+    """
+    start = time.perf_counter()
+    result = {"path": path, "chunks": None, "error": None}
+    try:
+        stat = os.stat(path)
+        result["size"], result["mtime"] = stat.st_size, stat.st_mtime
+        result["sha256"] = file_digest(path)
+        if result["sha256"] != known_digest:
+            result["chunks"] = list(iter_source_chunks(path))
+    except Exception as e:
+        result["error"] = f"{type(e).__name__}: {e}"
+    result["seconds"] = time.perf_counter() - start
+    return result
+
+def iter_ingested(jobs, workers=INGEST_WORKERS):
+    """
+    Run _ingest_source over (path, known_digest) jobs, yielding results as they finish.
+
+    At most 2 * workers files are in flight, so the parent only ever holds
+    the chunks of a bounded number of files regardless of corpus size.
+    """
+    if workers <= 1 or len(jobs) <= 1:
+        for job in jobs:
+            yield _ingest_source(*job)
+        return
+
+    pending_jobs = iter(jobs)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        in_flight = {pool.submit(_ingest_source, *job)
+                     for job in itertools.islice(pending_jobs, workers * 2)}
+        while in_flight:
+            done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield future.result()
+                job = next(pending_jobs, None)
+                if job is not None:
+                    in_flight.add(pool.submit(_ingest_source, *job))
+
+def sync_knowledge_base(embedder, rebuild=False, workers=INGEST_WORKERS, embed_workers=EMBED_WORKERS):
+    """
+    Bring the stored index up to date with the knowledge-base sources.
+
+    A source whose size and mtime match the manifest is skipped without
+    being read. The others are hashed and, when their content changed,
+    extracted page by page on a process pool. Only chunks whose text is new
+    are embedded, EMBED_BATCH_SIZE per embedding worker at a time, through
+    a checkpointed EmbeddingBuilder so an interrupted build resumes, while
+    chunks that disappeared are removed from the index by ID. Sources that no longer
+    exist have all their vectors removed; sources that fail to extract keep
+    their previous vectors.
+
+    Args:
+        embedder: SentenceTransformer used to embed new chunks
+        rebuild (bool): Ignore the stored index and re-embed everything
+        workers (int): Extraction processes
+        embed_workers (int): Embedding processes
+    Returns:
+        tuple: (index, chunks, manifest) where index is memory-mapped and
+            chunks is a ChunkStore mapping chunk ID to text
+    """
+    if KB_STATE_DIR:
+        os.makedirs(KB_STATE_DIR, exist_ok=True)
+    with store_lock():
+        return _sync(embedder, rebuild, workers, embed_workers)
+
+def _sync(embedder, rebuild, workers, embed_workers):
+    sync_start = time.perf_counter()
+    dimension = embedder.get_sentence_embedding_dimension()
+    stored = None if rebuild else load_stored_index(dimension)
+    if stored is None:
+        index, manifest = None, empty_manifest()
+        chunks = ChunkStore(CHUNK_TEXT_PATH, CHUNK_OFFSETS_PATH, load=False)
+    else:
+        index, chunks, manifest = stored
+
+    sources = list_sources()
+    jobs = []
+    for path in sources:
+        try:
+            stat = os.stat(path)
+        except OSError as e:
+            logger.error(f"Error processing file {path}: {e}")
+            continue
+        entry = manifest["sources"].get(path)
+        if entry and entry["size"] == stat.st_size and entry["mtime"] == stat.st_mtime:
+            continue
+        jobs.append((path, entry["sha256"] if entry else None))
+
+    pending_ids, pending_vectors, stale_ids = [], [], []
+    batch_ids, batch_texts = [], []
+    report = []
+    dirty = False
+    builder = EmbeddingBuilder(embedder, EMBEDDING_MODEL, workers=embed_workers,
+                               checkpoint_dir=EMBED_CHECKPOINT_DIR, autotune_path=EMBED_AUTOTUNE_PATH)
+
+    def flush():
+        if batch_texts:
+            pending_vectors.append(builder.encode(batch_texts))
+            pending_ids.extend(batch_ids)
+            batch_ids.clear()
+            batch_texts.clear()
+
+    with builder:
+        for result in iter_ingested(jobs, workers):
+            path = result["path"]
+            file_report = {"path": path, "seconds": round(result["seconds"], 3), "error": result["error"]}
+            report.append(file_report)
+            if result["error"]:
+                logger.error(f"Error processing file {path}: {result['error']}")
+                continue
+
+            dirty = True
+            entry = manifest["sources"].get(path)
+            if result["chunks"] is None:
+                entry["mtime"] = result["mtime"]
+                continue
+
+            # Identical chunks share a hash, so each hash maps to all its IDs.
+            previous = {}
+            if entry:
+                for h, chunk_id in zip(entry["chunk_hashes"], entry["chunk_ids"]):
+                    previous.setdefault(h, []).append(chunk_id)
+
+            chunk_ids, chunk_hashes, embedded = [], [], 0
+            for text in result["chunks"]:
+                h = text_digest(text)
+                if previous.get(h):
+                    chunk_id = previous[h].pop(0)
+                else:
+                    chunk_id = manifest["next_id"]
+                    manifest["next_id"] += 1
+                    chunks.add(chunk_id, text, count_tokens(text))
+                    batch_ids.append(chunk_id)
+                    batch_texts.append(text)
+                    embedded += 1
+                    if len(batch_texts) >= EMBED_BATCH_SIZE * max(1, embed_workers):
+                        flush()
+                chunk_ids.append(chunk_id)
+                chunk_hashes.append(h)
+
+            stale = [chunk_id for ids in previous.values() for chunk_id in ids]
+            for chunk_id in stale:
+                chunks.discard(chunk_id)
+            stale_ids.extend(stale)
+
+            manifest["sources"][path] = {
+                "size": result["size"],
+                "mtime": result["mtime"],
+                "sha256": result["sha256"],
+                "chunk_ids": chunk_ids,
+                "chunk_hashes": chunk_hashes,
+            }
+            file_report.update(chunks=len(chunk_ids), embedded=embedded, removed=len(stale))
+            logger.info(f"Indexed {path} in {result['seconds']:.2f}s: {len(chunk_ids)} chunks, "
+                        f"{embedded} to embed, {len(stale)} removed")
+        flush()
+
+    for path in set(manifest["sources"]) - set(sources):
+        entry = manifest["sources"].pop(path)
+        stale = entry["chunk_ids"]
+        for chunk_id in stale:
+            chunks.discard(chunk_id)
+        stale_ids.extend(stale)
+        dirty = True
+        logger.info(f"Removed deleted source {path}: {len(stale)} chunks")
+
+    config = manifest["index"]
+    vectors = np.vstack(pending_vectors) if pending_vectors else np.zeros((0, dimension), dtype='float32')
+    if index is None:
+        index = build_index(dimension, vectors, pending_ids, config)
+    elif stale_ids or pending_ids:
+        # The stored index is mapped read-only; updates go to an in-memory copy.
+        index = read_index(INDEX_PATH, config, mmap=False)
+        if stale_ids:
+            index = remove_vectors(index, stale_ids, config)
+        if pending_ids:
+            add_vectors(index, vectors, pending_ids)
+
+    added, removed = len(pending_ids), len(stale_ids)
+    failures = [r for r in report if r["error"]]
+    manifest["last_sync"] = {
+        "seconds": round(time.perf_counter() - sync_start, 3),
+        "embed_seconds": round(builder.seconds, 3),
+        "embedded": builder.encoded,
+        "resumed": builder.resumed,
+        "workers": workers,
+        "embed_workers": embed_workers,
+        "files": report,
+    }
+    if added or removed:
+        manifest["version"] += 1
+    if added or removed or stored is None:
+        chunks = save_index(index, chunks, manifest)
+        index = read_index(INDEX_PATH, config)
+    elif dirty:
+        save_manifest(manifest)
+    builder.clear_checkpoints()
+
+    if not chunks:
+        logger.warning("Knowledge base is empty - no content found")
+    if failures:
+        logger.warning(f"{len(failures)} source(s) failed: {', '.join(r['path'] for r in failures)}")
+    logger.info(f"Knowledge base v{manifest['version']} ({config['type']}/{config['metric']}): "
+                f"{index.ntotal} vectors ({added} added, {removed} removed) "
+                f"in {manifest['last_sync']['seconds']:.2f}s, embedding {builder.seconds:.2f}s")
+    return index, chunks, manifest
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Update the chatbot knowledge base index.")
+    parser.add_argument("--rebuild", action="store_true", help="re-embed every source from scratch")
+    parser.add_argument("--workers", type=int, default=INGEST_WORKERS, help="extraction processes")
+    parser.add_argument("--embed-workers", type=int, default=EMBED_WORKERS, help="embedding processes")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    from sentence_transformers import SentenceTransformer
+
+    _, _, manifest = sync_knowledge_base(SentenceTransformer(EMBEDDING_MODEL), rebuild=args.rebuild,
+                                         workers=args.workers, embed_workers=args.embed_workers)
+    for file_report in manifest["last_sync"]["files"]:
+        status = file_report["error"] or f"{file_report.get('chunks', 0)} chunks, {file_report.get('embedded', 0)} embedded"
+        print(f"{file_report['seconds']:>8.2f}s  {file_report['path']}  {status}")
@@ -0,0 +1,233 @@
+import threading
+import asyncio
+import logging
+import queue
+import math
+import time
+import os
+
+logger = logging.getLogger(__name__)
+
+OLLAMA_HOST = os.environ.get("OLLAMA_HOST", "http://127.0.0.1:11434")
+LLM_MODEL = os.environ.get("LLM_MODEL", "llama3.2:latest")
+LLM_CONCURRENCY = int(os.environ.get("LLM_CONCURRENCY", "2"))
+LLM_MAX_QUEUE = int(os.environ.get("LLM_MAX_QUEUE", "16"))
+LLM_TIMEOUT_SECONDS = float(os.environ.get("LLM_TIMEOUT_SECONDS", "120"))
+
+_DONE = object()
+
+
+class GatewayBusy(Exception):
+    """Raised when the generation queue is full; `retry_after` is a hint in seconds."""
+
+    def __init__(self, retry_after):
+        super().__init__(f"LLM queue is full, retry in {retry_after}s")
+        self.retry_after = retry_after
+
+
+class PieceStream:
+    """Iterator over streamed answer pieces; `close` cancels the generation."""
+
+    def __init__(self, pieces, future):
+        self._pieces = pieces
+        self._future = future
+        self._done = False
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if self._done:
+            raise StopIteration
+        item = self._pieces.get()
+        if item is _DONE or isinstance(item, BaseException):
+            self._done = True
+            if item is _DONE:
+                raise StopIteration
+            raise item
+        return item
+
+    def close(self):
+        self._future.cancel()
+
+
+class LLMGateway:
+    """
+    Shared entry point for every generation sent to Ollama.
+
+    Requests run on one background asyncio loop through a single pooled
+    `ollama.AsyncClient`. At most `concurrency` generations run at once;
+    the others wait in arrival order. Once `max_queue` requests are already
+    waiting, new ones are rejected immediately with GatewayBusy instead of
+    piling up. Each request is bounded by `timeout` seconds, queueing
+    included, and a streamed generation is cancelled when its iterator is
+    closed, e.g. because the client disconnected.
+
+    The gateway talks to `host`, so it can be pointed at a stub server
+    speaking Ollama's /api/chat protocol.
+    """
+
+    def __init__(self, host=OLLAMA_HOST, model=LLM_MODEL, concurrency=LLM_CONCURRENCY,
+                 max_queue=LLM_MAX_QUEUE, timeout=LLM_TIMEOUT_SECONDS):
+        self.host = host
+        self.model = model
+        self.concurrency = concurrency
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._loop = None
+        self._client = None
+        self._slots = None
+        self.pending = 0
+        self.active = 0
+        self.completed = 0
+        self.rejected = 0
+        self.timed_out = 0
+        self.cancelled = 0
+        self.failed = 0
+        self.avg_seconds = 5.0
+
+    def _ensure_loop(self):
+        with self._lock:
+            if self._loop is None:
+                import ollama
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name="llm-gateway", daemon=True).start()
+                self._client = ollama.AsyncClient(host=self.host)
+                self._slots = asyncio.Semaphore(self.concurrency)
+                self._loop = loop
+            return self._loop
+
+    def _admit(self):
+        with self._lock:
+            waiting = self.pending - self.concurrency
+            if waiting >= self.max_queue:
+                self.rejected += 1
+                rounds = (waiting + 1) / self.concurrency
+                raise GatewayBusy(max(1, math.ceil(rounds * self.avg_seconds)))
+            self.pending += 1
+
+    def _finish(self, outcome, seconds=None):
+        with self._lock:
+            self.pending -= 1
+            setattr(self, outcome, getattr(self, outcome) + 1)
+            if seconds is not None:
+                self.avg_seconds = 0.8 * self.avg_seconds + 0.2 * seconds
+
+    async def _generate(self, work):
+        async with self._slots:
+            with self._lock:
+                self.active += 1
+            try:
+                return await work()
+            finally:
+                with self._lock:
+                    self.active -= 1
+
+    async def _run(self, work, timeout):
+        return await asyncio.wait_for(self._generate(work), timeout)
+
+    def _submit(self, coroutine, loop):
+        """
+        Schedule an admitted generation on the loop.
+
+        Admission is released by a done callback, so it happens exactly once
+        however the future settles, including a cancellation that lands
+        before the coroutine ever started.
+        """
+        start = time.perf_counter()
+        future = asyncio.run_coroutine_threadsafe(coroutine, loop)
+        future.add_done_callback(lambda done: self._release(done, start))
+        return future
+
+    def _release(self, future, start):
+        if future.cancelled():
+            self._finish("cancelled")
+        elif isinstance(future.exception(), asyncio.TimeoutError):
+            self._finish("timed_out")
+        elif future.exception() is not None:
+            self._finish("failed")
+        else:
+            self._finish("completed", time.perf_counter() - start)
+
+    def chat(self, messages, timeout=None):
+        """
+        Generate a complete answer.
+
+        Args:
+            messages (list): Chat messages in Ollama format
+            timeout (float): Seconds including queueing, defaults to the gateway timeout
+        Returns:
+            str: Answer text
+        Raises:
+            GatewayBusy: The queue is full
+            TimeoutError: No answer within the timeout
+        """
+        loop = self._ensure_loop()
+        self._admit()
+
+        async def work():
+            response = await self._client.chat(model=self.model, messages=messages)
+            return response['message']['content']
+
+        future = self._submit(self._run(work, timeout or self.timeout), loop)
+        try:
+            return future.result()
+        except BaseException:
+            future.cancel()
+            raise
+
+    def stream(self, messages, timeout=None):
+        """
+        Generate an answer piece by piece.
+
+        Admission happens when this is called, so GatewayBusy is raised
+        before anything is streamed. Closing the returned iterator cancels
+        the generation.
+
+        Args:
+            messages (list): Chat messages in Ollama format
+            timeout (float): Seconds for the whole generation, queueing included
+        Returns:
+            iterator: Answer pieces
+        Raises:
+            GatewayBusy: The queue is full
+        """
+        loop = self._ensure_loop()
+        self._admit()
+        pieces = queue.Queue()
+
+        async def work():
+            async for part in await self._client.chat(model=self.model, messages=messages, stream=True):
+                token = part['message']['content']
+                if token:
+                    pieces.put(token)
+
+        async def run():
+            try:
+                await self._run(work, timeout or self.timeout)
+                pieces.put(_DONE)
+            except BaseException as e:
+                pieces.put(e)
+                raise
+
+        future = self._submit(run(), loop)
+        return PieceStream(pieces, future)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "concurrency": self.concurrency,
+                "max_queue": self.max_queue,
+                "active": self.active,
+                "queued": self.pending - self.active,
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "timed_out": self.timed_out,
+                "cancelled": self.cancelled,
+                "failed": self.failed,
+                "avg_seconds": round(self.avg_seconds, 3),
+            }
+
+
+llm_gateway = LLMGateway()
@@ -7,10 +7,33 @@ import pytesseract
 import re
 from datetime import datetime
 import traceback
+from concurrent.futures import ThreadPoolExecutor
+import threading
+
+from tasks.stage_timings import StageTimings
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+OCR_WORKERS = int(os.environ.get("OCR_WORKERS", str(os.cpu_count() or 1)))
+OCR_MIN_HEIGHT = int(os.environ.get("OCR_MIN_HEIGHT", "40"))
+# Fields are OCR'd in parallel, so each tesseract process gets one thread.
+os.environ.setdefault("OMP_THREAD_LIMIT", "1")
+
+LINE_CONFIG = '--psm 7 --oem 3 -c tessedit_char_whitelist=0123456789abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ.,/-()° '
+BLOCK_CONFIG = '--psm 6 --oem 3'
+
+_ocr_pool = None
+_ocr_pool_lock = threading.Lock()
+
+MEDICAL_DEBUG = os.environ.get("MEDICAL_DEBUG", "0") == "1"
+# Image-quality thresholds, measured on a grayscale copy at most QUALITY_SIDE pixels wide.
+QUALITY_SIDE = 512
+BLUR_THRESHOLD = float(os.environ.get("MEDICAL_BLUR_THRESHOLD", "100"))  # Laplacian variance below this is blurry
+CONTRAST_THRESHOLD = float(os.environ.get("MEDICAL_CONTRAST_THRESHOLD", "40"))  # gray std below this is flat
+NOISE_THRESHOLD = float(os.environ.get("MEDICAL_NOISE_THRESHOLD", "6"))  # mean |img - median3| above this is noisy
+ALL_STAGES = ("clahe", "denoise", "threshold")
+
 FIELD_PATTERNS = {
     'age': r'^\d{1,3}(?:\s*(?:years?|yrs?|y))?$',
     'bp': r'^\d{2,3}/\d{2,3}(?:\s*(?:mmHg|mm\s*Hg))?$',
@@ -25,7 +48,9 @@ FIELD_PATTERNS = {
     'ww': r'^\d{1,3}(?:\.\d{1,2})?(?:\s*(?:kg|g|lbs?))?$'
 }
 
-def process_medical_document(file_path, model, results_folder):
+stage_timings = StageTimings()
+
+def process_medical_document(file_path, model, results_folder, debug=MEDICAL_DEBUG):
     """
     Traite un document médical pour détecter et extraire les informations importantes.
     
@@ -33,10 +58,12 @@ def process_medical_document(file_path, model, results_folder):
         file_path (str): Chemin vers l'image du document
         model: Modèle YOLO pour la détection
         results_folder (str): Dossier pour sauvegarder les résultats
+        debug (bool): Sauvegarde aussi l'image prétraitée
         
     Returns:
         tuple: (détections, chemin_du_résultat)
     """
+    timings = {}
     try:
         logger.info(f"Processing image: {os.path.basename(file_path)}")
         
@@ -50,7 +77,8 @@ def process_medical_document(file_path, model, results_folder):
             
         logger.info(f"Modèle YOLO chargé avec {len(model.names)} classes: {model.names}")
 
-        img = cv2.imread(file_path)
+        with stage_timings.measure(timings, "read"):
+            img = cv2.imread(file_path)
         if img is None:
             logger.error(f"Impossible de lire l'image: {file_path}")
             return [], None, "Impossible de lire l'image"
@@ -61,51 +89,57 @@ def process_medical_document(file_path, model, results_folder):
         model.iou = 0.2   
         logger.info(f"Model parameters - conf: {model.conf}, iou: {model.iou}")
 
-        processed_img = preprocess_image(img)
-        
-        debug_path = os.path.join(results_folder, "debug_preprocessed.jpg")
-        cv2.imwrite(debug_path, processed_img)
-        logger.info(f"Image prétraitée sauvegardée: {debug_path}")
+        with stage_timings.measure(timings, "quality"):
+            quality = measure_quality(img)
+            stages = plan_preprocessing(quality)
+        logger.info(f"Image quality: {quality}, preprocessing: {stages or 'none'}")
+
+        with stage_timings.measure(timings, "preprocess"):
+            processed_img = preprocess_image(img, stages)
         
-        results = model(processed_img)
+        if debug and stages:
+            debug_path = os.path.join(results_folder, "debug_preprocessed.jpg")
+            cv2.imwrite(debug_path, processed_img)
+            logger.info(f"Image prétraitée sauvegardée: {debug_path}")
         
-        logger.info(f"Total detections: {len(results[0].boxes)}")
-        if len(results[0].boxes) == 0:
-            logger.warning("No valid detections found in the document")
-            logger.info("Trying detection with original image...")
-            results = model(img)
-            logger.info(f"Total detections with original image: {len(results[0].boxes)}")
-            if len(results[0].boxes) == 0:
-                return [], None, "Aucune détection trouvée dans le document"
+        with stage_timings.measure(timings, "detect"):
+            result = detect_variants(model, img, processed_img, stages)
+        if result is None:
+            return [], None, "Aucune détection trouvée dans le document"
 
-        annotated_img = results[0].plot()
-        result_filename = f"med_annotated_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{os.path.basename(file_path)}"
-        result_path = os.path.join(results_folder, result_filename)
-        cv2.imwrite(result_path, annotated_img)
+        with stage_timings.measure(timings, "annotate"):
+            annotated_img = result.plot()
+            result_filename = f"med_annotated_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{os.path.basename(file_path)}"
+            result_path = os.path.join(results_folder, result_filename)
+            cv2.imwrite(result_path, annotated_img)
 
         detections = []
         height, width = img.shape[:2]
+        # Boxes found on the resized variant are mapped back to the original image.
+        scale_y, scale_x = height / result.orig_shape[0], width / result.orig_shape[1]
+        boxes = [[x1 * scale_x, y1 * scale_y, x2 * scale_x, y2 * scale_y, confidence, class_id]
+                 for x1, y1, x2, y2, confidence, class_id in result.boxes.data.tolist()]
+        fields = []
+        for x1, y1, x2, y2, _, class_id in boxes:
+            class_name = result.names[int(class_id)]
+            if class_name != 'block':
+                fields.append((img[int(y1):int(y2), int(x1):int(x2)], class_name))
+        with stage_timings.measure(timings, "ocr"):
+            extracted = iter(extract_fields(fields))
 
-        for box in results[0].boxes.data.tolist():
+        for box in boxes:
             try:
                 x1, y1, x2, y2, confidence, class_id = box
-                class_name = results[0].names[int(class_id)]
+                class_name = result.names[int(class_id)]
                 
                 rel_x1, rel_y1 = x1/width, y1/height
                 rel_x2, rel_y2 = x2/width, y2/height
                 
-                field_img = img[int(y1):int(y2), int(x1):int(x2)]
-                text = "Texte non extrait"  
-                text_confidence = 0.0
-                
                 if class_name == 'block':
                     text = "Bloc d'information"
                     text_confidence = 1.0
                 else:
-                    try:
-                        text, text_confidence = extract_medical_text(field_img, class_name)
-                    except Exception as e:
-                        logger.error(f"Error extracting text: {str(e)}")
+                    text, text_confidence = next(extracted)
                 
                 detections.append({
                     "class": class_name,
@@ -135,11 +169,62 @@ def process_medical_document(file_path, model, results_folder):
         logger.error(f"Error processing medical document: {str(e)}")
         logger.error(f"Traceback: {traceback.format_exc()}")
         return [], None, f"Error processing document: {str(e)}"
+    finally:
+        if timings:
+            stage_timings.record(timings)
+            logger.info("Stage timings: " + ", ".join(f"{name}={seconds:.3f}s" for name, seconds in timings.items()))
+
+def measure_quality(img):
+    """
+    Mesure rapidement la netteté, le contraste et le bruit d'une image.
+
+    Returns:
+        dict: blur (variance du laplacien, faible = flou), contrast (écart
+        type des niveaux de gris) et noise (écart moyen au filtre médian 3x3)
+    """
+    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY) if img.ndim == 3 else img
+    scale = QUALITY_SIDE / max(gray.shape[:2])
+    if scale < 1:
+        gray = cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+    return {
+        "blur": round(float(cv2.Laplacian(gray, cv2.CV_64F).var()), 1),
+        "contrast": round(float(gray.std()), 1),
+        "noise": round(float(cv2.absdiff(gray, cv2.medianBlur(gray, 3)).mean()), 2),
+    }
+
+def plan_preprocessing(quality):
+    """
+    Choisit les étapes de prétraitement utiles pour une image.
+
+    Un scan net et contrasté n'est pas prétraité. Le CLAHE corrige un
+    contraste faible ou un flou, le débruitage n'est lancé que sur une image
+    bruitée, et la binarisation seulement si elle est bruitée ou floue.
+
+    Returns:
+        tuple: Étapes parmi ALL_STAGES, dans l'ordre d'application
+    """
+    blurry = quality["blur"] < BLUR_THRESHOLD
+    noisy = quality["noise"] > NOISE_THRESHOLD
+    stages = []
+    if blurry or quality["contrast"] < CONTRAST_THRESHOLD:
+        stages.append("clahe")
+    if noisy:
+        stages.append("denoise")
+    if blurry or noisy:
+        stages.append("threshold")
+    return tuple(stages)
 
-def preprocess_image(img):
+def preprocess_image(img, stages=ALL_STAGES):
     """
     Prétraite l'image pour améliorer la détection.
+
+    Args:
+        img (np.ndarray): Image BGR
+        stages (tuple): Étapes à appliquer, voir plan_preprocessing ; sans
+            étape, l'image est renvoyée telle quelle
     """
+    if not stages:
+        return img
     try:
         original = img.copy()
         
@@ -147,20 +232,23 @@ def preprocess_image(img):
         
         gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
         
-        clahe = cv2.createCLAHE(clipLimit=4.0, tileGridSize=(8,8))
-        enhanced = clahe.apply(gray)
+        if "clahe" in stages:
+            clahe = cv2.createCLAHE(clipLimit=4.0, tileGridSize=(8,8))
+            gray = clahe.apply(gray)
         
-        denoised = cv2.fastNlMeansDenoising(enhanced, None, 10, 7, 21)
+        if "denoise" in stages:
+            gray = cv2.fastNlMeansDenoising(gray, None, 10, 7, 21)
         
-        thresh = cv2.adaptiveThreshold(
-            denoised, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, 
-            cv2.THRESH_BINARY, 11, 2
-        )
-        
-        kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (3,3))
-        dilated = cv2.dilate(thresh, kernel, iterations=1)
+        if "threshold" in stages:
+            thresh = cv2.adaptiveThreshold(
+                gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, 
+                cv2.THRESH_BINARY, 11, 2
+            )
+            
+            kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (3,3))
+            gray = cv2.dilate(thresh, kernel, iterations=1)
         
-        rgb = cv2.cvtColor(dilated, cv2.COLOR_GRAY2BGR)
+        rgb = cv2.cvtColor(gray, cv2.COLOR_GRAY2BGR)
         
         return rgb
         
@@ -168,39 +256,107 @@ def preprocess_image(img):
         logger.error(f"Error in image preprocessing: {str(e)}")
         return original 
 
+def detect_variants(model, img, processed_img, stages):
+    """
+    Détecte les champs sur l'image prétraitée, avec repli sur l'originale.
+
+    Une image binarisée perd souvent toutes ses détections ; dans ce cas les
+    deux variantes passent dans un seul appel YOLO au lieu de deux appels
+    successifs. Sinon l'originale n'est analysée que si la variante
+    prétraitée ne donne rien.
+
+    Returns:
+        Résultat ultralytics retenu, ou None si aucune variante ne détecte rien
+    """
+    if processed_img is img:
+        candidates = model(img)
+    elif "threshold" in stages:
+        candidates = model([processed_img, img])
+    else:
+        candidates = model(processed_img)
+        if len(candidates[0].boxes) == 0:
+            logger.info("Trying detection with original image...")
+            candidates = [candidates[0]] + list(model(img))
+
+    for position, result in enumerate(candidates):
+        logger.info(f"Total detections ({'original' if position or processed_img is img else 'preprocessed'}): "
+                    f"{len(result.boxes)}")
+        if len(result.boxes):
+            return result
+    logger.warning("No valid detections found in the document")
+    return None
+
+def preprocess_field(img):
+    """
+    Prépare un champ découpé pour l'OCR, à son échelle native.
+
+    Seuls les champs plus petits que OCR_MIN_HEIGHT sont agrandis, et aucun
+    débruitage lourd n'est appliqué.
+    """
+    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY) if img.ndim == 3 else img
+    if gray.shape[0] < OCR_MIN_HEIGHT:
+        scale = OCR_MIN_HEIGHT / gray.shape[0]
+        gray = cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_CUBIC)
+    _, binary = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+    return binary
+
 def extract_medical_text(img, field_type):
     """
     Extrait le texte d'un champ médical détecté.
+
+    Les configurations sont essayées dans l'ordre jusqu'au premier texte
+    lu. Si ce texte n'est pas valide pour le type de champ, une seule passe
+    de plus est tentée, et le premier texte est retenu si elle ne donne pas
+    mieux. Un champ coûte donc au plus trois appels tesseract.
     """
     try:
-        processed_img = preprocess_image(img)
-        
-        config = '--psm 7 --oem 3 -c tessedit_char_whitelist=0123456789abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ.,/-()° '
-        
-        text = pytesseract.image_to_string(processed_img, config=config)
-        text = text.strip()
-        
-        if not text:
-            config = '--psm 6 --oem 3'
-            text = pytesseract.image_to_string(processed_img, config=config)
-            text = text.strip()
-        
-        if not text:
-            text = pytesseract.image_to_string(img, config=config)
-            text = text.strip()
-        
-        cleaned_text, is_valid = validate_field_value(field_type, text)
-        
-        confidence = 1.0 if is_valid else 0.5
-        if not text:
-            confidence = 0.0
-        
-        return cleaned_text, confidence
-        
+        if img is None or img.size == 0:
+            return "", 0.0
+
+        field = preprocess_field(img)
+        attempts = [(field, LINE_CONFIG), (field, BLOCK_CONFIG), (img, BLOCK_CONFIG)]
+        fallback = None
+        for image, config in attempts:
+            text = pytesseract.image_to_string(image, config=config).strip()
+            if text:
+                cleaned_text, is_valid = validate_field_value(field_type, text)
+                if is_valid:
+                    return cleaned_text, 1.0
+            if fallback is not None:
+                break
+            if text:
+                fallback = cleaned_text
+
+        if fallback is None:
+            return "", 0.0
+        return fallback, 0.5
+
     except Exception as e:
         logger.error(f"Error extracting text: {str(e)}")
         return "Erreur d'extraction", 0.0
 
+def extract_fields(fields, workers=OCR_WORKERS):
+    """
+    Extrait le texte de plusieurs champs en parallèle.
+
+    Chaque appel pytesseract lance un processus tesseract, donc un pool de
+    threads suffit pour occuper tous les cœurs.
+
+    Args:
+        fields (list): [(image du champ, type du champ), ...]
+        workers (int): Nombre d'OCR simultanés
+    Returns:
+        list: [(texte, confiance), ...] dans l'ordre des champs
+    """
+    global _ocr_pool
+    if workers <= 1 or len(fields) <= 1:
+        return [extract_medical_text(img, field_type) for img, field_type in fields]
+    with _ocr_pool_lock:
+        if _ocr_pool is None:
+            _ocr_pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="ocr")
+    futures = [_ocr_pool.submit(extract_medical_text, img, field_type) for img, field_type in fields]
+    return [future.result() for future in futures]
+
 def validate_field_value(field_type, text):
     """
     Valide et nettoie la valeur d'un champ selon son type.
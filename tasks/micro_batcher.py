@@ -0,0 +1,87 @@
+from concurrent.futures import Future
+import threading
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class _PendingBatch:
+    def __init__(self):
+        self.items = []
+        self.full = threading.Event()
+
+
+class MicroBatcher:
+    """
+    Collect concurrent single-item requests into one batched call.
+
+    Items are grouped by `key`. The first caller for a key becomes the batch
+    leader: it waits up to `max_wait_ms` (or until `max_batch_size` items
+    have arrived), runs `batch_fn(items, *key)` once, and hands each caller
+    its own result. No background thread is needed; callers that join an
+    open batch simply block on their future.
+    """
+
+    def __init__(self, batch_fn, max_batch_size, max_wait_ms):
+        self.batch_fn = batch_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self._pending = {}
+        self._lock = threading.Lock()
+        self.batches = 0
+        self.requests = 0
+
+    def submit(self, item, key=()):
+        """
+        Process one item, possibly sharing a batched call with other callers.
+
+        Args:
+            item: Input passed to batch_fn inside a list
+            key (tuple): Items are only batched with items of the same key
+        Returns:
+            The result batch_fn produced for this item
+        """
+        future = Future()
+
+        with self._lock:
+            self.requests += 1
+            batch = self._pending.get(key)
+            is_leader = batch is None
+            if is_leader:
+                batch = self._pending[key] = _PendingBatch()
+            batch.items.append((item, future))
+            if len(batch.items) >= self.max_batch_size:
+                del self._pending[key]
+                batch.full.set()
+
+        if is_leader:
+            batch.full.wait(self.max_wait)
+            with self._lock:
+                if self._pending.get(key) is batch:
+                    del self._pending[key]
+                self.batches += 1
+            self._run(key, batch.items)
+
+        return future.result()
+
+    def _run(self, key, items):
+        inputs = [item for item, _ in items]
+        try:
+            results = list(self.batch_fn(inputs, *key))
+            if len(results) != len(items):
+                raise ValueError(f"batch_fn returned {len(results)} results for {len(items)} items")
+        except Exception as e:
+            # Every caller is blocked on its future, so each one must be resolved.
+            for _, future in items:
+                future.set_exception(e)
+            return
+        for (_, future), result in zip(items, results):
+            future.set_result(result)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "batches": self.batches,
+                "avg_batch_size": round(self.requests / self.batches, 2) if self.batches else 0.0,
+            }
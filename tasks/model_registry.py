@@ -0,0 +1,116 @@
+from collections import OrderedDict
+import threading
+import logging
+import time
+import os
+
+logger = logging.getLogger(__name__)
+
+MODEL_WARMUP = os.environ.get("MODEL_WARMUP", "all")  # 'all', 'none' or comma separated names
+
+
+class _Entry:
+    def __init__(self, loader, required):
+        self.loader = loader
+        self.required = required
+        self.lock = threading.Lock()
+        self.value = None
+        self.state = "pending"
+        self.seconds = None
+        self.error = None
+
+
+class ModelRegistry:
+    """
+    Named models that are loaded on first use instead of at import.
+
+    Each model is loaded at most once, by whichever caller (a request or
+    the warm-up thread) asks for it first; concurrent callers wait for that
+    load. A failed load is reported in `status` and retried on the next
+    `get`. The registry is ready once every required model has loaded.
+    """
+
+    def __init__(self):
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def register(self, name, loader, required=True):
+        """
+        Declare a model without loading it.
+
+        Args:
+            name (str): Registry key
+            loader (callable): Takes no arguments and returns the model
+            required (bool): Whether readiness waits for this model
+        """
+        with self._lock:
+            self._entries[name] = _Entry(loader, required)
+
+    def get(self, name):
+        """Return the model, loading it first if needed."""
+        entry = self._entries[name]
+        if entry.state == "ready":
+            return entry.value
+        with entry.lock:
+            if entry.state != "ready":
+                entry.state = "loading"
+                start = time.perf_counter()
+                try:
+                    entry.value = entry.loader()
+                except Exception as e:
+                    entry.state, entry.error = "failed", f"{type(e).__name__}: {e}"
+                    entry.seconds = round(time.perf_counter() - start, 3)
+                    logger.error(f"Loading {name} failed after {entry.seconds}s: {e}")
+                    raise
+                entry.seconds = round(time.perf_counter() - start, 3)
+                entry.state, entry.error = "ready", None
+                logger.info(f"Loaded {name} in {entry.seconds}s")
+        return entry.value
+
+    def warm_up(self, spec=MODEL_WARMUP, background=True):
+        """
+        Load models ahead of their first request, one after the other.
+
+        Args:
+            spec (str): 'all', 'none' or comma separated model names
+            background (bool): Load in a daemon thread so startup is not blocked
+        Returns:
+            threading.Thread or None
+        """
+        if spec.strip().lower() == "none":
+            return None
+        if spec.strip().lower() == "all":
+            names = list(self._entries)
+        else:
+            names = [name.strip() for name in spec.split(',') if name.strip() in self._entries]
+
+        def load_all():
+            for name in names:
+                try:
+                    self.get(name)
+                except Exception:
+                    pass
+
+        if not background:
+            load_all()
+            return None
+        thread = threading.Thread(target=load_all, name="model-warmup", daemon=True)
+        thread.start()
+        return thread
+
+    def ready(self):
+        return all(entry.state == "ready" for entry in self._entries.values() if entry.required)
+
+    def status(self):
+        return {
+            name: {
+                "state": entry.state,
+                "required": entry.required,
+                "load_seconds": entry.seconds,
+                "error": entry.error,
+            }
+            for name, entry in self._entries.items()
+        }
+
+
+registry = ModelRegistry()
@@ -0,0 +1,132 @@
+from pathlib import Path
+import tempfile
+import logging
+import shutil
+import os
+
+logger = logging.getLogger(__name__)
+
+ONNX_CACHE_DIR = os.environ.get("TRANSLATION_ONNX_DIR", "model/onnx")
+MODEL_REVISION = os.environ.get("TRANSLATION_MODEL_REVISION", "main")
+
+
+def _require_optimum():
+    try:
+        from optimum.onnxruntime import ORTModelForSeq2SeqLM
+    except ImportError as e:
+        raise ImportError(
+            "The ONNX translation backend needs 'optimum[onnxruntime]' "
+            "(pip install optimum[onnxruntime])"
+        ) from e
+    return ORTModelForSeq2SeqLM
+
+def resolve_revision(model_name, revision=MODEL_REVISION):
+    """Commit hash that `revision` of a checkpoint points to (from the local cache when offline)."""
+    from transformers import AutoConfig
+    config = AutoConfig.from_pretrained(model_name, revision=revision)
+    return getattr(config, "_commit_hash", None) or revision
+
+def export_dir(model_name, quantize, revision):
+    variant = "int8" if quantize else "fp32"
+    return Path(ONNX_CACHE_DIR) / model_name.replace('/', '--') / revision / variant
+
+def _build_atomically(target_dir, build):
+    """
+    Run build(tmp_dir) in a temporary sibling of target_dir, then move it into place.
+
+    An interrupted build leaves only the temporary directory, which is
+    removed, so target_dir exists only once it is complete.
+    """
+    target_dir.parent.mkdir(parents=True, exist_ok=True)
+    tmp_dir = Path(tempfile.mkdtemp(prefix=f".{target_dir.name}-", dir=target_dir.parent))
+    try:
+        build(tmp_dir)
+        try:
+            os.replace(tmp_dir, target_dir)
+        except OSError:
+            # Another process completed the same build first.
+            if not target_dir.is_dir():
+                raise
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+def _quantize_dir(source_dir, target_dir):
+    """Dynamically quantize every ONNX graph in source_dir to int8 weights."""
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    target_dir.mkdir(parents=True, exist_ok=True)
+    for path in source_dir.iterdir():
+        if path.suffix == ".onnx":
+            logger.info(f"Quantizing {path.name} to int8")
+            quantize_dynamic(str(path), str(target_dir / path.name), weight_type=QuantType.QInt8)
+        elif path.is_file():
+            shutil.copy2(path, target_dir / path.name)
+
+def export_model(model_name, quantize=False):
+    """
+    Export an opus-mt checkpoint to ONNX once and return its directory.
+
+    The fp32 export is kept next to the int8 one so switching variants
+    never re-runs the export. Exports are stored per checkpoint commit, so
+    a new upstream revision is exported again, and each directory is
+    written aside and moved into place, so an interrupted export is never
+    loaded as a cached one.
+
+    Args:
+        model_name (str): Hugging Face model id
+        quantize (bool): Return the int8 dynamically quantized variant
+    Returns:
+        Path: Directory containing the ONNX graphs, config and tokenizer
+    """
+    from transformers import AutoTokenizer
+
+    revision = resolve_revision(model_name)
+    fp32_dir = export_dir(model_name, False, revision)
+    if not fp32_dir.is_dir():
+        ORTModelForSeq2SeqLM = _require_optimum()
+        logger.info(f"Exporting {model_name}@{revision[:12]} to ONNX in {fp32_dir}")
+
+        def export(tmp_dir):
+            model = ORTModelForSeq2SeqLM.from_pretrained(model_name, export=True, revision=revision)
+            model.save_pretrained(tmp_dir)
+            AutoTokenizer.from_pretrained(model_name, revision=revision).save_pretrained(tmp_dir)
+
+        _build_atomically(fp32_dir, export)
+    if not quantize:
+        return fp32_dir
+
+    int8_dir = export_dir(model_name, True, revision)
+    if not int8_dir.is_dir():
+        _build_atomically(int8_dir, lambda tmp_dir: _quantize_dir(fp32_dir, tmp_dir))
+    return int8_dir
+
+def load_onnx_pair(source_lang, target_lang, quantize=False):
+    """
+    Load the tokenizer and an ONNX Runtime model for one opus-mt pair.
+
+    The returned model exposes the same `generate` API as the PyTorch model,
+    so callers do not need to know which backend is active.
+    """
+    from tasks.translation_pool import MODEL_NAME_TEMPLATE
+    from transformers import AutoTokenizer
+    import onnxruntime
+
+    ORTModelForSeq2SeqLM = _require_optimum()
+    model_name = MODEL_NAME_TEMPLATE.format(source=source_lang, target=target_lang)
+    model_dir = export_model(model_name, quantize=quantize)
+    logger.info(f"Loading ONNX translation model: {model_dir}")
+
+    session_options = onnxruntime.SessionOptions()
+    session_options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+    tokenizer = AutoTokenizer.from_pretrained(model_dir)
+    model = ORTModelForSeq2SeqLM.from_pretrained(
+        model_dir, provider="CPUExecutionProvider", session_options=session_options
+    )
+    return tokenizer, model
+
+def onnx_footprint(model):
+    """Size of the ONNX graphs backing a loaded model, in bytes."""
+    model_dir = getattr(model, "model_save_dir", None)
+    if model_dir is None:
+        return 0
+    return sum(path.stat().st_size for path in Path(model_dir).glob("*.onnx*"))
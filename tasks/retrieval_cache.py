@@ -0,0 +1,88 @@
+from collections import OrderedDict
+import unicodedata
+import threading
+import re
+import os
+
+QUERY_CACHE_SIZE = int(os.environ.get("KB_QUERY_CACHE_SIZE", "4096"))
+RESULT_CACHE_SIZE = int(os.environ.get("KB_RESULT_CACHE_SIZE", "4096"))
+
+
+def normalize_query(query):
+    """Case-fold, Unicode-normalize and collapse whitespace of a user question."""
+    return re.sub(r'\s+', ' ', unicodedata.normalize('NFKC', query)).strip().lower()
+
+
+class LRUCache:
+    """Thread-safe bounded mapping with least-recently-used eviction and hit counters."""
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return self._data[key]
+            self.misses += 1
+            return None
+
+    def put(self, key, value):
+        if self.capacity <= 0:
+            return
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.capacity:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "capacity": self.capacity,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+class RetrievalCache:
+    """
+    Two-level cache in front of retrieval.
+
+    `embeddings` maps a normalized query to its embedding, saving the
+    transformer forward pass. `results` maps (normalized query, k, index
+    version) to retrieved chunk IDs, saving the vector search; it is
+    cleared whenever the knowledge-base version changes.
+    """
+
+    def __init__(self, query_size=QUERY_CACHE_SIZE, result_size=RESULT_CACHE_SIZE):
+        self.embeddings = LRUCache(query_size)
+        self.results = LRUCache(result_size)
+        self.version = None
+
+    def set_version(self, version):
+        if version != self.version:
+            self.results.clear()
+            self.version = version
+
+    def stats(self):
+        return {
+            "index_version": self.version,
+            "embeddings": self.embeddings.stats(),
+            "results": self.results.stats(),
+        }
+
+
+retrieval_cache = RetrievalCache()
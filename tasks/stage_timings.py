@@ -0,0 +1,37 @@
+from contextlib import contextmanager
+import threading
+import time
+
+
+class StageTimings:
+    """Per-stage processing time of the last run and the mean over all runs."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.runs = 0
+        self.totals = {}
+        self.last = {}
+
+    @contextmanager
+    def measure(self, timings, name):
+        """Add the time spent in the block to `timings[name]`."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            timings[name] = timings.get(name, 0.0) + time.perf_counter() - start
+
+    def record(self, timings):
+        with self._lock:
+            self.runs += 1
+            self.last = {name: round(seconds, 4) for name, seconds in timings.items()}
+            for name, seconds in timings.items():
+                self.totals[name] = self.totals.get(name, 0.0) + seconds
+
+    def stats(self):
+        with self._lock:
+            return {
+                "runs": self.runs,
+                "last_seconds": dict(self.last),
+                "mean_seconds": {name: round(total / self.runs, 4) for name, total in self.totals.items()},
+            }
@@ -0,0 +1,210 @@
+from collections import OrderedDict
+import numpy as np
+import threading
+import logging
+import uuid
+import time
+import os
+
+from tasks.stt_engines import get_engine, pcm16_to_float, resample
+
+logger = logging.getLogger(__name__)
+
+STT_PARTIAL_SECONDS = float(os.environ.get("STT_PARTIAL_SECONDS", "0.5"))  # new audio between partial transcripts
+STT_PAUSE_SECONDS = float(os.environ.get("STT_PAUSE_SECONDS", "0.8"))  # silence that ends a segment
+STT_MAX_SEGMENT_SECONDS = float(os.environ.get("STT_MAX_SEGMENT_SECONDS", "15"))
+STT_SILENCE_RMS = float(os.environ.get("STT_SILENCE_RMS", "0.01"))
+STT_SESSION_TTL = float(os.environ.get("STT_SESSION_TTL", "60"))
+STT_MAX_SESSIONS = int(os.environ.get("STT_MAX_SESSIONS", "32"))
+MAX_SAMPLE_RATE = 192000
+FRAME_SECONDS = 0.03
+
+
+class StreamingTranscriber:
+    """
+    Incremental transcription of audio that arrives in small chunks.
+
+    Chunks of 16-bit PCM are appended to the open segment. Every
+    `partial_seconds` of new speech the segment is transcribed again to give
+    a partial result, and once `pause_seconds` of silence follow speech (or
+    the segment reaches `max_segment_seconds`) it is transcribed a last time
+    and committed. `partial_seconds=None` disables partial results. With
+    language 'auto', the language found by the first recognition pass is
+    kept for the rest of the stream.
+
+    Raises:
+        ValueError: If `sample_rate` is not an integer in (0, MAX_SAMPLE_RATE]
+    """
+
+    def __init__(self, engine=None, language="auto", sample_rate=16000,
+                 partial_seconds=STT_PARTIAL_SECONDS, pause_seconds=STT_PAUSE_SECONDS,
+                 max_segment_seconds=STT_MAX_SEGMENT_SECONDS, silence_rms=STT_SILENCE_RMS):
+        if type(sample_rate) is not int or not 0 < sample_rate <= MAX_SAMPLE_RATE:
+            raise ValueError(f"sample_rate must be an integer between 1 and {MAX_SAMPLE_RATE}, got {sample_rate!r}")
+        self.engine = get_engine(engine) if engine is None or isinstance(engine, str) else engine
+        self.language = language
+        self.sample_rate = sample_rate
+        self.partial_samples = None if partial_seconds is None else int(partial_seconds * sample_rate)
+        self.pause_samples = int(pause_seconds * sample_rate)
+        self.max_segment_samples = int(max_segment_seconds * sample_rate)
+        self.frame_samples = max(1, int(FRAME_SECONDS * sample_rate))
+        self.silence_rms = silence_rms
+        self.segments = []
+        self.partial = ""
+        self._pending = np.zeros(0, dtype=np.float32)  # samples not yet split into frames
+        self._frames = []
+        self._segment_samples = 0
+        self._heard_speech = False
+        self._trailing_silence = 0
+        self._since_partial = 0
+        self.started = time.perf_counter()
+        self.first_text_seconds = None
+        self.recognition_seconds = 0.0
+
+    def _recognize(self):
+        samples = resample(np.concatenate(self._frames), self.sample_rate)
+        start = time.perf_counter()
+        text, language = self.engine.transcribe(samples, self.language)
+        self.recognition_seconds += time.perf_counter() - start
+        text = text.strip()
+        if text:
+            if self.language.lower() == 'auto':
+                self.language = language
+            if self.first_text_seconds is None:
+                self.first_text_seconds = time.perf_counter() - self.started
+        return text
+
+    def _commit(self):
+        text = self._recognize() if self._heard_speech else ""
+        self._frames, self._segment_samples = [], 0
+        self._heard_speech, self._trailing_silence, self._since_partial = False, 0, 0
+        self.partial = ""
+        if text:
+            self.segments.append(text)
+        return text
+
+    def feed(self, pcm):
+        """
+        Add a chunk of mono 16-bit little-endian PCM at `sample_rate`.
+
+        Returns:
+            dict: `segments` committed by this chunk, the current `partial`
+            text of the open segment and the `language`
+        """
+        committed = []
+        samples = np.concatenate([self._pending, pcm16_to_float(pcm)])
+        usable = len(samples) - len(samples) % self.frame_samples
+        self._pending = samples[usable:]
+        for frame in samples[:usable].reshape(-1, self.frame_samples):
+            self._frames.append(frame)
+            self._segment_samples += len(frame)
+            if float(np.sqrt(np.mean(frame * frame))) >= self.silence_rms:
+                self._heard_speech, self._trailing_silence = True, 0
+                self._since_partial += len(frame)
+            elif self._heard_speech:
+                self._trailing_silence += len(frame)
+            elif self._segment_samples > self.pause_samples:
+                # Leading silence is dropped instead of being recognized.
+                self._frames.pop(0)
+                self._segment_samples -= len(frame)
+
+            if self._heard_speech and (self._trailing_silence >= self.pause_samples
+                                       or self._segment_samples >= self.max_segment_samples):
+                text = self._commit()
+                if text:
+                    committed.append(text)
+
+        if (self.partial_samples is not None and self._heard_speech
+                and self._since_partial >= self.partial_samples):
+            self._since_partial = 0
+            self.partial = self._recognize()
+        return {"segments": committed, "partial": self.partial, "language": self.language}
+
+    def finish(self):
+        """
+        Flush the open segment.
+
+        Returns:
+            dict: Segment committed by the flush, the full `text`, all
+            `segments`, the `language` and timing in seconds
+        """
+        if len(self._pending):
+            self._frames.append(self._pending)
+            self._segment_samples += len(self._pending)
+            self._pending = np.zeros(0, dtype=np.float32)
+        last = self._commit()
+        return {
+            "segments": [last] if last else [],
+            "text": " ".join(self.segments),
+            "all_segments": list(self.segments),
+            "language": self.language,
+            "first_text_seconds": None if self.first_text_seconds is None else round(self.first_text_seconds, 3),
+            "recognition_seconds": round(self.recognition_seconds, 3),
+        }
+
+
+class TranscriptionSessions:
+    """
+    Open streaming transcriptions, addressed by a random session ID.
+
+    Requests for one session are serialized by its lock. Sessions idle
+    for longer than `ttl` seconds are dropped, and at most `max_sessions`
+    are kept open at once, dropping the least recently used first.
+    """
+
+    def __init__(self, ttl=STT_SESSION_TTL, max_sessions=STT_MAX_SESSIONS):
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        self._sessions = OrderedDict()  # id -> [transcriber, lock, last used]
+        self._lock = threading.Lock()
+        self.opened = 0
+        self.expired = 0
+
+    def _expire(self, now):
+        while self._sessions:
+            session_id, (_, _, used) = next(iter(self._sessions.items()))
+            if now - used <= self.ttl and len(self._sessions) < self.max_sessions:
+                break
+            del self._sessions[session_id]
+            self.expired += 1
+
+    def open(self, **options):
+        """Start a transcription; options are passed to StreamingTranscriber."""
+        transcriber = StreamingTranscriber(**options)
+        session_id = uuid.uuid4().hex
+        with self._lock:
+            self._expire(time.monotonic())
+            self._sessions[session_id] = [transcriber, threading.Lock(), time.monotonic()]
+            self.opened += 1
+        return session_id
+
+    def _get(self, session_id):
+        with self._lock:
+            entry = self._sessions.get(session_id)
+            if entry is None:
+                raise KeyError(session_id)
+            entry[2] = time.monotonic()
+            self._sessions.move_to_end(session_id)
+            return entry
+
+    def feed(self, session_id, pcm):
+        """Raises KeyError for an unknown or expired session."""
+        transcriber, lock, _ = self._get(session_id)
+        with lock:
+            return transcriber.feed(pcm)
+
+    def close(self, session_id):
+        """Finish a transcription and forget the session."""
+        transcriber, lock, _ = self._get(session_id)
+        with lock:
+            result = transcriber.finish()
+        with self._lock:
+            self._sessions.pop(session_id, None)
+        return result
+
+    def stats(self):
+        with self._lock:
+            return {"open": len(self._sessions), "opened": self.opened, "expired": self.expired}
+
+
+stt_sessions = TranscriptionSessions()
@@ -0,0 +1,163 @@
+import numpy as np
+import threading
+import logging
+import wave
+import io
+import re
+import os
+
+logger = logging.getLogger(__name__)
+
+STT_ENGINE = os.environ.get("STT_ENGINE", "google")
+WHISPER_MODEL = os.environ.get("STT_WHISPER_MODEL", "openai/whisper-tiny")
+SAMPLE_RATE = 16000  # every engine receives mono float32 audio at this rate
+
+
+def pcm16_to_float(data):
+    """Little-endian 16-bit PCM bytes to float32 samples in [-1, 1]."""
+    return np.frombuffer(data[:len(data) - len(data) % 2], dtype='<i2').astype(np.float32) / 32768.0
+
+def float_to_pcm16(samples):
+    return (np.clip(samples, -1.0, 1.0) * 32767).astype('<i2').tobytes()
+
+def resample(samples, rate, target=SAMPLE_RATE):
+    """Linear resampling, enough for speech recognition input."""
+    if rate == target or not len(samples):
+        return samples.astype(np.float32, copy=False)
+    count = int(round(len(samples) * target / rate))
+    positions = np.arange(count) * (rate / target)
+    return np.interp(positions, np.arange(len(samples)), samples).astype(np.float32)
+
+def decode_audio(data):
+    """
+    Decode an uploaded audio file in memory to mono float32 at SAMPLE_RATE.
+
+    WAV is read with the standard library; other formats (FLAC, OGG) go
+    through soundfile when it is installed.
+
+    Raises:
+        ValueError: If the bytes cannot be decoded
+    """
+    try:
+        with wave.open(io.BytesIO(data), 'rb') as source:
+            width, channels, rate = source.getsampwidth(), source.getnchannels(), source.getframerate()
+            frames = source.readframes(source.getnframes())
+        if width == 1:
+            samples = (np.frombuffer(frames, dtype=np.uint8).astype(np.float32) - 128) / 128.0
+        elif width == 2:
+            samples = np.frombuffer(frames, dtype='<i2').astype(np.float32) / 32768.0
+        elif width == 4:
+            samples = np.frombuffer(frames, dtype='<i4').astype(np.float32) / 2147483648.0
+        else:
+            raise ValueError(f"Unsupported WAV sample width: {width}")
+    except (wave.Error, EOFError):
+        try:
+            import soundfile
+            samples, rate = soundfile.read(io.BytesIO(data), dtype='float32', always_2d=True)
+        except ImportError:
+            raise ValueError("Only WAV audio is supported without soundfile")
+        except Exception as e:
+            raise ValueError(f"Could not decode audio: {e}")
+        channels = samples.shape[1]
+        samples = samples.reshape(-1)
+    if channels > 1:
+        samples = samples.reshape(-1, channels).mean(axis=1)
+    return resample(samples, rate)
+
+
+class STTEngine:
+    """
+    Speech recognition backend.
+
+    `transcribe` takes mono float32 samples at SAMPLE_RATE and a language
+    code, or 'auto' to detect it, and returns (text, language). Detection
+    happens in the same recognition pass. Audio without recognizable speech
+    gives an empty text; service failures raise.
+    """
+
+    name = ""
+
+    def transcribe(self, samples, language):
+        raise NotImplementedError
+
+
+class GoogleSTTEngine(STTEngine):
+    """Google Web Speech API through speech_recognition. Needs network access."""
+
+    name = "google"
+
+    def transcribe(self, samples, language):
+        import speech_recognition as sr
+        audio = sr.AudioData(float_to_pcm16(samples), SAMPLE_RATE, 2)
+        recognizer = sr.Recognizer()
+        try:
+            if language.lower() != 'auto':
+                return recognizer.recognize_google(audio, language=language), language
+            result = recognizer.recognize_google(audio, show_all=True)
+        except sr.UnknownValueError:
+            return "", language
+        if not result or not result.get('alternative'):
+            return "", language
+        best = result['alternative'][0]
+        return best.get('transcript', ""), best.get('language', 'en-GB')
+
+
+class WhisperEngine(STTEngine):
+    """
+    Offline Whisper recognition on CPU with transformers.
+
+    Without a language, Whisper predicts the language token as the first
+    decoding step, so detection costs no extra pass.
+    """
+
+    name = "whisper"
+
+    def __init__(self, model_name=WHISPER_MODEL):
+        self.model_name = model_name
+        self._lock = threading.Lock()
+        self._loaded = None
+
+    def _load(self):
+        with self._lock:
+            if self._loaded is None:
+                from transformers import WhisperForConditionalGeneration, WhisperProcessor
+                processor = WhisperProcessor.from_pretrained(self.model_name)
+                model = WhisperForConditionalGeneration.from_pretrained(self.model_name).eval()
+                self._loaded = processor, model
+                logger.info(f"Loaded Whisper model {self.model_name}")
+        return self._loaded
+
+    def transcribe(self, samples, language):
+        import torch
+        processor, model = self._load()
+        features = processor(samples, sampling_rate=SAMPLE_RATE, return_tensors="pt").input_features
+        options = {"task": "transcribe"}
+        if language.lower() != 'auto':
+            options["language"] = language.split('-')[0]
+        with torch.inference_mode():
+            ids = model.generate(features, **options)
+        text = processor.batch_decode(ids, skip_special_tokens=True)[0].strip()
+        if language.lower() != 'auto':
+            return text, language
+        found = re.search(r'<\|([a-z]{2,3})\|>', processor.batch_decode(ids, skip_special_tokens=False)[0])
+        return text, found.group(1) if found else 'en-GB'
+
+
+ENGINES = {engine.name: engine for engine in (GoogleSTTEngine, WhisperEngine)}
+_instances = {}
+
+def get_engine(name=None):
+    """
+    Return the shared instance of a speech recognition backend.
+
+    Args:
+        name (str): Key of ENGINES; defaults to the STT_ENGINE setting
+    Raises:
+        ValueError: For an unknown backend name
+    """
+    name = name or STT_ENGINE
+    if name not in ENGINES:
+        raise ValueError(f"Unknown STT engine '{name}', expected one of {sorted(ENGINES)}")
+    if name not in _instances:
+        _instances[name] = ENGINES[name]()
+    return _instances[name]
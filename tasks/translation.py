@@ -1,23 +1,147 @@
-from transformers import AutoModelForSeq2SeqLM, AutoTokenizer
+from tasks.translation_batcher import TranslationBatcher, MAX_BATCH_SIZE
+from tasks.translation_cache import translation_cache
+from tasks.translation_pool import model_pool, normalize_lang
 import logging
+import os
+import re
 
 logger = logging.getLogger(__name__)
 
-def translate_text(text, source_lang, target_lang):
+MAX_INPUT_TOKENS = int(os.environ.get("TRANSLATION_MAX_INPUT_TOKENS", "400"))
+SENTENCE_BOUNDARY = re.compile(r'(?<=[.!?؟。])\s+|\n+')
+
+def _generate_batch(texts, source_lang, target_lang):
+    """Run a single padded generate call over a list of texts."""
+    tokenizer, model = model_pool.get(source_lang, target_lang)
+    inputs = tokenizer(texts, return_tensors="pt", padding=True)
+    outputs = model.generate(**inputs)
+    return tokenizer.batch_decode(outputs, skip_special_tokens=True)
+
+batcher = TranslationBatcher(_generate_batch)
+
+def translate_batch(texts, source_lang, target_lang, batch_size=MAX_BATCH_SIZE):
+    """
+    Translate many segments at once.
+
+    Cached texts are answered directly; the remaining ones are sorted by
+    length so each padded batch holds similarly sized inputs, then results
+    are returned in the original order.
+
+    Args:
+        texts (list): Strings to translate
+        source_lang (str): Source language code (e.g., 'ar', 'fr-FR')
+        target_lang (str): Target language code
+        batch_size (int): Maximum number of texts per generate call
+    Returns:
+        list: Translated strings, aligned with `texts`
+    """
     try:
-        source_lang = source_lang.split('-')[0].lower()
-        target_lang = target_lang.split('-')[0].lower()
+        source_lang = normalize_lang(source_lang)
+        target_lang = normalize_lang(target_lang)
         
-        model_name = f'Helsinki-NLP/opus-mt-{source_lang}-{target_lang}'
-        logger.info(f"Loading translation model: {model_name}")
+        results = [translation_cache.get(text, source_lang, target_lang) for text in texts]
+        missing = [i for i, result in enumerate(results) if result is None]
+        
+        order = sorted(missing, key=lambda i: len(texts[i]))
+        for start in range(0, len(order), batch_size):
+            ids = order[start:start + batch_size]
+            translated = _generate_batch([texts[i] for i in ids], source_lang, target_lang)
+            for i, text in zip(ids, translated):
+                results[i] = text
+                translation_cache.put(texts[i], source_lang, target_lang, text)
+        
+        return results
+    except Exception as e:
+        logger.error(f"Batch translation error: {str(e)}")
+        raise Exception(f"Translation failed: {str(e)}")
+
+def split_sentences(text):
+    """Split text on sentence punctuation (Latin and Arabic) and line breaks."""
+    return [s.strip() for s in SENTENCE_BOUNDARY.split(text) if s and s.strip()]
+
+def pack_segments(text, tokenizer, max_tokens=MAX_INPUT_TOKENS):
+    """
+    Group consecutive sentences into segments that fit the model input length.
+
+    A single sentence longer than `max_tokens` is cut into word windows so
+    nothing is silently truncated by the tokenizer.
+
+    Args:
+        text (str): Input text
+        tokenizer: Tokenizer of the language pair
+        max_tokens (int): Token budget per segment
+    Returns:
+        list: Segment strings in reading order
+    """
+    segments = []
+    current, current_tokens = [], 0
+
+    def flush():
+        nonlocal current, current_tokens
+        if current:
+            segments.append(" ".join(current))
+        current, current_tokens = [], 0
+
+    for sentence in split_sentences(text):
+        n_tokens = len(tokenizer.tokenize(sentence))
+        if n_tokens > max_tokens:
+            flush()
+            words = sentence.split()
+            step = max(1, len(words) * max_tokens // n_tokens)
+            for start in range(0, len(words), step):
+                segments.append(" ".join(words[start:start + step]))
+            continue
+        if current_tokens + n_tokens > max_tokens:
+            flush()
+        current.append(sentence)
+        current_tokens += n_tokens
+    flush()
+    return segments
+
+def translate_long_text_stream(text, source_lang, target_lang, batch_size=MAX_BATCH_SIZE):
+    """
+    Translate long text segment by segment, yielding results as they are ready.
+
+    The first segment is translated on its own so the first words come back
+    after one short generate call regardless of the input length; the rest
+    is translated in padded batches.
+
+    Args:
+        text (str): Text to translate
+        source_lang (str): Source language code
+        target_lang (str): Target language code
+        batch_size (int): Segments per generate call after the first one
+    Yields:
+        str: Translated segments in reading order
+    """
+    source_lang = normalize_lang(source_lang)
+    target_lang = normalize_lang(target_lang)
+    tokenizer, _ = model_pool.get(source_lang, target_lang)
+    segments = pack_segments(text, tokenizer)
+    if not segments:
+        return
+
+    yield from translate_batch(segments[:1], source_lang, target_lang)
+    for start in range(1, len(segments), batch_size):
+        yield from translate_batch(segments[start:start + batch_size], source_lang, target_lang)
+
+def translate_text(text, source_lang, target_lang):
+    try:
+        source_lang = normalize_lang(source_lang)
+        target_lang = normalize_lang(target_lang)
         
-        tokenizer = AutoTokenizer.from_pretrained(model_name)
-        model = AutoModelForSeq2SeqLM.from_pretrained(model_name)  # FIXED here
+        cached = translation_cache.get(text, source_lang, target_lang)
+        if cached is not None:
+            return cached
         
-        inputs = tokenizer(text, return_tensors="pt", padding=True)
-        outputs = model.generate(**inputs)
-        translated_text = tokenizer.decode(outputs[0], skip_special_tokens=True)
+        tokenizer, _ = model_pool.get(source_lang, target_lang)
+        segments = pack_segments(text, tokenizer)
+        if len(segments) > 1:
+            translated_text = " ".join(translate_batch(segments, source_lang, target_lang))
+        else:
+            translated_text = batcher.submit(text, source_lang, target_lang)
         
+        translation_cache.put(text, source_lang, target_lang, translated_text)
         return translated_text
     except Exception as e:
         logger.error(f"Translation error: {str(e)}")
@@ -0,0 +1,30 @@
+from tasks.micro_batcher import MicroBatcher
+import os
+
+MAX_BATCH_SIZE = int(os.environ.get("TRANSLATION_BATCH_SIZE", "16"))
+MAX_WAIT_MS = float(os.environ.get("TRANSLATION_BATCH_WAIT_MS", "5"))
+
+
+class TranslationBatcher(MicroBatcher):
+    """
+    Collect concurrent single-text requests per language pair into one batch.
+
+    `batch_fn(texts, source_lang, target_lang)` runs once per batch; see
+    MicroBatcher for how batches are formed.
+    """
+
+    def __init__(self, batch_fn, max_batch_size=MAX_BATCH_SIZE, max_wait_ms=MAX_WAIT_MS):
+        super().__init__(batch_fn, max_batch_size, max_wait_ms)
+
+    def submit(self, text, source_lang, target_lang):
+        """
+        Translate one text, possibly sharing a generate call with other callers.
+
+        Args:
+            text (str): Text to translate
+            source_lang (str): Normalized source language code
+            target_lang (str): Normalized target language code
+        Returns:
+            str: Translated text
+        """
+        return super().submit(text, (source_lang, target_lang))
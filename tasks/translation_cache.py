@@ -0,0 +1,166 @@
+from collections import OrderedDict
+import unicodedata
+import threading
+import hashlib
+import logging
+import sqlite3
+import time
+import os
+import re
+
+from tasks.translation_pool import MODEL_NAME_TEMPLATE, TRANSLATION_BACKEND
+
+logger = logging.getLogger(__name__)
+
+CACHE_PATH = os.environ.get("TRANSLATION_CACHE_PATH", "cache/translation_cache.sqlite3")
+MEMORY_MAX_ENTRIES = int(os.environ.get("TRANSLATION_CACHE_MEMORY_ENTRIES", "10000"))
+DISK_MAX_ENTRIES = int(os.environ.get("TRANSLATION_CACHE_DISK_ENTRIES", "500000"))
+TTL_SECONDS = int(os.environ.get("TRANSLATION_CACHE_TTL", str(30 * 24 * 3600)))
+# Translations from another model or backend (e.g. onnx-int8) are never served.
+CACHE_NAMESPACE = f"{MODEL_NAME_TEMPLATE}|{TRANSLATION_BACKEND}"
+
+
+def normalize_text(text):
+    """Unicode-normalize text and collapse whitespace; case is preserved."""
+    return re.sub(r'\s+', ' ', unicodedata.normalize('NFC', text)).strip()
+
+def cache_key(text, source_lang, target_lang, namespace=CACHE_NAMESPACE):
+    """Content address of a translation request for the model in `namespace`."""
+    payload = f"{namespace}\x00{source_lang}\x00{target_lang}\x00{normalize_text(text)}"
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class TranslationCache:
+    """
+    Two-tier translation result cache.
+
+    An in-memory LRU answers hot phrases without touching disk; misses fall
+    through to a SQLite table that survives restarts. Both tiers honour the
+    same TTL, and the disk tier is pruned by last access once it grows past
+    `disk_max_entries`. Keys include `namespace`, the model and backend
+    that produced the translations, so switching either starts from an
+    empty cache and switching back finds the old entries again.
+    """
+
+    def __init__(self, path=CACHE_PATH, memory_max_entries=MEMORY_MAX_ENTRIES,
+                 disk_max_entries=DISK_MAX_ENTRIES, ttl=TTL_SECONDS, namespace=CACHE_NAMESPACE):
+        self.path = path
+        self.namespace = namespace
+        self.memory_max_entries = memory_max_entries
+        self.disk_max_entries = disk_max_entries
+        self.ttl = ttl
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        self._writes = 0
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def _connect(self):
+        if self._db is None:
+            if os.path.dirname(self.path):
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self._db = sqlite3.connect(self.path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS translations ("
+                "key TEXT PRIMARY KEY, translation TEXT NOT NULL, "
+                "created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS idx_accessed ON translations(accessed_at)")
+            self._db.commit()
+        return self._db
+
+    def _expired(self, created_at, now):
+        return self.ttl > 0 and now - created_at > self.ttl
+
+    def get(self, text, source_lang, target_lang):
+        """Return the cached translation or None."""
+        key = cache_key(text, source_lang, target_lang, self.namespace)
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                if not self._expired(entry[1], now):
+                    self._memory.move_to_end(key)
+                    self.memory_hits += 1
+                    return entry[0]
+                del self._memory[key]
+
+            try:
+                db = self._connect()
+                row = db.execute("SELECT translation, created_at FROM translations WHERE key = ?",
+                                 (key,)).fetchone()
+                if row is not None and self._expired(row[1], now):
+                    db.execute("DELETE FROM translations WHERE key = ?", (key,))
+                    db.commit()
+                    row = None
+                if row is not None:
+                    db.execute("UPDATE translations SET accessed_at = ? WHERE key = ?", (now, key))
+                    db.commit()
+            except sqlite3.Error as e:
+                logger.error(f"Translation cache read error: {e}")
+                row = None
+
+            if row is None:
+                self.misses += 1
+                return None
+            self.disk_hits += 1
+            self._remember(key, row[0], row[1])
+            return row[0]
+
+    def put(self, text, source_lang, target_lang, translation):
+        key = cache_key(text, source_lang, target_lang, self.namespace)
+        now = time.time()
+        with self._lock:
+            self._remember(key, translation, now)
+            try:
+                db = self._connect()
+                db.execute("INSERT OR REPLACE INTO translations VALUES (?, ?, ?, ?)",
+                           (key, translation, now, now))
+                self._writes += 1
+                if self._writes % 1000 == 0:
+                    self._prune(db, now)
+                db.commit()
+            except sqlite3.Error as e:
+                logger.error(f"Translation cache write error: {e}")
+
+    def _remember(self, key, translation, created_at):
+        self._memory[key] = (translation, created_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_max_entries:
+            self._memory.popitem(last=False)
+
+    def _prune(self, db, now):
+        if self.ttl > 0:
+            db.execute("DELETE FROM translations WHERE created_at < ?", (now - self.ttl,))
+        db.execute(
+            "DELETE FROM translations WHERE key IN ("
+            "SELECT key FROM translations ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+            (self.disk_max_entries,)
+        )
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            try:
+                db = self._connect()
+                db.execute("DELETE FROM translations")
+                db.commit()
+            except sqlite3.Error as e:
+                logger.error(f"Translation cache clear error: {e}")
+
+    def stats(self):
+        with self._lock:
+            lookups = self.memory_hits + self.disk_hits + self.misses
+            return {
+                "memory_entries": len(self._memory),
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": round((self.memory_hits + self.disk_hits) / lookups, 4) if lookups else 0.0,
+            }
+
+
+translation_cache = TranslationCache()
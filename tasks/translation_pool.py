@@ -0,0 +1,208 @@
+from collections import OrderedDict
+import functools
+import threading
+import logging
+import time
+import os
+
+from tasks.model_registry import registry
+
+logger = logging.getLogger(__name__)
+
+MODEL_NAME_TEMPLATE = "Helsinki-NLP/opus-mt-{source}-{target}"
+POOL_MAX_BYTES = int(os.environ.get("TRANSLATION_POOL_MAX_MB", "2048")) * 1024 * 1024
+HOT_PAIRS = os.environ.get("TRANSLATION_HOT_PAIRS", "ar-fr,ar-en,fr-en")
+TRANSLATION_BACKEND = os.environ.get("TRANSLATION_BACKEND", "pytorch")
+
+
+def normalize_lang(code):
+    """Reduce a locale code such as 'fr-FR' to the opus-mt language code 'fr'."""
+    return code.split('-')[0].lower()
+
+def parse_pairs(spec):
+    """
+    Parse a comma separated list of language pairs.
+
+    Args:
+        spec (str): Pairs such as "ar-fr,ar-en,fr-en"
+    Returns:
+        list: [(source, target), ...]
+    """
+    pairs = []
+    for item in spec.split(','):
+        item = item.strip()
+        if not item:
+            continue
+        source, _, target = item.partition('-')
+        if source and target:
+            pairs.append((normalize_lang(source), normalize_lang(target)))
+        else:
+            logger.warning(f"Ignoring malformed language pair: {item}")
+    return pairs
+
+def load_pytorch_pair(source_lang, target_lang):
+    """Load the tokenizer and PyTorch model for one opus-mt language pair."""
+    from transformers import AutoModelForSeq2SeqLM, AutoTokenizer
+    model_name = MODEL_NAME_TEMPLATE.format(source=source_lang, target=target_lang)
+    logger.info(f"Loading translation model: {model_name}")
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+    model = AutoModelForSeq2SeqLM.from_pretrained(model_name)
+    model.eval()
+    return tokenizer, model
+
+def backend_loader(backend):
+    """
+    Return the pair loader for an inference backend.
+
+    Args:
+        backend (str): 'pytorch', 'onnx' or 'onnx-int8'
+    Returns:
+        callable: loader(source_lang, target_lang) -> (tokenizer, model)
+    """
+    if backend == "pytorch":
+        return load_pytorch_pair
+    if backend in ("onnx", "onnx-int8"):
+        from tasks.onnx_translation import load_onnx_pair
+        return functools.partial(load_onnx_pair, quantize=backend == "onnx-int8")
+    raise ValueError(f"Unknown translation backend: {backend}")
+
+def model_footprint(model):
+    """Best-effort resident size of a loaded model in bytes."""
+    try:
+        return int(model.get_memory_footprint())
+    except Exception:
+        pass
+    try:
+        from tasks.onnx_translation import onnx_footprint
+        return onnx_footprint(model)
+    except Exception:
+        return 0
+
+
+class TranslationModelPool:
+    """
+    Process-wide pool of loaded (tokenizer, model) pairs keyed by language pair.
+
+    Entries are kept in least-recently-used order and evicted once the summed
+    model footprint exceeds `max_bytes`. The most recently used pair is never
+    evicted, so a single model larger than the budget still works.
+    """
+
+    def __init__(self, max_bytes=POOL_MAX_BYTES, loader=load_pytorch_pair):
+        self.max_bytes = max_bytes
+        self.loader = loader
+        self._entries = OrderedDict()
+        self._loading = {}
+        self._lock = threading.Lock()
+        self.used_bytes = 0
+        self.hits = 0
+        self.loads = 0
+        self.evictions = 0
+
+    def _lookup(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry["tokenizer"], entry["model"]
+
+    def get(self, source_lang, target_lang):
+        """
+        Return the (tokenizer, model) for a language pair, loading it on a miss.
+
+        Concurrent callers asking for the same pair wait for a single load.
+        """
+        key = (normalize_lang(source_lang), normalize_lang(target_lang))
+        with self._lock:
+            found = self._lookup(key)
+            if found is not None:
+                return found
+            key_lock = self._loading.setdefault(key, threading.Lock())
+
+        with key_lock:
+            with self._lock:
+                found = self._lookup(key)
+                if found is not None:
+                    return found
+
+            start = time.perf_counter()
+            try:
+                tokenizer, model = self.loader(*key)
+            except Exception:
+                with self._lock:
+                    self._loading.pop(key, None)
+                raise
+            size = model_footprint(model)
+            logger.info(f"Loaded {key[0]}->{key[1]} in {time.perf_counter() - start:.2f}s "
+                        f"({size / 1024 / 1024:.0f} MB)")
+
+            with self._lock:
+                # Inserted before the key lock is dropped, so a caller that
+                # missed the lookup above finds the model instead of loading it again.
+                self._entries[key] = {"tokenizer": tokenizer, "model": model, "size": size}
+                self._loading.pop(key, None)
+                self.used_bytes += size
+                self.loads += 1
+                self._evict()
+            return tokenizer, model
+
+    def _evict(self):
+        while self.used_bytes > self.max_bytes and len(self._entries) > 1:
+            key, entry = self._entries.popitem(last=False)
+            self.used_bytes -= entry["size"]
+            self.evictions += 1
+            logger.info(f"Evicted translation model {key[0]}->{key[1]} from pool")
+
+    def preload(self, pairs):
+        """Load each (source, target) pair, logging and skipping failures."""
+        for source_lang, target_lang in pairs:
+            try:
+                self.get(source_lang, target_lang)
+            except Exception as e:
+                logger.error(f"Could not preload {source_lang}->{target_lang}: {e}")
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.used_bytes = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                "pairs": [f"{s}-{t}" for s, t in self._entries],
+                "used_bytes": self.used_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "loads": self.loads,
+                "evictions": self.evictions,
+            }
+
+
+model_pool = TranslationModelPool(loader=backend_loader(TRANSLATION_BACKEND))
+
+def preload_hot_pairs(spec=HOT_PAIRS, background=True):
+    """
+    Warm the pool with the configured hot language pairs.
+
+    Args:
+        spec (str): Comma separated pairs, defaults to TRANSLATION_HOT_PAIRS
+        background (bool): Load in a daemon thread so startup is not blocked
+    Returns:
+        threading.Thread or None
+    """
+    pairs = parse_pairs(spec)
+    if not background:
+        model_pool.preload(pairs)
+        return None
+    thread = threading.Thread(target=model_pool.preload, args=(pairs,),
+                              name="translation-preload", daemon=True)
+    thread.start()
+    return thread
+
+def load_translators():
+    """Registry loader: the translation pool with the hot pairs loaded."""
+    preload_hot_pairs(background=False)
+    return model_pool
+
+registry.register("translators", load_translators)
@@ -0,0 +1,126 @@
+import subprocess
+import logging
+import shutil
+import array
+import math
+import wave
+import io
+import os
+
+logger = logging.getLogger(__name__)
+
+TTS_ENGINE = os.environ.get("TTS_ENGINE", "gtts")
+ESPEAK_VOICE = os.environ.get("TTS_ESPEAK_VOICE", "")  # empty: voice named after the language
+
+
+class TTSEngine:
+    """
+    Speech synthesis backend.
+
+    `synthesize` returns the encoded audio for one text. `name` and `voice`
+    identify the audio a backend produces and are part of the audio cache
+    key, so switching backend or voice never serves stale files.
+    """
+
+    name = ""
+    extension = ""
+    mimetype = ""
+
+    @property
+    def voice(self):
+        return ""
+
+    def synthesize(self, text, language):
+        raise NotImplementedError
+
+
+class GTTSEngine(TTSEngine):
+    """Google Text-to-Speech, MP3 output. Needs network access."""
+
+    name = "gtts"
+    extension = ".mp3"
+    mimetype = "audio/mpeg"
+
+    def synthesize(self, text, language):
+        from gtts import gTTS
+        buffer = io.BytesIO()
+        gTTS(text=text, lang=language.split('-')[0]).write_to_fp(buffer)
+        return buffer.getvalue()
+
+
+class EspeakEngine(TTSEngine):
+    """Local espeak-ng (or espeak) synthesis, WAV output. Works offline."""
+
+    name = "espeak"
+    extension = ".wav"
+    mimetype = "audio/wav"
+
+    def __init__(self, voice=ESPEAK_VOICE):
+        self._voice = voice
+        self.binary = shutil.which("espeak-ng") or shutil.which("espeak")
+
+    @property
+    def voice(self):
+        return self._voice
+
+    def synthesize(self, text, language):
+        if self.binary is None:
+            raise RuntimeError("espeak-ng is not installed")
+        voice = self._voice or language.split('-')[0]
+        completed = subprocess.run([self.binary, "-v", voice, "--stdout", text],
+                                   capture_output=True, check=True, timeout=60)
+        return completed.stdout
+
+
+class ToneEngine(TTSEngine):
+    """
+    Dependency-free offline engine that renders each character as a short tone.
+
+    The audio is not speech, but it is deterministic, valid 16 kHz mono WAV
+    whose length grows with the text, which is enough to exercise the cache
+    and the voice pipeline without network or system packages.
+    """
+
+    name = "tone"
+    extension = ".wav"
+    mimetype = "audio/wav"
+    sample_rate = 16000
+    seconds_per_char = 0.04
+
+    def synthesize(self, text, language):
+        samples = array.array('h')
+        per_char = int(self.sample_rate * self.seconds_per_char)
+        for char in text:
+            if char.isspace():
+                samples.extend([0] * per_char)
+                continue
+            frequency = 200 + (ord(char) % 64) * 12
+            step = 2 * math.pi * frequency / self.sample_rate
+            samples.extend(int(8000 * math.sin(step * i)) for i in range(per_char))
+        buffer = io.BytesIO()
+        with wave.open(buffer, 'wb') as out:
+            out.setnchannels(1)
+            out.setsampwidth(2)
+            out.setframerate(self.sample_rate)
+            out.writeframes(samples.tobytes())
+        return buffer.getvalue()
+
+
+ENGINES = {engine.name: engine for engine in (GTTSEngine, EspeakEngine, ToneEngine)}
+_instances = {}
+
+def get_engine(name=None):
+    """
+    Return the shared instance of a TTS backend.
+
+    Args:
+        name (str): Key of ENGINES; defaults to the TTS_ENGINE setting
+    Raises:
+        ValueError: For an unknown backend name
+    """
+    name = name or TTS_ENGINE
+    if name not in ENGINES:
+        raise ValueError(f"Unknown TTS engine '{name}', expected one of {sorted(ENGINES)}")
+    if name not in _instances:
+        _instances[name] = ENGINES[name]()
+    return _instances[name]
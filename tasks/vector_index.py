@@ -0,0 +1,160 @@
+import faiss
+import numpy as np
+import logging
+import math
+import os
+
+logger = logging.getLogger(__name__)
+
+INDEX_TYPES = ("flat", "flat-fp16", "ivf", "ivfpq", "hnsw")
+INDEX_TYPE = os.environ.get("KB_INDEX_TYPE", "flat")
+INDEX_METRIC = os.environ.get("KB_INDEX_METRIC", "l2")  # 'l2' or 'ip' (cosine on normalized vectors)
+IVF_NLIST = int(os.environ.get("KB_IVF_NLIST", "0"))  # 0 picks ~4*sqrt(n)
+IVF_NPROBE = int(os.environ.get("KB_IVF_NPROBE", "8"))
+PQ_M = int(os.environ.get("KB_PQ_M", "48"))
+HNSW_M = int(os.environ.get("KB_HNSW_M", "32"))
+HNSW_EF_CONSTRUCTION = int(os.environ.get("KB_HNSW_EF_CONSTRUCTION", "80"))
+HNSW_EF_SEARCH = int(os.environ.get("KB_HNSW_EF_SEARCH", "64"))
+
+
+def index_config(index_type=INDEX_TYPE, metric=INDEX_METRIC):
+    if index_type not in INDEX_TYPES:
+        raise ValueError(f"Unknown index type {index_type!r}, expected one of {INDEX_TYPES}")
+    if metric not in ("l2", "ip"):
+        raise ValueError(f"Unknown index metric {metric!r}, expected 'l2' or 'ip'")
+    return {"type": index_type, "metric": metric}
+
+def faiss_metric(metric):
+    return faiss.METRIC_INNER_PRODUCT if metric == "ip" else faiss.METRIC_L2
+
+def prepare_vectors(vectors, metric):
+    """Convert to contiguous float32 and L2-normalize for inner-product search."""
+    vectors = np.array(vectors, dtype='float32', order='C')
+    if metric == "ip":
+        faiss.normalize_L2(vectors)
+    return vectors
+
+def prepare_queries(index, vectors):
+    """Prepare query vectors to match the metric the index was built with."""
+    metric = "ip" if index.metric_type == faiss.METRIC_INNER_PRODUCT else "l2"
+    return prepare_vectors(vectors, metric)
+
+def _pq_subquantizers(dimension):
+    m = min(PQ_M, dimension)
+    while dimension % m:
+        m -= 1
+    return m
+
+def _create(index_type, dimension, metric, n_train):
+    metric_type = faiss_metric(metric)
+    if index_type == "flat":
+        return faiss.IndexIDMap2(faiss.IndexFlat(dimension, metric_type))
+    if index_type == "flat-fp16":
+        return faiss.IndexIDMap2(
+            faiss.IndexScalarQuantizer(dimension, faiss.ScalarQuantizer.QT_fp16, metric_type)
+        )
+    if index_type == "hnsw":
+        hnsw = faiss.IndexHNSWFlat(dimension, HNSW_M, metric_type)
+        hnsw.hnsw.efConstruction = HNSW_EF_CONSTRUCTION
+        return faiss.IndexIDMap2(hnsw)
+
+    nlist = IVF_NLIST or int(4 * math.sqrt(n_train))
+    nlist = max(1, min(nlist, n_train // 39 or 1))
+    quantizer = faiss.IndexFlat(dimension, metric_type)
+    if index_type == "ivf":
+        return faiss.IndexIVFFlat(quantizer, dimension, nlist, metric_type)
+    nbits = min(8, int(math.log2(max(n_train // 39, 2))))
+    return faiss.IndexIVFPQ(quantizer, dimension, nlist, _pq_subquantizers(dimension), nbits, metric_type)
+
+def build_index(dimension, vectors, ids, config):
+    """
+    Build an ID-addressable index of the configured type.
+
+    Flat, fp16 and HNSW indexes are wrapped in IndexIDMap2; IVF indexes
+    carry IDs natively and are trained on `vectors` first. An IVF index
+    cannot be trained without data, so an empty corpus gets a flat index
+    of the same metric until the next rebuild.
+
+    Args:
+        dimension (int): Embedding dimension
+        vectors (np.ndarray): (n, dimension) embeddings, unnormalized
+        ids (np.ndarray): int64 chunk IDs aligned with vectors
+        config (dict): {"type": ..., "metric": ...} from index_config()
+    Returns:
+        faiss.Index
+    """
+    index_type, metric = config["type"], config["metric"]
+    vectors = prepare_vectors(vectors.reshape(-1, dimension), metric)
+    if index_type in ("ivf", "ivfpq") and len(vectors) == 0:
+        logger.warning(f"No vectors to train a {index_type} index, using flat storage")
+        index_type = "flat"
+
+    index = _create(index_type, dimension, metric, len(vectors))
+    if not index.is_trained:
+        logger.info(f"Training {index_type} index on {len(vectors)} vectors")
+        index.train(vectors)
+    if len(vectors):
+        index.add_with_ids(vectors, np.asarray(ids, dtype='int64'))
+    configure_search(index)
+    return index
+
+def add_vectors(index, vectors, ids):
+    metric = "ip" if index.metric_type == faiss.METRIC_INNER_PRODUCT else "l2"
+    index.add_with_ids(prepare_vectors(vectors, metric), np.asarray(ids, dtype='int64'))
+
+def remove_vectors(index, ids, config):
+    """
+    Remove vectors by chunk ID, returning the (possibly rebuilt) index.
+
+    HNSW graphs do not support deletion, so the surviving vectors are read
+    back from the graph storage and a new graph is built.
+    """
+    ids = np.asarray(ids, dtype='int64')
+    try:
+        index.remove_ids(ids)
+        return index
+    except RuntimeError:
+        pass
+
+    inner = faiss.downcast_index(index.index)
+    id_map = faiss.vector_to_array(index.id_map)
+    vectors = inner.reconstruct_n(0, index.ntotal)
+    keep = ~np.isin(id_map, ids)
+    logger.info(f"Rebuilding {config['type']} index without {int((~keep).sum())} vectors")
+    return build_index(index.d, vectors[keep], id_map[keep], config)
+
+def configure_search(index, nprobe=IVF_NPROBE, ef_search=HNSW_EF_SEARCH):
+    """Apply the query-time recall/latency knobs of the index type."""
+    inner = faiss.downcast_index(index.index) if isinstance(index, faiss.IndexIDMap2) else index
+    if isinstance(inner, faiss.IndexIVF):
+        inner.nprobe = min(nprobe, inner.nlist)
+    elif isinstance(inner, faiss.IndexHNSW):
+        inner.hnsw.efSearch = ef_search
+    return index
+
+def mmap_flags(config):
+    """
+    faiss read flags that map the stored vectors instead of copying them.
+
+    IVF indexes map their inverted lists; flat, SQ and HNSW storage map
+    their code arrays (IO_FLAG_MMAP_IFC, faiss >= 1.10). Older faiss
+    versions fall back to IO_FLAG_MMAP, which copies what it cannot map.
+    """
+    if config["type"] in ("ivf", "ivfpq"):
+        return faiss.IO_FLAG_MMAP
+    return getattr(faiss, "IO_FLAG_MMAP_IFC", faiss.IO_FLAG_MMAP)
+
+def read_index(path, config, mmap=True):
+    """Load a saved index, memory-mapped read-only unless `mmap` is False."""
+    if mmap:
+        try:
+            return configure_search(faiss.read_index(path, mmap_flags(config) | faiss.IO_FLAG_READ_ONLY))
+        except RuntimeError as e:
+            logger.warning(f"Could not memory-map {path}, loading it into memory: {e}")
+    return configure_search(faiss.read_index(path))
+
+def write_index(index, path):
+    """Save an index through a temporary file so mapped readers never see a partial write."""
+    tmp_path = f"{path}.tmp"
+    faiss.write_index(index, tmp_path)
+    os.replace(tmp_path, path)
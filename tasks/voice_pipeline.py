@@ -0,0 +1,184 @@
+import threading
+import logging
+import queue
+import time
+import os
+
+from tasks.audio_cache import audio_cache
+from tasks.stage_timings import StageTimings
+from tasks.streaming_stt import StreamingTranscriber
+from tasks.stt_engines import SAMPLE_RATE, decode_audio, float_to_pcm16
+from tasks.translation import split_sentences, translate_text
+from tasks.translation_pool import normalize_lang
+from tasks import stt_engines, tts_engines
+
+logger = logging.getLogger(__name__)
+
+VOICE_FEED_SECONDS = float(os.environ.get("VOICE_FEED_SECONDS", "0.25"))  # audio handed to the recognizer per step
+
+_DONE = object()
+
+stage_timings = StageTimings()
+
+
+class _Stopped(Exception):
+    pass
+
+
+def _get(source, stop):
+    while not stop.is_set():
+        try:
+            return source.get(timeout=0.1)
+        except queue.Empty:
+            continue
+    raise _Stopped()
+
+
+def translate_speech_stream(audio_data, source_lang="auto", target_lang="fr-FR", stt_engine=None, tts_engine=None):
+    """
+    Recognize, translate and speak an utterance one sentence at a time.
+
+    Recognition, translation and synthesis run in their own threads joined
+    by queues, so the first sentence is translated and synthesized while
+    the next one is still being recognized. Recognition commits a segment
+    at each pause (see StreamingTranscriber) and the segment is split into
+    sentences. End-to-end time therefore approaches that of the slowest
+    stage rather than the sum of the three.
+
+    Args:
+        audio_data (bytes): Uploaded audio (WAV, or FLAC/OGG with soundfile)
+        source_lang (str): Spoken language code, or 'auto' to detect it
+        target_lang (str): Language code of the translation and speech
+        stt_engine (str): Recognizer name, defaults to STT_ENGINE
+        tts_engine (str): Synthesizer name, defaults to TTS_ENGINE
+    Returns:
+        generator: Yields one `sentence` event per sentence, in spoken order,
+        with its source text, translation, audio URL and per-stage seconds,
+        then a final `done` event with the totals. Failures yield an `error`
+        event. A sentence already in the target language has `translation`
+        'skipped' with `skip_reason` 'same_language' and is spoken as is;
+        one whose language could not be detected has `skip_reason`
+        'unknown_language' and no translation or audio.
+    Raises:
+        ValueError: For undecodable audio or an unknown engine, before any
+            work is started
+    """
+    recognizer = stt_engines.get_engine(stt_engine)
+    synthesizer = tts_engines.get_engine(tts_engine)
+    samples = decode_audio(audio_data)
+    return _run_pipeline(samples, source_lang, target_lang, recognizer, synthesizer)
+
+def _run_pipeline(samples, source_lang, target_lang, recognizer, synthesizer):
+    started = time.perf_counter()
+    stop = threading.Event()
+    to_translate, to_speak, events = queue.Queue(), queue.Queue(), queue.Queue()
+    timings = {}
+    failures = []
+    transcriber = StreamingTranscriber(recognizer, source_lang, SAMPLE_RATE, partial_seconds=None)
+
+    def run(name, body):
+        try:
+            body()
+        except _Stopped:
+            pass
+        except Exception as e:
+            logger.error(f"Voice pipeline {name} stage failed: {e}")
+            failures.append(f"{name}: {e}")
+            stop.set()
+        finally:
+            events.put(_DONE)
+
+    def recognize():
+        pcm = float_to_pcm16(samples)
+        step = int(VOICE_FEED_SECONDS * SAMPLE_RATE) * 2
+        index = 0
+
+        def emit(segments, seconds):
+            nonlocal index
+            sentences = [s for segment in segments for s in split_sentences(segment)]
+            for sentence in sentences:
+                to_translate.put({"index": index, "source_text": sentence, "language": transcriber.language,
+                                  "seconds": {"stt": round(seconds / len(sentences), 4)}})
+                index += 1
+
+        try:
+            for start in range(0, len(pcm), step):
+                if stop.is_set():
+                    raise _Stopped()
+                before = transcriber.recognition_seconds
+                with stage_timings.measure(timings, "stt"):
+                    segments = transcriber.feed(pcm[start:start + step])["segments"]
+                emit(segments, transcriber.recognition_seconds - before)
+            before = transcriber.recognition_seconds
+            with stage_timings.measure(timings, "stt"):
+                segments = transcriber.finish()["segments"]
+            emit(segments, transcriber.recognition_seconds - before)
+        finally:
+            to_translate.put(_DONE)
+
+    def translate():
+        try:
+            while (item := _get(to_translate, stop)) is not _DONE:
+                start = time.perf_counter()
+                # The transcriber resolves 'auto' from the recognizer's result; it
+                # is still 'auto' only when the engine could not tell.
+                language = item.pop("language")
+                if language.lower() == 'auto':
+                    item.update(translation="skipped", skip_reason="unknown_language", translated_text=None)
+                elif normalize_lang(language) == normalize_lang(target_lang):
+                    item.update(translation="skipped", skip_reason="same_language",
+                                translated_text=item["source_text"])
+                else:
+                    item.update(translation="translated",
+                                translated_text=translate_text(item["source_text"], language, target_lang))
+                item["seconds"]["translate"] = round(time.perf_counter() - start, 4)
+                timings["translate"] = timings.get("translate", 0.0) + item["seconds"]["translate"]
+                to_speak.put(item)
+        finally:
+            to_speak.put(_DONE)
+
+    def speak():
+        while (item := _get(to_speak, stop)) is not _DONE:
+            start = time.perf_counter()
+            if item["translated_text"] is None:
+                item["audio_url"] = None
+            else:
+                item["audio_url"] = f"/audio/{audio_cache.synthesize(item['translated_text'], target_lang, synthesizer)}"
+            item["seconds"]["tts"] = round(time.perf_counter() - start, 4)
+            timings["tts"] = timings.get("tts", 0.0) + item["seconds"]["tts"]
+            item["ready_seconds"] = round(time.perf_counter() - started, 4)
+            events.put(item)
+
+    threads = [threading.Thread(target=run, args=(name, body), name=f"voice-{name}", daemon=True)
+               for name, body in (("stt", recognize), ("translate", translate), ("tts", speak))]
+    for thread in threads:
+        thread.start()
+
+    sentences = []
+    running = len(threads)
+    try:
+        while running:
+            item = events.get()
+            if item is _DONE:
+                running -= 1
+                continue
+            sentences.append(item)
+            yield {"event": "sentence", **item}
+        if failures:
+            yield {"event": "error", "error": "; ".join(failures)}
+            return
+        total = time.perf_counter() - started
+        stage_timings.record({**timings, "total": total})
+        yield {
+            "event": "done",
+            "text": " ".join(s["source_text"] for s in sentences),
+            "translated_text": " ".join(s["translated_text"] for s in sentences if s["translated_text"]),
+            "skipped_sentences": sum(s["translation"] == "skipped" for s in sentences),
+            "detected_language": transcriber.language,
+            "audio_seconds": round(len(samples) / SAMPLE_RATE, 3),
+            "stage_seconds": {name: round(seconds, 4) for name, seconds in timings.items()},
+            "total_seconds": round(total, 4),
+        }
+    finally:
+        # Also runs when the client disconnects mid-stream.
+        stop.set()
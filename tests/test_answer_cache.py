@@ -0,0 +1,32 @@
+import numpy as np
+
+from tasks.answer_cache import SemanticAnswerCache
+
+
+def cache(tmp_path, **options):
+    answers = SemanticAnswerCache(dimension=4, path=str(tmp_path), **options)
+    answers.set_version(1)
+    return answers
+
+
+def test_lookup_requires_same_context(tmp_path):
+    answers = cache(tmp_path)
+    query = np.array([1, 0, 0, 0], dtype='float32')
+    answers.store("q", query, ["chunk a", "chunk b"], "answer")
+
+    assert answers.lookup(query, ["chunk a", "chunk b"]) == "answer"
+    assert answers.lookup(query, ["chunk a", "chunk c"]) is None
+
+
+def test_stores_are_persisted_in_batches(tmp_path):
+    answers = cache(tmp_path, save_every=3)
+    for i in range(2):
+        answers.store(f"q{i}", np.eye(4, dtype='float32')[i], [], "answer")
+    assert cache(tmp_path).stats()["size"] == 0
+
+    answers.store("q2", np.eye(4, dtype='float32')[2], [], "answer")
+    answers.store("q3", np.eye(4, dtype='float32')[3], [], "answer")
+    assert cache(tmp_path).stats()["size"] == 3
+
+    answers.flush()
+    assert cache(tmp_path).stats()["size"] == 4
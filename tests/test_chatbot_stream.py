@@ -0,0 +1,26 @@
+import numpy as np
+
+from tasks import chatbot
+from test_llm_gateway import FakeClient, gateway, wait_settled
+
+
+def test_closing_unstarted_stream_cancels_generation(monkeypatch):
+    llm = gateway(FakeClient(delay=5))
+    streams = []
+    open_stream = llm.stream
+
+    def stream(messages, timeout=None):
+        streams.append(open_stream(messages, timeout))
+        return streams[-1]
+
+    monkeypatch.setattr(llm, "stream", stream)
+    monkeypatch.setattr(chatbot, "llm_gateway", llm)
+    monkeypatch.setattr(chatbot, "embed_query", lambda query: np.zeros(4, dtype='float32'))
+    monkeypatch.setattr(chatbot.answer_cache, "lookup", lambda embedding, context: None)
+
+    tokens = chatbot.generate_response_stream("question", ["context"])
+    tokens.close()
+
+    assert streams[0]._future.cancelled()
+    wait_settled(llm)
+    assert (llm.pending, llm.cancelled) == (0, 1)
@@ -0,0 +1,24 @@
+import os
+
+from tasks.chunk_store import ChunkStore
+
+
+def test_added_texts_are_spilled_to_disk_until_saved(tmp_path):
+    text_path, offsets_path = str(tmp_path / "chunks.dat"), str(tmp_path / "chunks.idx")
+    store = ChunkStore(text_path, offsets_path, load=False)
+    store.add(2, "deuxième", 3)
+    store.add(0, "zéro", 1)
+    store = store.save()
+
+    store.add(1, "un", 1)
+    store.add(3, "trois", 2)
+    store.discard(2)
+    assert all(isinstance(value, int) for record in store._added.values() for value in record)
+    store._spill.flush()
+    assert os.path.getsize(store.spill_path) == len("un") + len("trois")
+    assert store.get(1) == "un" and store.tokens(3) == 2 and 2 not in store
+
+    saved = store.save()
+    assert not os.path.exists(store.spill_path)
+    assert [saved.get(i) for i in range(4)] == ["zéro", "un", None, "trois"]
+    assert len(saved) == 3
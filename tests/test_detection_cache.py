@@ -0,0 +1,14 @@
+import os
+
+from tasks.detection_cache import DetectionCache
+
+
+def test_directory_is_created_on_first_put(tmp_path):
+    path = tmp_path / "detections"
+    cache = DetectionCache(str(path), max_bytes=1024)
+    assert not path.exists()
+    assert cache.get("missing") is None
+
+    cache.put("key", [{"label": "card"}], b"jpeg")
+    assert os.path.isdir(path)
+    assert DetectionCache(str(path)).get("key") == [{"label": "card"}]
@@ -0,0 +1,55 @@
+import numpy as np
+
+from tasks import embedding_builder
+from tasks.embedding_builder import DEFAULT_BATCH_SIZE, EmbeddingBuilder, tuned_batch_size
+
+
+class RecordingEmbedder:
+    def __init__(self):
+        self.batch_sizes = []
+        self.texts = []
+
+    def get_sentence_embedding_dimension(self):
+        return 2
+
+    def encode(self, texts, batch_size=32, convert_to_tensor=False):
+        self.batch_sizes.append(batch_size)
+        self.texts.append(list(texts))
+        return np.ones((len(texts), 2), dtype='float32')
+
+
+def test_untuned_host_is_tuned_on_sample_of_whole_build(tmp_path, monkeypatch):
+    monkeypatch.setattr(embedding_builder, "AUTOTUNE_CANDIDATES", (8, 16))
+    path = str(tmp_path / "autotune.json")
+    embedder = RecordingEmbedder()
+    first = [f"first {i}" for i in range(300)]
+    last = [f"last {i}" for i in range(300)]
+
+    with EmbeddingBuilder(embedder, "model", checkpoint_dir=None, autotune_path=path) as builder:
+        builder.encode(first)
+        builder.encode(last)
+        assert embedder.batch_sizes == [DEFAULT_BATCH_SIZE, DEFAULT_BATCH_SIZE]
+
+    tuning = [text for call in embedder.texts[2:] for text in call]
+    assert any(t.startswith("first") for t in tuning) and any(t.startswith("last") for t in tuning)
+    assert tuned_batch_size("model", 1, path) == builder.batch_size
+
+    embedder = RecordingEmbedder()
+    with EmbeddingBuilder(embedder, "model", checkpoint_dir=None, autotune_path=path) as builder:
+        builder.encode(["again"])
+    assert embedder.batch_sizes == [tuned_batch_size("model", 1, path)]
+
+
+def test_checkpoints_are_not_reused_by_another_model(tmp_path):
+    checkpoints = str(tmp_path / "checkpoints")
+    with EmbeddingBuilder(RecordingEmbedder(), "old-model", batch_size=8, checkpoint_dir=checkpoints) as builder:
+        builder.encode(["a", "b"])
+
+    embedder = RecordingEmbedder()
+    with EmbeddingBuilder(embedder, "new-model", batch_size=8, checkpoint_dir=checkpoints) as builder:
+        builder.encode(["a", "b"])
+    assert builder.resumed == 0 and embedder.texts == [["a", "b"]]
+
+    with EmbeddingBuilder(RecordingEmbedder(), "old-model", batch_size=8, checkpoint_dir=checkpoints) as builder:
+        builder.encode(["a", "b"])
+    assert builder.resumed == 2
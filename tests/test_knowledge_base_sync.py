@@ -0,0 +1,44 @@
+import hashlib
+
+import numpy as np
+import pytest
+
+from tasks import knowledge_base
+
+
+class FakeEmbedder:
+    """Deterministic 8-dimensional embeddings derived from the text hash."""
+
+    def get_sentence_embedding_dimension(self):
+        return 8
+
+    def encode(self, texts, batch_size=32, convert_to_tensor=False):
+        return np.array([np.frombuffer(hashlib.sha256(t.encode()).digest()[:8], dtype=np.uint8)
+                         for t in texts], dtype='float32')
+
+
+@pytest.fixture
+def kb_dir(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    # One chunk per paragraph, so the test controls exactly which chunks repeat.
+    monkeypatch.setattr(knowledge_base, "iter_source_chunks",
+                        lambda path: [p for p in open(path, encoding='utf-8').read().split("\n\n") if p])
+    (tmp_path / knowledge_base.DOCS_DIR).mkdir(parents=True)
+    return tmp_path / knowledge_base.DOCS_DIR
+
+
+def sync():
+    index, chunks, manifest = knowledge_base.sync_knowledge_base(FakeEmbedder(), workers=1, embed_workers=1)
+    ids = [i for entry in manifest["sources"].values() for i in entry["chunk_ids"]]
+    return index, chunks, ids
+
+
+def test_edit_with_repeated_paragraph_leaves_no_orphaned_vectors(kb_dir):
+    doc = kb_dir / "guide.txt"
+    doc.write_text("Intro\n\nRepeated note\n\nMiddle\n\nRepeated note\n\nEnd", encoding='utf-8')
+    index, chunks, ids = sync()
+    assert index.ntotal == len(ids) == 5
+
+    doc.write_text("Intro\n\nRepeated note\n\nMiddle changed\n\nEnd", encoding='utf-8')
+    index, chunks, ids = sync()
+    assert index.ntotal == len(ids) == len(chunks) == 4
@@ -0,0 +1,65 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from tasks.llm_gateway import LLMGateway
+
+
+class FakeClient:
+    def __init__(self, delay=0.0, error=None):
+        self.delay = delay
+        self.error = error
+
+    async def chat(self, model, messages, stream=False):
+        await asyncio.sleep(self.delay)
+        if self.error:
+            raise self.error
+        if not stream:
+            return {"message": {"content": "answer"}}
+
+        async def parts():
+            for token in ("an", "swer"):
+                yield {"message": {"content": token}}
+        return parts()
+
+
+def gateway(client, **options):
+    llm = LLMGateway(**options)
+    llm._ensure_loop()
+    llm._client = client
+    return llm
+
+
+def wait_settled(llm):
+    for _ in range(100):
+        if llm.pending == 0:
+            return
+        time.sleep(0.01)
+
+
+def test_outcomes_release_admission():
+    llm = gateway(FakeClient())
+    assert llm.chat([]) == "answer"
+    assert "".join(llm.stream([])) == "answer"
+
+    llm._client = FakeClient(error=RuntimeError("down"))
+    with pytest.raises(RuntimeError):
+        llm.chat([])
+    with pytest.raises(TimeoutError):
+        gateway(FakeClient(delay=1), timeout=0.05).chat([])
+    wait_settled(llm)
+    assert (llm.pending, llm.completed, llm.failed) == (0, 2, 1)
+
+
+def test_stream_closed_before_it_starts_releases_admission():
+    llm = gateway(FakeClient())
+    blocked = threading.Event()
+    llm._loop.call_soon_threadsafe(lambda: (blocked.set(), time.sleep(0.2)))
+    blocked.wait()
+
+    # The loop is busy, so the generation is cancelled before its coroutine runs.
+    llm.stream([]).close()
+    wait_settled(llm)
+    assert (llm.pending, llm.cancelled) == (0, 1)
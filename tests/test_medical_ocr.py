@@ -0,0 +1,55 @@
+import numpy as np
+import pytest
+
+pytest.importorskip("cv2")
+pytest.importorskip("pytesseract")
+
+from tasks import medical_document_processor as medical
+
+
+@pytest.fixture
+def ocr(monkeypatch):
+    """Replace tesseract with scripted outputs and record each call."""
+    calls = []
+
+    def script(*outputs):
+        def image_to_string(image, config=""):
+            calls.append(config)
+            return outputs[len(calls) - 1] if len(calls) <= len(outputs) else ""
+        monkeypatch.setattr(medical.pytesseract, "image_to_string", image_to_string)
+        monkeypatch.setattr(medical, "preprocess_image", lambda *a, **k: pytest.fail("full preprocessing ran"))
+        return calls
+    return script
+
+
+FIELD = np.full((30, 120, 3), 255, dtype=np.uint8)
+
+
+def test_valid_first_read_costs_one_call(ocr):
+    calls = ocr("42")
+    assert medical.extract_medical_text(FIELD, "age") == ("42", 1.0)
+    assert len(calls) == 1
+
+
+def test_invalid_read_gets_one_extra_pass(ocr):
+    calls = ocr("4z", "42")
+    assert medical.extract_medical_text(FIELD, "age") == ("42", 1.0)
+    assert len(calls) == 2
+
+
+def test_invalid_reads_keep_first_text(ocr):
+    calls = ocr("4z", "4zz", "42")
+    assert medical.extract_medical_text(FIELD, "age") == ("4z", 0.5)
+    assert len(calls) == 2
+
+
+def test_empty_reads_stop_after_cheap_passes(ocr):
+    calls = ocr("", "", "")
+    assert medical.extract_medical_text(FIELD, "age") == ("", 0.0)
+    assert len(calls) == 3
+
+
+def test_text_after_empty_pass(ocr):
+    calls = ocr("", "42")
+    assert medical.extract_medical_text(FIELD, "age") == ("42", 1.0)
+    assert len(calls) == 2
@@ -0,0 +1,43 @@
+import threading
+
+import pytest
+
+from tasks.micro_batcher import MicroBatcher
+
+
+def submit_all(batcher, items):
+    results = [None] * len(items)
+
+    def call(i):
+        try:
+            results[i] = batcher.submit(items[i])
+        except Exception as e:
+            results[i] = e
+
+    threads = [threading.Thread(target=call, args=(i,)) for i in range(len(items))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=5)
+    assert not any(thread.is_alive() for thread in threads)
+    return results
+
+
+def test_callers_get_their_own_result():
+    batcher = MicroBatcher(lambda items: [item * 2 for item in items], max_batch_size=4, max_wait_ms=50)
+    assert submit_all(batcher, [1, 2, 3, 4]) == [2, 4, 6, 8]
+    assert batcher.stats()["batches"] == 1
+
+
+def test_short_result_fails_every_caller():
+    batcher = MicroBatcher(lambda items: items[:-1], max_batch_size=4, max_wait_ms=50)
+    results = submit_all(batcher, [1, 2, 3, 4])
+    assert all(isinstance(result, ValueError) for result in results)
+
+
+def test_batch_error_reaches_single_caller():
+    def fail(items):
+        raise RuntimeError("model crashed")
+
+    with pytest.raises(RuntimeError):
+        MicroBatcher(fail, max_batch_size=1, max_wait_ms=0).submit("x")
@@ -0,0 +1,19 @@
+import pytest
+
+from tasks.onnx_translation import _build_atomically
+
+
+def test_interrupted_build_leaves_no_cache_directory(tmp_path):
+    target = tmp_path / "model" / "fp32"
+
+    def interrupted(tmp_dir):
+        (tmp_dir / "encoder_model.onnx").write_bytes(b"partial")
+        raise KeyboardInterrupt
+
+    with pytest.raises(KeyboardInterrupt):
+        _build_atomically(target, interrupted)
+    assert not target.exists()
+    assert list(target.parent.iterdir()) == []
+
+    _build_atomically(target, lambda tmp_dir: (tmp_dir / "encoder_model.onnx").write_bytes(b"graph"))
+    assert (target / "encoder_model.onnx").read_bytes() == b"graph"
@@ -0,0 +1,31 @@
+import numpy as np
+import pytest
+
+from tasks.stt_engines import float_to_pcm16
+from tasks.streaming_stt import StreamingTranscriber
+
+
+class FakeEngine:
+    def __init__(self):
+        self.calls = 0
+
+    def transcribe(self, samples, language):
+        self.calls += 1
+        return f"segment {self.calls}", "en"
+
+
+@pytest.mark.parametrize("sample_rate", [0, -16000, 10 ** 7, "16000", 16000.0, None, True])
+def test_rejects_invalid_sample_rate(sample_rate):
+    with pytest.raises(ValueError):
+        StreamingTranscriber(FakeEngine(), sample_rate=sample_rate)
+
+
+def test_commits_segment_after_pause():
+    rate = 16000
+    speech = 0.5 * np.sin(np.linspace(0, 400 * np.pi, rate)).astype(np.float32)
+    silence = np.zeros(rate, dtype=np.float32)
+    transcriber = StreamingTranscriber(FakeEngine(), "en", rate, partial_seconds=None)
+
+    result = transcriber.feed(float_to_pcm16(np.concatenate([speech, silence])))
+    assert result["segments"] == ["segment 1"]
+    assert transcriber.finish()["text"] == "segment 1"
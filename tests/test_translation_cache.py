@@ -0,0 +1,13 @@
+from tasks.translation_cache import TranslationCache
+
+
+def test_backends_do_not_share_translations(tmp_path):
+    path = str(tmp_path / "translations.sqlite3")
+    pytorch = TranslationCache(path, namespace="opus-mt|pytorch")
+    pytorch.put("Bonjour", "fr", "en", "Hello")
+
+    int8 = TranslationCache(path, namespace="opus-mt|onnx-int8")
+    assert int8.get("Bonjour", "fr", "en") is None
+    int8.put("Bonjour", "fr", "en", "Hi")
+
+    assert TranslationCache(path, namespace="opus-mt|pytorch").get("Bonjour ", "fr", "en") == "Hello"
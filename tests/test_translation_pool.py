@@ -0,0 +1,37 @@
+import threading
+import time
+
+from tasks.translation_pool import TranslationModelPool
+
+
+class SlowModel:
+    def get_memory_footprint(self):
+        time.sleep(0.05)
+        return 1024
+
+
+def test_concurrent_get_loads_pair_once():
+    calls = []
+
+    def loader(source, target):
+        calls.append((source, target))
+        time.sleep(0.05)
+        return object(), SlowModel()
+
+    pool = TranslationModelPool(loader=loader)
+    results = []
+
+    def get(delay):
+        time.sleep(delay)
+        results.append(pool.get("ar-SA", "fr-FR"))
+
+    # Staggered start: callers arrive during the load and while its footprint is measured.
+    threads = [threading.Thread(target=get, args=(i * 0.005,)) for i in range(24)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert calls == [("ar", "fr")]
+    assert len(results) == 24 and len(set(map(id, (model for _, model in results)))) == 1
+    assert pool.loads == 1
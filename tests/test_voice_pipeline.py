@@ -0,0 +1,42 @@
+import numpy as np
+
+from tasks import voice_pipeline
+from tasks.stt_engines import SAMPLE_RATE
+
+
+class FakeEngine:
+    def __init__(self, language):
+        self.language = language
+
+    def transcribe(self, samples, language):
+        return "Bonjour tout le monde.", self.language
+
+
+def run(engine_language, monkeypatch):
+    translated, spoken = [], []
+    monkeypatch.setattr(voice_pipeline, "translate_text",
+                        lambda text, src, tgt: translated.append((src, tgt)) or f"[{tgt}] {text}")
+    monkeypatch.setattr(voice_pipeline.audio_cache, "synthesize",
+                        lambda text, lang, engine: spoken.append(text) or "clip.wav")
+    speech = 0.5 * np.sin(np.linspace(0, 400 * np.pi, SAMPLE_RATE)).astype(np.float32)
+    samples = np.concatenate([speech, np.zeros(SAMPLE_RATE, dtype=np.float32)])
+    events = list(voice_pipeline._run_pipeline(samples, "auto", "fr-FR", FakeEngine(engine_language), None))
+    return events, translated, spoken
+
+
+def test_auto_source_uses_detected_language(monkeypatch):
+    events, translated, spoken = run("en-US", monkeypatch)
+    assert translated == [("en-US", "fr-FR")]
+    assert events[0]["translation"] == "translated" and spoken == [events[0]["translated_text"]]
+
+
+def test_untranslated_sentences_are_flagged(monkeypatch):
+    events, translated, spoken = run("fr", monkeypatch)
+    assert not translated
+    assert events[0]["translation"] == "skipped" and events[0]["skip_reason"] == "same_language"
+    assert spoken == ["Bonjour tout le monde."]
+
+    events, translated, spoken = run("auto", monkeypatch)
+    assert not translated and not spoken
+    assert events[0]["skip_reason"] == "unknown_language" and events[0]["audio_url"] is None
+    assert events[-1]["event"] == "done" and events[-1]["skipped_sentences"] == 1